@@ -27,6 +27,48 @@ def create_app(config_class=Config):
     db.init_app(app)
     login_manager.init_app(app)
 
+    from app.services.execution_engine import execution_engine
+    execution_engine.init_app(app)
+
+    from app.services.http_client import session_pool
+    session_pool.init_app(app)
+
+    from app.services.completion_cache import completion_cache
+    completion_cache.init_app(app)
+
+    from app.services.rate_limiter import rate_limiter
+    rate_limiter.init_app(app)
+
+    from app.services.retry_policy import retry_manager
+    retry_manager.init_app(app)
+
+    from app.services.circuit_breaker import circuit_breakers
+    circuit_breakers.init_app(app)
+
+    from app.services.embedding_store import embedding_store
+    embedding_store.init_app(app)
+
+    from app.services.completion_service import streaming_settings
+    streaming_settings.init_app(app)
+
+    from app.services.scoring import bert_score_model, scoring_backend, scoring_warmup, semantic_model
+    semantic_model.init_app(app)
+    bert_score_model.init_app(app)
+    scoring_backend.init_app(app)
+    scoring_warmup.init_app(app)
+
+    from app.services.scoring_pipeline import pipeline_settings
+    pipeline_settings.init_app(app)
+
+    from app.services.prompt_sampling import sampling_settings
+    sampling_settings.init_app(app)
+
+    from app.services.dataset_analysis import dataset_analyzer
+    dataset_analyzer.init_app(app)
+
+    from app.services.dataset_changes import dataset_changes
+    dataset_changes.init_app(app)
+
     from app.routes import main_bp
     app.register_blueprint(main_bp)
 
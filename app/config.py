@@ -12,3 +12,79 @@ class Config:
 
     SQLALCHEMY_DATABASE_URI = f'postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Параллельное выполнение запросов к API моделей во время бенчмарков
+    BENCHMARK_MAX_CONCURRENCY = int(os.environ.get('BENCHMARK_MAX_CONCURRENCY') or 16)
+    BENCHMARK_INTEGRATION_CONCURRENCY = int(os.environ.get('BENCHMARK_INTEGRATION_CONCURRENCY') or 4)
+
+    # Пул HTTP-соединений к API моделей
+    HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS') or 10)
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE') or 32)
+    HTTP_CONNECT_RETRIES = int(os.environ.get('HTTP_CONNECT_RETRIES') or 2)
+
+    # Постоянный кэш ответов моделей
+    COMPLETION_CACHE_ENABLED = (os.environ.get('COMPLETION_CACHE_ENABLED') or 'true').lower() == 'true'
+    COMPLETION_CACHE_PATH = os.environ.get('COMPLETION_CACHE_PATH') or os.path.join(os.getcwd(), 'cache', 'completions.sqlite3')
+    COMPLETION_CACHE_MAX_BYTES = int(os.environ.get('COMPLETION_CACHE_MAX_BYTES') or 256 * 1024 * 1024)
+
+    # Лимиты запросов к API интеграциям (0 — без ограничения), если не заданы в самой интеграции
+    RATE_LIMIT_DEFAULT_RPM = int(os.environ.get('RATE_LIMIT_DEFAULT_RPM') or 0)
+    RATE_LIMIT_DEFAULT_TPM = int(os.environ.get('RATE_LIMIT_DEFAULT_TPM') or 0)
+    RATE_LIMIT_MAX_THROTTLE_RETRIES = int(os.environ.get('RATE_LIMIT_MAX_THROTTLE_RETRIES') or 3)
+
+    # Повторы и хеджирование запросов к моделям, если не заданы в самой интеграции
+    COMPLETION_MAX_RETRIES = int(os.environ.get('COMPLETION_MAX_RETRIES') or 2)
+    COMPLETION_RETRY_BASE_DELAY = float(os.environ.get('COMPLETION_RETRY_BASE_DELAY') or 0.5)
+    COMPLETION_RETRY_MAX_DELAY = float(os.environ.get('COMPLETION_RETRY_MAX_DELAY') or 8.0)
+    COMPLETION_HEDGING_ENABLED = (os.environ.get('COMPLETION_HEDGING_ENABLED') or 'false').lower() == 'true'
+    COMPLETION_HEDGE_QUANTILE = float(os.environ.get('COMPLETION_HEDGE_QUANTILE') or 0.95)
+    COMPLETION_HEDGE_MIN_SAMPLES = int(os.environ.get('COMPLETION_HEDGE_MIN_SAMPLES') or 20)
+    # Потоки для основного и дублирующего запросов: по умолчанию по два на каждый одновременный запрос
+    COMPLETION_HEDGE_POOL_SIZE = int(os.environ.get('COMPLETION_HEDGE_POOL_SIZE') or 2 * BENCHMARK_MAX_CONCURRENCY)
+
+    # Потоковые ответы (SSE) для измерения времени до первого токена и скорости генерации
+    COMPLETION_STREAMING_ENABLED = (os.environ.get('COMPLETION_STREAMING_ENABLED') or 'true').lower() == 'true'
+
+    # Предохранители API интеграций: после серии отказов запросы к интеграции сразу пропускаются
+    CIRCUIT_BREAKER_ENABLED = (os.environ.get('CIRCUIT_BREAKER_ENABLED') or 'true').lower() == 'true'
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_BREAKER_FAILURE_THRESHOLD') or 5)
+    CIRCUIT_BREAKER_RESET_TIMEOUT = float(os.environ.get('CIRCUIT_BREAKER_RESET_TIMEOUT') or 30.0)
+
+    # Постоянное хранилище эмбеддингов эталонов и ответов для семантической метрики
+    EMBEDDING_STORE_ENABLED = (os.environ.get('EMBEDDING_STORE_ENABLED') or 'true').lower() == 'true'
+    EMBEDDING_STORE_DIR = os.environ.get('EMBEDDING_STORE_DIR') or os.path.join(os.getcwd(), 'cache', 'embeddings')
+    EMBEDDING_PRECOMPUTE_ON_UPLOAD = (os.environ.get('EMBEDDING_PRECOMPUTE_ON_UPLOAD') or 'true').lower() == 'true'
+
+    # Модели метрик загружаются при первом использовании; прогрев грузит их в фоне при старте
+    SCORING_WARMUP_ON_START = (os.environ.get('SCORING_WARMUP_ON_START') or 'false').lower() == 'true'
+
+    # Бэкенд вывода моделей метрик на CPU: torch (fp32), int8 (динамическое квантование) или onnx (ONNX Runtime)
+    SCORING_INFERENCE_BACKEND = os.environ.get('SCORING_INFERENCE_BACKEND') or 'torch'
+    SEMANTIC_INFERENCE_BACKEND = os.environ.get('SEMANTIC_INFERENCE_BACKEND') or SCORING_INFERENCE_BACKEND
+    BERTSCORE_INFERENCE_BACKEND = os.environ.get('BERTSCORE_INFERENCE_BACKEND') or SCORING_INFERENCE_BACKEND
+    SCORING_ONNX_DIR = os.environ.get('SCORING_ONNX_DIR') or os.path.join(os.getcwd(), 'cache', 'onnx')
+    # Бюджет токенов на пакет с учётом паддинга: тексты группируются в пакеты близкой длины
+    SCORING_MAX_BATCH_TOKENS = int(os.environ.get('SCORING_MAX_BATCH_TOKENS') or 8192)
+
+    # Общий сервер оценки метрик (scoring_server.py): модели загружаются один раз на все веб-воркеры
+    SCORING_SERVER_URL = os.environ.get('SCORING_SERVER_URL') or ''
+    SCORING_SERVER_TIMEOUT = float(os.environ.get('SCORING_SERVER_TIMEOUT') or 120.0)
+    SCORING_BATCH_WINDOW_MS = float(os.environ.get('SCORING_BATCH_WINDOW_MS') or 10.0)
+    SCORING_MAX_BATCH_PAIRS = int(os.environ.get('SCORING_MAX_BATCH_PAIRS') or 256)
+    SCORING_QUEUE_SIZE = int(os.environ.get('SCORING_QUEUE_SIZE') or 64)
+
+    # Конвейер «генерация → оценка»: ответы оцениваются микропакетами по мере поступления
+    SCORING_PIPELINE_QUEUE_SIZE = int(os.environ.get('SCORING_PIPELINE_QUEUE_SIZE') or 64)
+    SCORING_MICRO_BATCH_SIZE = int(os.environ.get('SCORING_MICRO_BATCH_SIZE') or 256)
+    SCORING_BATCH_WAIT_MS = float(os.environ.get('SCORING_BATCH_WAIT_MS') or 20.0)
+
+    # Выборка промптов из датасета: head, reservoir, hash или stratified; размер — на датасет, 0 — все строки
+    PROMPT_SAMPLING_STRATEGY = os.environ.get('PROMPT_SAMPLING_STRATEGY') or 'head'
+    PROMPT_SAMPLE_SIZE = int(os.environ.get('PROMPT_SAMPLE_SIZE') or 20)
+    PROMPT_SAMPLING_SEED = int(os.environ.get('PROMPT_SAMPLING_SEED') or 0)
+
+    # Анализ загруженных CSV в фоновом потоке: загрузка возвращается сразу, ход анализа виден в статусе датасета
+    DATASET_ANALYSIS_IN_BACKGROUND = (os.environ.get('DATASET_ANALYSIS_IN_BACKGROUND') or 'false').lower() == 'true'
+
+    # Построчные правки датасета пишутся в журнал; после стольких операций CSV переписывается в фоне
+    DATASET_COMPACT_AFTER_CHANGES = int(os.environ.get('DATASET_COMPACT_AFTER_CHANGES') or 500)
@@ -11,6 +11,12 @@ class ApiIntegration(db.Model):
     api_url = db.Column(db.String(500), nullable=False)
     api_key = db.Column(db.String(500), nullable=False)
     description = db.Column(db.Text)
+    max_concurrency = db.Column(db.Integer)
+    requests_per_minute = db.Column(db.Integer)
+    tokens_per_minute = db.Column(db.Integer)
+    max_retries = db.Column(db.Integer)
+    hedging_enabled = db.Column(db.Boolean)
+    streaming_enabled = db.Column(db.Boolean)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -20,6 +26,17 @@ class ApiIntegration(db.Model):
     def __repr__(self):
         return f'<ApiIntegration {self.name}>'
 
+    def settings_dict(self):
+        """Настройки выполнения запросов к интеграции; None означает значение по умолчанию."""
+        return {
+            'max_concurrency': self.max_concurrency,
+            'requests_per_minute': self.requests_per_minute,
+            'tokens_per_minute': self.tokens_per_minute,
+            'max_retries': self.max_retries,
+            'hedging_enabled': self.hedging_enabled,
+            'streaming_enabled': self.streaming_enabled
+        }
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -28,5 +45,6 @@ class ApiIntegration(db.Model):
             'api_key': self.api_key,
             'description': self.description,
             'is_active': self.is_active,
+            'settings': self.settings_dict(),
             'models_count': self.models.count()
         }
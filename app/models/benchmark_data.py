@@ -32,5 +32,14 @@ def get_benchmarks():
             'metrics': ['rouge', 'semantic_similarity', 'bert_score'],
             'model_type': 'custom',
             'requires_datasets': True
+        },
+        {
+            'id': 'performance_benchmark',
+            'name': 'Нагрузочный тест',
+            'description': 'Нагрузочное тестирование API моделей: промпты из датасетов отправляются на нескольких уровнях параллельности. Показывает зависимость задержки от пропускной способности, долю ошибок и точку насыщения.',
+            'category': 'performance',
+            'metrics': ['throughput', 'latency', 'error_rate', 'saturation'],
+            'model_type': 'custom',
+            'requires_datasets': True
         }
     ]
@@ -19,6 +19,10 @@ class UserDataset(db.Model):
     format_validated = db.Column(db.Boolean, default=False)
     prompt_column = db.Column(db.String(100))
     reference_column = db.Column(db.String(100))
+    # Анализ файла: ready, либо pending/running/failed при анализе в фоне (DATASET_ANALYSIS_IN_BACKGROUND)
+    analysis_status = db.Column(db.String(20), default='ready')
+    analysis_progress = db.Column(db.Float, default=1.0)
+    analysis_error = db.Column(db.Text)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -39,6 +43,9 @@ class UserDataset(db.Model):
             'format_validated': self.format_validated,
             'prompt_column': self.prompt_column,
             'reference_column': self.reference_column,
+            'analysis_status': self.analysis_status or 'ready',
+            'analysis_progress': self.analysis_progress,
+            'analysis_error': self.analysis_error,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'type': 'user_dataset'
         }
@@ -40,7 +40,8 @@ class UserModel(db.Model):
                 'id': integration.id,
                 'name': integration.name,
                 'api_url': integration.api_url,
-                'description': integration.description if hasattr(integration, 'description') else None
+                'description': integration.description if hasattr(integration, 'description') else None,
+                'settings': integration.settings_dict()
             }
         else:
             result['api_integration'] = None
@@ -15,6 +15,7 @@ from app.schemas.benchmark_dto import (
     BlindTestRevealRequest,
 )
 from app.services.benchmark_service import run_benchmark, record_blind_test_vote, reveal_blind_test_models
+from app.services.scoring import scoring_backend, scoring_warmup
 
 main_bp = Blueprint('main', __name__)
 
@@ -25,6 +26,19 @@ def index():
     return render_template('index.html')
 
 
+@main_bp.route('/api/ready')
+def readiness():
+    """
+    Проверка готовности: 503, пока при включённом прогреве не загружены модели
+    метрик или пока не готов общий сервер оценки, если он используется.
+    """
+    if scoring_backend.remote:
+        status = {'server': scoring_backend.client.url, **scoring_backend.client.health()}
+    else:
+        status = scoring_warmup.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+
 @main_bp.route('/api/benchmarks')
 @login_required
 def get_all_benchmarks():
@@ -151,6 +165,14 @@ def benchmark():
         if len(api_models) == 0:
             return jsonify({'error': 'Сравнение с эталоном требует хотя бы одну модель с доступом API'}), 400
 
+    if 'performance_benchmark' in selected_benchmarks:
+        if len(selected_benchmarks) > 1:
+            return jsonify({'error': 'Нагрузочный тест нельзя объединить с другими тестами'}), 400
+
+        api_models = [model for model in selected_models if model.api_url]
+        if len(api_models) == 0:
+            return jsonify({'error': 'Нагрузочный тест требует хотя бы одну модель с доступом API'}), 400
+
     request_dto.judge_model_id = judge_model_id
     request_dto.models = selected_models
     request_dto.datasets = selected_datasets
@@ -3,8 +3,27 @@ from __future__ import annotations
 from dataclasses import dataclass, field, asdict
 from typing import Any, Dict, List, Optional
 
+
 # DTO-модели для обмена данными между маршрутами и сервисами бенчмарков.
 
+# Нагрузочный тест выполняется внутри запроса /api/run-benchmark, поэтому его
+# размер ограничен: не больше MAX_LOAD_LEVELS уровней и MAX_REQUESTS_PER_LEVEL
+# запросов на уровень, а в открытой модели поступление запросов на самом
+# медленном уровне занимает не больше MAX_OPEN_LOOP_SECONDS секунд.
+MAX_LOAD_LEVELS = 8
+MAX_REQUESTS_PER_LEVEL = 1000
+MAX_OPEN_LOOP_SECONDS = 120
+
+
+def _int_or_none(value: Any) -> Optional[int]:
+    """Целое число из значения JSON или None, если значение не приводится к целому."""
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
 
 @dataclass
 class BenchmarkInfo:
@@ -121,6 +140,9 @@ class UserDatasetInfo:
     reference_column: Optional[str]
     created_at: Optional[str]
     type: str
+    analysis_status: str = "ready"
+    analysis_progress: Optional[float] = None
+    analysis_error: Optional[str] = None
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "UserDatasetInfo":
@@ -139,6 +161,9 @@ class UserDatasetInfo:
             reference_column=data.get("reference_column"),
             created_at=data.get("created_at"),
             type=data.get("type", "user_dataset"),
+            analysis_status=data.get("analysis_status") or "ready",
+            analysis_progress=data.get("analysis_progress"),
+            analysis_error=data.get("analysis_error"),
         )
 
     @classmethod
@@ -179,19 +204,122 @@ class SelectedDataset:
     id: str
 
 
+@dataclass
+class PerformanceConfig:
+    """
+    Параметры нагрузочного теста (ключ performance в /api/run-benchmark).
+
+    В закрытой модели (arrivalMode='closed') уровень — число одновременных
+    пользователей, в открытой ('open') — интенсивность поступления запросов
+    в секунду.
+    """
+    levels: List[int] = field(default_factory=lambda: [1, 4, 16, 64])
+    arrival_mode: str = "closed"
+    requests_per_level: int = 32
+    max_tokens: int = 256
+    timeout: int = 60
+    max_in_flight: int = 256
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "PerformanceConfig":
+        """Создаёт конфигурацию из JSON, отбрасывая некорректные значения и ограничивая размер теста."""
+        data = data or {}
+        config = cls()
+        raw_levels = data.get("levels") if isinstance(data.get("levels"), list) else []
+        levels = sorted({
+            min(level, config.max_in_flight)
+            for level in map(_int_or_none, raw_levels) if level is not None and level > 0
+        })
+        if levels:
+            config.levels = levels[:MAX_LOAD_LEVELS]
+        if data.get("arrivalMode") in ("closed", "open"):
+            config.arrival_mode = data["arrivalMode"]
+        requests_per_level = _int_or_none(data.get("requestsPerLevel"))
+        if requests_per_level:
+            config.requests_per_level = min(max(1, requests_per_level), MAX_REQUESTS_PER_LEVEL)
+        if config.arrival_mode == "open":
+            # Уровень открытой модели — запросов в секунду: число запросов задаёт длительность уровня
+            config.requests_per_level = min(config.requests_per_level, config.levels[0] * MAX_OPEN_LOOP_SECONDS)
+        max_tokens = _int_or_none(data.get("maxTokens"))
+        if max_tokens:
+            config.max_tokens = max(1, max_tokens)
+        return config
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Преобразует конфигурацию в словарь для JSON-ответа."""
+        return {
+            "levels": self.levels,
+            "arrivalMode": self.arrival_mode,
+            "requestsPerLevel": self.requests_per_level,
+            "maxTokens": self.max_tokens,
+        }
+
+
+@dataclass
+class PromptSamplingConfig:
+    """
+    Выборка промптов из каждого датасета (ключ sampling в /api/run-benchmark).
+
+    strategy — 'head', 'reservoir', 'hash' или 'stratified', size — число
+    промптов на датасет (0 — все), seed — зерно случайной и хэш-выборки,
+    category_column — колонка категории для стратифицированной выборки.
+    Незаданные поля берутся из настроек приложения (PROMPT_SAMPLING_*).
+    """
+    strategy: Optional[str] = None
+    size: Optional[int] = None
+    seed: Optional[int] = None
+    category_column: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "PromptSamplingConfig":
+        """Создаёт конфигурацию из JSON, отбрасывая некорректные значения."""
+        data = data or {}
+        config = cls()
+        if data.get("strategy") in ("head", "reservoir", "hash", "stratified"):
+            config.strategy = data["strategy"]
+        size = _int_or_none(data.get("size"))
+        if size is not None:
+            config.size = max(0, size)
+        config.seed = _int_or_none(data.get("seed"))
+        if data.get("categoryColumn"):
+            config.category_column = str(data["categoryColumn"])
+        return config
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Преобразует конфигурацию в словарь для JSON-ответа."""
+        return {
+            "strategy": self.strategy,
+            "size": self.size,
+            "seed": self.seed,
+            "categoryColumn": self.category_column,
+        }
+
+
 @dataclass
 class RunBenchmarkRequest:
     """
     Структурированное представление JSON-запроса /api/run-benchmark.
     
     Поля соответствуют ключам исходного JSON (selectedModels, selectedBenchmarks,
-    selectedDatasets, metrics), а также содержат обогащённые списки моделей и
-    датасетов для использования в сервисном слое.
+    selectedDatasets, metrics, scoringMode, cacheMode, sampling, performance), а также содержат обогащённые
+    списки моделей и датасетов для использования в сервисном слое.
+
+    cache_mode управляет кэшем ответов моделей: 'use' (по умолчанию),
+    'refresh' — запросить ответы заново и обновить кэш, 'bypass' — не использовать кэш.
+
+    scoring_mode задаёт расчёт метрик в сравнении по метрикам: 'full' (по умолчанию)
+    или 'cascade' — трансформерные метрики только там, где они могут изменить рейтинг.
+
+    sampling задаёт, какие промпты берутся из каждого датасета (см. PromptSamplingConfig).
     """
     selected_models: List[SelectedModel]
     selected_benchmark_ids: List[str]
     selected_datasets: List[SelectedDataset]
     metrics_config: Dict[str, Any]
+    cache_mode: str = "use"
+    scoring_mode: str = "full"
+    sampling: PromptSamplingConfig = field(default_factory=PromptSamplingConfig)
+    performance_config: PerformanceConfig = field(default_factory=PerformanceConfig)
     judge_model_id: Optional[str] = None
     models: List[UserModelInfo] = field(default_factory=list)
     datasets: List[UserDatasetInfo] = field(default_factory=list)
@@ -207,11 +335,21 @@ class RunBenchmarkRequest:
             "semantic": {"weight": 0.3},
             "bertScore": {"weight": 0.3},
         }
+        cache_mode = data.get("cacheMode") or "use"
+        if cache_mode not in ("use", "refresh", "bypass"):
+            cache_mode = "use"
+        scoring_mode = data.get("scoringMode") or "full"
+        if scoring_mode not in ("full", "cascade"):
+            scoring_mode = "full"
         return cls(
             selected_models=selected_models,
             selected_benchmark_ids=selected_benchmarks,
             selected_datasets=selected_datasets,
             metrics_config=metrics,
+            cache_mode=cache_mode,
+            scoring_mode=scoring_mode,
+            sampling=PromptSamplingConfig.from_dict(data.get("sampling")),
+            performance_config=PerformanceConfig.from_dict(data.get("performance")),
         )
 
     @property
@@ -231,6 +369,10 @@ class RunBenchmarkRequest:
             "selectedBenchmarks": self.selected_benchmark_ids,
             "selectedDatasets": self.selected_dataset_ids,
             "metrics": self.metrics_config,
+            "cacheMode": self.cache_mode,
+            "scoringMode": self.scoring_mode,
+            "sampling": self.sampling.to_dict(),
+            "performance": self.performance_config.to_dict(),
         }
 
 
@@ -1,36 +1,78 @@
-import csv
 import json
 import math
+import os
 import random
 import re
-import requests
 from collections import Counter
-
-from bert_score import score as bert_score
-from sentence_transformers import SentenceTransformer
-import numpy as np
+from itertools import repeat
 
 from app.models.user_dataset import UserDataset
-from app.schemas.benchmark_dto import RunBenchmarkRequest, RunBenchmarkResult
-
+from app.schemas.benchmark_dto import PromptSamplingConfig, RunBenchmarkRequest, RunBenchmarkResult
+from app.services.completion_cache import CACHE_MODE_USE
+from app.services.completion_service import (
+    CompletionResult,
+    clean_model_response,
+    request_chat_completion,
+    summarize_call_stats,
+    summarize_completion_cache,
+    summarize_latency,
+)
+from app.services.dataset_analysis import find_category_column, find_prompt_column, find_reference_column
+from app.services.dataset_changes import open_dataset
+from app.services.execution_engine import execution_engine
+from app.services.lexical_metrics import rouge_l_f1, score_lexical_batch, tokenize
+from app.services.metric_plan import SCORING_MODE_FULL, MetricPlan, cascade_transformer_scores
+from app.services.performance_service import run_load_test
+from app.services.prompt_sampling import sample_items
+from app.services.scoring import (
+    ScoringTimer,
+    precompute_embeddings,
+    score_pairs_safely,
+    scoring_backend,
+)
+from app.services.scoring_pipeline import ScoringPipeline
+
+
+def get_model_call_info(model):
+    """Оставляет в словаре модели только поля, нужные для вызова её API."""
+    return {
+        'id': model['id'],
+        'name': model['name'],
+        'api_url': model['api_url'],
+        'api_key': model['api_key'],
+        'api_integration': model.get('api_integration')
+    }
 
-_bert_model_type = "microsoft/deberta-base-mnli"
-_bert_model_lang = "en"
-_bert_model_initialized = False
 
-_semantic_model_name = "sentence-transformers/distiluse-base-multilingual-cased-v1"
-_semantic_model = None
+def fetch_model_response(prompt, model_info, cache_mode=CACHE_MODE_USE):
+    """Запрашивает ответ модели (CompletionResult), превращая исключение в текст ошибки."""
+    try:
+        return call_model_api_detailed(prompt, model_info, cache_mode)
+    except Exception as e:
+        return CompletionResult(content=f"Ошибка получения ответа: {str(e)}", ok=False)
 
 
-def clean_model_response(response):
-    if not response:
-        return response
+def fetch_model_responses(jobs, cache_mode=CACHE_MODE_USE):
+    """
+    Параллельно получает ответы моделей для списка пар (промпт, модель).
 
-    response = re.sub(r'<think>.*?</think>', '', response, flags=re.DOTALL | re.IGNORECASE)
+    Запросы выполняются через общий движок с учётом лимитов интеграций,
+    результаты CompletionResult возвращаются в порядке исходного списка.
+    """
+    return execution_engine.map(
+        lambda job: fetch_model_response(job[0], job[1], cache_mode),
+        jobs,
+        model_of=lambda job: job[1]
+    )
 
-    response = response.lstrip()
 
-    return response
+def iter_model_responses(jobs, cache_mode=CACHE_MODE_USE):
+    """Как fetch_model_responses, но отдаёт пары (индекс задания, CompletionResult) по мере готовности."""
+    return execution_engine.as_completed(
+        lambda job: fetch_model_response(job[0], job[1], cache_mode),
+        jobs,
+        model_of=lambda job: job[1]
+    )
 
 
 def run_benchmark(request: RunBenchmarkRequest) -> RunBenchmarkResult:
@@ -54,11 +96,30 @@ def run_benchmark(request: RunBenchmarkRequest) -> RunBenchmarkResult:
     selected_benchmark_ids = request.selected_benchmark_ids
     metrics_config = request.metrics_config
     judge_model_id = request.judge_model_id
+    cache_mode = request.cache_mode
 
     metrics_comparison_selected = 'metrics_comparison' in selected_benchmark_ids
     blind_test_selected = 'blind_test' in selected_benchmark_ids
     judge_eval_selected = 'judge_eval' in selected_benchmark_ids
     reference_comparison_selected = 'reference_comparison' in selected_benchmark_ids
+    performance_selected = 'performance_benchmark' in selected_benchmark_ids
+
+    if performance_selected:
+        if len(selected_benchmark_ids) > 1:
+            return RunBenchmarkResult({'error': 'Нагрузочный тест нельзя комбинировать с другими тестами'})
+
+        api_models = [model for model in selected_models if model.get('api_url')]
+        if len(api_models) == 0:
+            return RunBenchmarkResult({'error': 'Нагрузочный тест требует хотя бы одну модель с доступом к API'})
+
+        performance_data = generate_performance_data(api_models, selected_datasets, request.performance_config,
+                                                     request.sampling)
+        if 'error' in performance_data:
+            return RunBenchmarkResult(performance_data)
+        return RunBenchmarkResult({
+            'performance': performance_data,
+            'testType': 'performance_benchmark'
+        })
 
     if metrics_comparison_selected:
         if len(selected_benchmark_ids) > 1:
@@ -68,7 +129,8 @@ def run_benchmark(request: RunBenchmarkRequest) -> RunBenchmarkResult:
         if len(api_models) == 0:
             return RunBenchmarkResult({'error': 'Сравнение по метрикам требует хотя бы одну модель с доступом к API'})
 
-        metrics_data = generate_metrics_comparison_data(api_models, selected_datasets, metrics_config)
+        metrics_data = generate_metrics_comparison_data(api_models, selected_datasets, metrics_config, cache_mode,
+                                                        request.scoring_mode, request.sampling)
         if 'error' in metrics_data:
             return RunBenchmarkResult(metrics_data)
         return RunBenchmarkResult({
@@ -92,7 +154,8 @@ def run_benchmark(request: RunBenchmarkRequest) -> RunBenchmarkResult:
         models_for_special_test = []
 
     if blind_test_selected and len(models_for_special_test) == 2:
-        blind_test_data = generate_blind_test_data(models_for_special_test, selected_datasets)
+        blind_test_data = generate_blind_test_data(models_for_special_test, selected_datasets, cache_mode,
+                                                   request.sampling)
         if 'error' in blind_test_data:
             return RunBenchmarkResult(blind_test_data)
         return RunBenchmarkResult({
@@ -104,7 +167,8 @@ def run_benchmark(request: RunBenchmarkRequest) -> RunBenchmarkResult:
         if not judge_model_id:
             return RunBenchmarkResult({'error': 'Для оценки судьёй необходимо выбрать модель-судью'})
 
-        judge_eval_data = generate_judge_eval_data(models_for_special_test, judge_model_id, selected_datasets)
+        judge_eval_data = generate_judge_eval_data(models_for_special_test, judge_model_id, selected_datasets, cache_mode,
+                                                   request.sampling)
         if 'error' in judge_eval_data:
             return RunBenchmarkResult(judge_eval_data)
         return RunBenchmarkResult({
@@ -120,7 +184,8 @@ def run_benchmark(request: RunBenchmarkRequest) -> RunBenchmarkResult:
         if len(api_models) == 0:
             return RunBenchmarkResult({'error': 'Сравнение с эталоном требует хотя бы одну модель с доступом к API'})
 
-        reference_data = generate_reference_comparison_data(api_models, judge_model_id, selected_datasets)
+        reference_data = generate_reference_comparison_data(api_models, judge_model_id, selected_datasets, cache_mode,
+                                                            request.sampling)
         if 'error' in reference_data:
             return RunBenchmarkResult(reference_data)
         return RunBenchmarkResult({
@@ -134,8 +199,55 @@ def run_benchmark(request: RunBenchmarkRequest) -> RunBenchmarkResult:
     })
 
 
-def load_prompts_from_datasets(selected_datasets):
+def iter_dataset_prompts(dataset, columns, require_reference=False, category_column=None):
+    """
+    Потоково перебирает промпты датасета из его колоночного кэша
+    с применёнными правками из журнала изменений.
+    Возвращает пары (промпт, категория строки или None).
+    """
+    prompt_column = dataset.prompt_column or find_prompt_column(columns.columns)
+    reference_column = dataset.reference_column or find_reference_column(columns.columns)
+    category_column = category_column or find_category_column(columns.columns)
+    if prompt_column not in columns.columns:
+        return
+
+    def values(column):
+        return columns.column(column) if column in columns.columns else repeat(None)
+
+    rows = zip(columns.column(prompt_column), values(reference_column), values(category_column))
+    for i, (prompt_text, reference_answer, category) in enumerate(rows):
+        prompt_text = prompt_text.strip()
+        if not prompt_text:
+            continue
+
+        reference_answer = reference_answer.strip() if reference_answer is not None else None
+        if require_reference and not reference_answer:
+            continue
+
+        prompt_data = {
+            'id': f'dataset_{dataset.id}_row_{i}',
+            'prompt': prompt_text,
+            'category': f'dataset_{dataset.name}',
+            'source_dataset': dataset.name,
+            'source_file': dataset.filename
+        }
+
+        if reference_answer:
+            prompt_data['reference_answer'] = reference_answer
+
+        yield prompt_data, category.strip() if category is not None else None
+
+
+def load_prompts_from_datasets(selected_datasets, sampling=None, require_reference=False):
+    """
+    Загружает выборку промптов из каждого выбранного датасета.
+
+    sampling — PromptSamplingConfig (стратегия и размер выборки на датасет);
+    датасет читается за один проход, в памяти держится только выборка.
+    require_reference — пропускать строки без эталонного ответа до выборки.
+    """
     prompts = []
+    sampling = sampling or PromptSamplingConfig()
 
     if not selected_datasets:
         return {'prompts': [], 'error': 'Не выбраны датасеты'}
@@ -148,50 +260,20 @@ def load_prompts_from_datasets(selected_datasets):
             if not dataset or not dataset.file_path:
                 continue
 
-            import os
             if not os.path.exists(dataset.file_path):
                 continue
 
-            with open(dataset.file_path, 'r', encoding='utf-8') as file:
-                sample = file.read(1024)
-                file.seek(0)
-                sniffer = csv.Sniffer()
-                try:
-                    delimiter = sniffer.sniff(sample).delimiter
-                except:
-                    delimiter = ','
-
-                reader = csv.DictReader(file, delimiter=delimiter)
-                fieldnames = reader.fieldnames
-                if not fieldnames:
-                    continue
-
-                prompt_column = find_prompt_column(fieldnames)
-                reference_column = find_reference_column(fieldnames)
-
-                if not prompt_column:
-                    continue
-
-                for i, row in enumerate(reader):
-                    prompt_text = row.get(prompt_column, '').strip() if prompt_column else ''
-                    reference_answer = row.get(reference_column, '').strip() if reference_column else None
-
-                    if prompt_text:
-                        prompt_data = {
-                            'id': f'dataset_{dataset.id}_row_{i}',
-                            'prompt': prompt_text,
-                            'category': f'dataset_{dataset.name}',
-                            'source_dataset': dataset.name,
-                            'source_file': dataset.filename
-                        }
-
-                        if reference_answer:
-                            prompt_data['reference_answer'] = reference_answer
-
-                        prompts.append(prompt_data)
-
-                        if len([p for p in prompts if p['source_dataset'] == dataset.name]) >= 20:
-                            break
+            # Колонки читаются из колоночного кэша, построенного при загрузке датасета
+            with open_dataset(dataset.file_path) as columns:
+                sampled = sample_items(
+                    iter_dataset_prompts(dataset, columns, require_reference, sampling.category_column),
+                    strategy=sampling.strategy,
+                    size=sampling.size,
+                    seed=sampling.seed,
+                    key=lambda item: item[0]['prompt'],
+                    stratum=lambda item: item[1]
+                )
+            prompts.extend(prompt_data for prompt_data, _ in sampled)
 
         except Exception as e:
             continue
@@ -203,84 +285,29 @@ def load_prompts_from_datasets(selected_datasets):
     return {'prompts': prompts, 'error': None}
 
 
-def find_prompt_column(fieldnames):
-    if not fieldnames:
-        return None
-
-    prompt_keywords = [
-        'prompt', 'prompts', 'question', 'questions', 'query', 'queries',
-        'input', 'instruction', 'instructions', 'task', 'tasks',
-        'запрос', 'вопрос', 'задача', 'задание', 'инструкция'
-    ]
-
-    for field in fieldnames:
-        if field.lower() in prompt_keywords:
-            return field
-
-    for field in fieldnames:
-        for keyword in prompt_keywords:
-            if keyword in field.lower():
-                return field
-
-    return None
-
-
-def find_reference_column(fieldnames):
-    if not fieldnames:
-        return None
-
-    reference_keywords = [
-        'reference', 'answer', 'answers', 'response', 'responses', 'output',
-        'solution', 'solutions', 'result', 'results', 'expected', 'target',
-        'эталон', 'ответ', 'ответы', 'решение', 'результат', 'ожидаемый',
-        'ref', 'ans', 'ground_truth', 'truth', 'correct', 'ideal'
-    ]
-
-    for field in fieldnames:
-        if field.lower() in reference_keywords:
-            return field
+def read_reference_answers(dataset):
+    """
+    Читает непустые эталонные ответы датасета из его колоночного кэша.
+    Колонка та же, что в iter_dataset_prompts: сохранённая в датасете, иначе найденная по названию.
+    """
+    with open_dataset(dataset.file_path) as columns:
+        reference_column = dataset.reference_column or find_reference_column(columns.columns)
+        if reference_column not in columns.columns:
+            return []
+        return [value.strip() for value in columns.column(reference_column) if value.strip()]
 
-    for field in fieldnames:
-        for keyword in reference_keywords:
-            if keyword in field.lower():
-                return field
 
-    return None
+def precompute_reference_embeddings(dataset):
+    """Запускает фоновый расчёт эмбеддингов эталонных ответов загруженного датасета."""
+    try:
+        precompute_embeddings(read_reference_answers(dataset))
+    except Exception as e:
+        print(f"Не удалось подготовить эмбеддинги эталонов {dataset.file_path}: {str(e)}")
 
 
 def calculate_rouge_score(reference, candidate):
-    def lcs_length(seq1, seq2):
-        m, n = len(seq1), len(seq2)
-        dp = [[0] * (n + 1) for _ in range(m + 1)]
-
-        for i in range(1, m + 1):
-            for j in range(1, n + 1):
-                if seq1[i - 1] == seq2[j - 1]:
-                    dp[i][j] = dp[i - 1][j - 1] + 1
-                else:
-                    dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
-
-        return dp[m][n]
-
-    ref_tokens = re.findall(r'\w+', reference.lower())
-    cand_tokens = re.findall(r'\w+', candidate.lower())
-
-    if not ref_tokens or not cand_tokens:
-        return 0.0
-
-    lcs_len = lcs_length(ref_tokens, cand_tokens)
-
-    if lcs_len == 0:
-        return 0.0
-
-    precision = lcs_len / len(cand_tokens)
-    recall = lcs_len / len(ref_tokens)
-
-    if precision + recall == 0:
-        return 0.0
-
-    f1_score = 2 * precision * recall / (precision + recall)
-    return f1_score
+    """ROUGE-L F1 эталона и ответа; LCS считается бит-параллельным алгоритмом."""
+    return rouge_l_f1(tokenize(reference), tokenize(candidate))
 
 
 def calculate_semantic_similarity(reference, candidate):
@@ -291,37 +318,17 @@ def calculate_semantic_similarity(reference, candidate):
     :param candidate: сгенерированный моделью ответ
     :return: значение от 0 до 1, где 1 означает максимальное семантическое сходство
     """
-    if not reference or not candidate:
-        return 0.0
-
-    try:
-        global _semantic_model
+    return calculate_semantic_similarities([reference], [candidate])[0]
 
-        if _semantic_model is None:
-            _semantic_model = SentenceTransformer(_semantic_model_name)
 
-        embeddings = _semantic_model.encode([reference, candidate])
-        ref_vec, cand_vec = embeddings[0], embeddings[1]
-
-        dot = float(np.dot(ref_vec, cand_vec))
-        norm_ref = float(np.linalg.norm(ref_vec))
-        norm_cand = float(np.linalg.norm(cand_vec))
-
-        if norm_ref == 0.0 or norm_cand == 0.0:
-            return 0.0
-
-        sim = dot / (norm_ref * norm_cand)
-
-        score = (sim + 1.0) / 2.0
-    except Exception:
-        score = 0.0
-
-    if score < 0.0:
-        score = 0.0
-    elif score > 1.0:
-        score = 1.0
+def calculate_semantic_similarities(references, candidates):
+    """
+    Пакетный вариант calculate_semantic_similarity для списков пар.
 
-    return score
+    Все тексты кодируются одним вызовом модели, сходство всех пар
+    считается одной матричной операцией.
+    """
+    return score_pairs_safely(scoring_backend.semantic.similarity, references, candidates)
 
 
 def calculate_bert_score(reference, candidate):
@@ -332,38 +339,17 @@ def calculate_bert_score(reference, candidate):
     :param candidate: сгенерированный моделью ответ
     :return: значение метрики от 0 до 1, где 1 — максимальное сходство
     """
-    if not reference or not candidate:
-        return 0.0
+    return calculate_bert_scores([reference], [candidate])[0]
 
-    try:
-        # bert-score работает пакетно, поэтому оборачиваем строки в списки
-        P = [candidate]
-        R = [reference]
-
-        global _bert_model_initialized
-        P_scores, R_scores, F1_scores = bert_score(
-            P,
-            R,
-            model_type=_bert_model_type,
-            lang=_bert_model_lang,
-            rescale_with_baseline=True,
-        )
-        _bert_model_initialized = True
-        score = float(F1_scores[0])
-    except Exception:
-        score = 0.0
-
-    # Подстраховка: ограничиваем результат диапазоном [0, 1]
-    if score < 0.0:
-        score = 0.0
-    elif score > 1.0:
-        score = 1.0
-
-    return score
-
-
-def generate_metrics_comparison_data(selected_models, selected_datasets, metrics_config):
-    dataset_result = load_prompts_from_datasets(selected_datasets)
+
+def calculate_bert_scores(references, candidates):
+    """Пакетный вариант calculate_bert_score: все пары оцениваются пакетами одной модели."""
+    return score_pairs_safely(scoring_backend.bert_score.score, references, candidates)
+
+
+def generate_metrics_comparison_data(selected_models, selected_datasets, metrics_config, cache_mode=CACHE_MODE_USE,
+                                     scoring_mode=SCORING_MODE_FULL, sampling=None):
+    dataset_result = load_prompts_from_datasets(selected_datasets, sampling, require_reference=True)
     if dataset_result['error']:
         return {'error': dataset_result['error']}
 
@@ -375,78 +361,159 @@ def generate_metrics_comparison_data(selected_models, selected_datasets, metrics
         return {
             'error': f'В выбранных датасетах не найдено промптов с эталонными ответами. Всего промптов: {len(prompts)}. Убедитесь, что CSV файлы содержат колонки с промптами и эталонными ответами.'}
 
-    selected_prompts = prompts_with_reference[:10]
+    selected_prompts = prompts_with_reference
 
-    rouge_weight = metrics_config.get('rouge', {}).get('weight', 0.4)
-    semantic_weight = metrics_config.get('semantic', {}).get('weight', 0.3)
-    bert_weight = metrics_config.get('bertScore', {}).get('weight', 0.3)
+    # Метрики с нулевым весом не считаются; в каскадном режиме трансформерные
+    # метрики считаются только для пар, от которых зависит порядок моделей
+    plan = MetricPlan(metrics_config, scoring_mode)
 
-    model_results = []
+    models_data = [get_model_call_info(model) for model in selected_models]
+    jobs = [
+        (prompt_data, model_data)
+        for model_data in models_data
+        for prompt_data in selected_prompts
+    ]
+
+    timers = {
+        'semantic': ScoringTimer(scoring_backend.semantic),
+        'bertScore': ScoringTimer(scoring_backend.bert_score)
+    }
+    transformer_scorers = {
+        'semantic': calculate_semantic_similarities,
+        'bertScore': calculate_bert_scores
+    }
 
-    for model in selected_models:
-        model_data = {
-            'id': model['id'],
-            'name': model['name'],
-            'api_url': model['api_url'],
-            'api_key': model['api_key']
+    def score_transformer(references, candidates):
+        scores_by_metric = {
+            metric: timers[metric].measure(transformer_scorers[metric], references, candidates)
+            for metric in plan.transformer_metrics
         }
+        return [
+            {metric: values[i] for metric, values in scores_by_metric.items()}
+            for i in range(len(references))
+        ]
+
+    def score_batch(references, candidates):
+        # Лексические метрики микропакета считаются за один проход с общей токенизацией
+        pair_scores = score_lexical_batch(references, candidates, plan.lexical_metrics)
+        if not plan.cascade:
+            for scores, transformer_scores in zip(pair_scores, score_transformer(references, candidates)):
+                scores.update(transformer_scores)
+        return pair_scores
+
+    # Готовые ответы оцениваются микропакетами, пока остальные запросы к моделям
+    # ещё выполняются, а не после получения всех ответов запуска. Наибольший
+    # микропакет не меньше пакета модели метрики, чтобы не дробить её вызовы
+    pipeline = ScoringPipeline(score_batch, min_batch_size=max(
+        (getattr(timers[metric].model, 'batch_size', 0) for metric in plan.transformer_metrics), default=0))
+    results = [None] * len(jobs)
+    try:
+        for index, result in iter_model_responses(
+                [(prompt_data['prompt'], model_data) for prompt_data, model_data in jobs], cache_mode):
+            results[index] = result
+            if result.ok:
+                pipeline.put(index, jobs[index][0]['reference_answer'], result.content)
+    finally:
+        # Поток оценки завершается и при ошибке генерации, иначе он ждал бы очередь вечно
+        pipeline.close()
+    scores = pipeline.finish()
+
+    score_bounds = {}
+    transformer_pairs = len(scores) if plan.transformer_metrics else 0
+    if plan.cascade:
+        pairs_by_model = {model_data['id']: [] for model_data in models_data}
+        for index, (prompt_data, model_data) in enumerate(jobs):
+            if index in scores:
+                pairs_by_model[model_data['id']].append(
+                    (index, prompt_data['reference_answer'], results[index].content))
+        score_bounds, transformer_pairs = cascade_transformer_scores(
+            plan, scores, pairs_by_model, score_transformer, pipeline.micro_batch_size)
+
+    responses = iter(zip(results, [scores.get(index) for index in range(len(results))]))
 
+    model_results = []
+
+    for model_data in models_data:
         model_scores = []
         model_responses = []
+        model_call_results = []
+        failed_responses = 0
+        skipped_responses = 0
 
         for prompt_data in selected_prompts:
             prompt = prompt_data['prompt']
             reference_answer = prompt_data['reference_answer']
+            result, pair_scores = next(responses)
+            model_call_results.append(result)
+            model_response = result.content
 
-            try:
-                model_response = call_model_api(prompt, model_data)
-            except Exception as e:
-                model_response = f"Ошибка получения ответа: {str(e)}"
-
-            rouge_score = calculate_rouge_score(reference_answer, model_response)
-            semantic_score = calculate_semantic_similarity(reference_answer, model_response)
-            bert_score = calculate_bert_score(reference_answer, model_response)
-
-            rouge_norm = max(0, min(1, rouge_score))
-            semantic_norm = max(0, min(1, semantic_score))
-            bert_norm = max(0, min(1, bert_score))
-
-            weighted_score = (
-                                     rouge_norm * rouge_weight +
-                                     semantic_norm * semantic_weight +
-                                     bert_norm * bert_weight
-                             ) * 10
+            if result.ok:
+                weighted_score = plan.weighted_score(pair_scores)
+                model_scores.append(weighted_score)
+            else:
+                # Текст ошибки или пропуска не является ответом модели и не оценивается метриками
+                pair_scores = dict.fromkeys(plan.lexical_metrics + plan.transformer_metrics, 0.0)
+                weighted_score = 0.0
+                if result.skipped:
+                    skipped_responses += 1
+                else:
+                    failed_responses += 1
+
+            metrics = {}
+            for metric, norm_key in (('rouge', 'rouge_norm'), ('semantic', 'semantic_norm'), ('bertScore', 'bert_norm')):
+                # Несчитанная метрика (нулевой вес или каскад) возвращается как None
+                value = pair_scores.get(metric)
+                metrics[metric] = round(value, 3) if value is not None else None
+                metrics[norm_key] = round(max(0, min(1, value)), 3) if value is not None else None
+            metrics.update({
+                metric: round(pair_scores[metric], 3)
+                for metric in plan.lexical_metrics if metric != 'rouge'
+            })
 
-            model_scores.append(weighted_score)
-            model_responses.append({
+            response_data = {
                 'promptId': prompt_data['id'],
                 'prompt': prompt,
                 'modelResponse': model_response,
                 'referenceAnswer': reference_answer,
+                'status': result.status,
+                'latency': result.timings(),
                 'weightedScore': round(weighted_score, 2),
-                'metrics': {
-                    'rouge': round(rouge_score, 3),
-                    'semantic': round(semantic_score, 3),
-                    'bertScore': round(bert_score, 3),
-                    'rouge_norm': round(rouge_norm, 3),
-                    'semantic_norm': round(semantic_norm, 3),
-                    'bert_norm': round(bert_norm, 3)
-                },
+                'metrics': metrics,
                 'category': prompt_data['category'],
                 'source_info': {
                     'dataset': prompt_data.get('source_dataset', 'Неизвестный датасет'),
                     'file': prompt_data.get('source_file', 'Неизвестный файл')
                 }
-            })
-
-        avg_score = sum(model_scores) / len(model_scores) if model_scores else 0
+            }
+            if plan.cascade and result.ok:
+                low, high = plan.score_bounds(pair_scores)
+                response_data['partial'] = high > low
+            model_responses.append(response_data)
+
+        if model_data['id'] in score_bounds:
+            # В каскадном режиме средняя оценка известна с точностью до интервала;
+            # порядок моделей по середине интервала совпадает с порядком при полном расчёте
+            low, high = score_bounds[model_data['id']]
+            avg_score = (low + high) / 2
+        else:
+            avg_score = sum(model_scores) / len(model_scores) if model_scores else 0
 
-        model_results.append({
+        model_result = {
             'id': model_data['id'],
             'name': model_data['name'],
             'averageScore': round(avg_score, 2),
+            'failedResponses': failed_responses,
+            'skippedResponses': skipped_responses,
+            'callStats': summarize_call_stats(model_call_results),
+            'latencyStats': summarize_latency(model_call_results),
             'responses': model_responses
-        })
+        }
+        if model_data['id'] in score_bounds:
+            low, high = score_bounds[model_data['id']]
+            model_result['scoreBounds'] = [round(low, 2), round(high, 2)]
+            # Середина интервала — не измеренная средняя оценка, а её приближение
+            model_result['averageScoreEstimated'] = high > low
+        model_results.append(model_result)
 
     model_results.sort(key=lambda x: x['averageScore'], reverse=True)
 
@@ -454,16 +521,26 @@ def generate_metrics_comparison_data(selected_models, selected_datasets, metrics
         'models': model_results,
         'totalPrompts': len(selected_prompts),
         'metricsWeights': {
-            'rouge': rouge_weight,
-            'semantic': semantic_weight,
-            'bertScore': bert_weight
+            'rouge': plan.weights['rouge'],
+            'semantic': plan.weights['semantic'],
+            'bertScore': plan.weights['bertScore'],
+            **{metric: plan.weights[metric] for metric in plan.lexical_metrics if metric != 'rouge'}
+        },
+        'scoringPlan': {
+            **plan.to_dict(),
+            'totalPairs': len(scores),
+            'transformerPairs': transformer_pairs
         },
+        'scoringTimings': {metric: timers[metric].to_dict() for metric in plan.transformer_metrics},
+        'scoringPipeline': pipeline.stats(),
+        'completionCache': summarize_completion_cache(results, cache_mode),
         'datasetsUsed': list(set([prompt.get('source_dataset', 'Неизвестный датасет') for prompt in selected_prompts]))
     }
 
 
-def generate_reference_comparison_data(selected_models, judge_model_id, selected_datasets):
-    dataset_result = load_prompts_from_datasets(selected_datasets)
+def generate_reference_comparison_data(selected_models, judge_model_id, selected_datasets, cache_mode=CACHE_MODE_USE,
+                                       sampling=None):
+    dataset_result = load_prompts_from_datasets(selected_datasets, sampling, require_reference=True)
     if dataset_result['error']:
         return {'error': dataset_result['error']}
 
@@ -490,49 +567,82 @@ def generate_reference_comparison_data(selected_models, judge_model_id, selected
             'id': judge_model_id,
             'name': judge_model.name,
             'api_url': judge_model.api_integration.api_url,
-            'api_key': judge_model.api_integration.api_key
+            'api_key': judge_model.api_integration.api_key,
+            'api_integration': judge_model.to_dict()['api_integration']
         }
     else:
         return {'error': 'Неверный ID модели-судьи'}
 
-    model_results = []
-
-    for model in selected_models:
-        model_data = {
-            'id': model['id'],
-            'name': model['name'],
-            'api_url': model['api_url'],
-            'api_key': model['api_key']
+    models_data = [get_model_call_info(model) for model in selected_models]
+    jobs = [
+        (prompt_data, model_data)
+        for model_data in models_data
+        for prompt_data in selected_prompts
+    ]
+    results = fetch_model_responses(
+        [(prompt_data['prompt'], model_data) for prompt_data, model_data in jobs],
+        cache_mode
+    )
+
+    # Судья оценивает только успешно полученные ответы
+    evaluated = iter(execution_engine.map(
+        lambda args: evaluate_against_reference(*args, judge_info, cache_mode),
+        [
+            (prompt_data['prompt'], result.content, prompt_data['reference_answer'], model_data['name'])
+            for (prompt_data, model_data), result in zip(jobs, results)
+            if result.ok
+        ],
+        model_of=lambda args: judge_info
+    ))
+    evaluations = iter([
+        next(evaluated) if result.ok else {
+            'score': None,
+            'reasoning': f'Ответ модели не получен, оценка не проводилась: {result.content}',
+            'judge_status': 'skipped'
         }
+        for result in results
+    ])
+    responses = iter(results)
+
+    model_results = []
 
+    for model_data in models_data:
         model_scores = []
         model_responses = []
+        model_call_results = []
+        failed_responses = 0
+        skipped_responses = 0
+        judge_failures = 0
 
         for prompt_data in selected_prompts:
             prompt = prompt_data['prompt']
             reference_answer = prompt_data['reference_answer']
+            result = next(responses)
+            model_call_results.append(result)
+            model_response = result.content
+            evaluation = next(evaluations)
+            judge_status = evaluation.get('judge_status', 'ok')
+
+            if result.ok and judge_status == 'ok':
+                model_scores.append(evaluation['score'])
+            elif result.ok:
+                # Судья не ответил: это не нулевая оценка модели, в среднее она не входит
+                judge_failures += 1
+            elif result.skipped:
+                skipped_responses += 1
+            else:
+                failed_responses += 1
 
-            try:
-                model_response = call_model_api(prompt, model_data)
-            except Exception as e:
-                model_response = f"Ошибка получения ответа: {str(e)}"
-
-            evaluation = evaluate_against_reference(
-                prompt,
-                model_response,
-                reference_answer,
-                model_data['name'],
-                judge_info
-            )
-
-            model_scores.append(evaluation['score'])
             model_responses.append({
                 'promptId': prompt_data['id'],
                 'prompt': prompt,
                 'modelResponse': model_response,
                 'referenceAnswer': reference_answer,
+                'status': result.status,
+                'latency': result.timings(),
                 'score': evaluation['score'],
                 'reasoning': evaluation['reasoning'],
+                'judgeStatus': judge_status,
                 'category': prompt_data['category'],
                 'source_info': {
                     'dataset': prompt_data.get('source_dataset', 'Неизвестный датасет'),
@@ -546,6 +656,11 @@ def generate_reference_comparison_data(selected_models, judge_model_id, selected
             'id': model_data['id'],
             'name': model_data['name'],
             'averageScore': round(avg_score, 2),
+            'failedResponses': failed_responses,
+            'skippedResponses': skipped_responses,
+            'judgeFailures': judge_failures,
+            'callStats': summarize_call_stats(model_call_results),
+            'latencyStats': summarize_latency(model_call_results),
             'responses': model_responses
         })
 
@@ -555,12 +670,14 @@ def generate_reference_comparison_data(selected_models, judge_model_id, selected
         'models': model_results,
         'totalPrompts': len(selected_prompts),
         'judgeModel': judge_info['name'],
+        'completionCache': summarize_completion_cache(results, cache_mode),
         'datasetsUsed': list(set([prompt.get('source_dataset', 'Неизвестный датасет') for prompt in selected_prompts]))
     }
 
 
-def generate_judge_eval_data(selected_models, judge_model_id, selected_datasets):
-    dataset_result = load_prompts_from_datasets(selected_datasets)
+def generate_judge_eval_data(selected_models, judge_model_id, selected_datasets, cache_mode=CACHE_MODE_USE,
+                             sampling=None):
+    dataset_result = load_prompts_from_datasets(selected_datasets, sampling)
     if dataset_result['error']:
         return {'error': dataset_result['error']}
 
@@ -584,45 +701,48 @@ def generate_judge_eval_data(selected_models, judge_model_id, selected_datasets)
             'id': judge_model_id,
             'name': judge_model.name,
             'api_url': judge_model.api_integration.api_url,
-            'api_key': judge_model.api_integration.api_key
+            'api_key': judge_model.api_integration.api_key,
+            'api_integration': judge_model.to_dict()['api_integration']
         }
     else:
         return {'error': 'Неверный ID модели-судьи'}
 
+    model_info = [get_model_call_info(model) for model in selected_models[:2]]
+    criteria = ['accuracy', 'helpfulness', 'clarity']
+
+    results = fetch_model_responses([
+        (prompt_data['prompt'], model_data)
+        for prompt_data in selected_prompts
+        for model_data in model_info
+    ], cache_mode)
+    result_pairs = [results[i:i + 2] for i in range(0, len(results), 2)]
+
+    # Судья сравнивает пару, только если обе модели вернули ответ
+    evaluated = iter(execution_engine.map(
+        lambda args: evaluate_responses_with_judge(*args, criteria, judge_info, cache_mode),
+        [
+            (prompt_data['prompt'], pair[0].content, pair[1].content, model_info[0]['name'], model_info[1]['name'])
+            for prompt_data, pair in zip(selected_prompts, result_pairs)
+            if pair[0].ok and pair[1].ok
+        ],
+        model_of=lambda args: judge_info
+    ))
+    evaluations = [
+        next(evaluated) if pair[0].ok and pair[1].ok else {
+            'model1_score': None,
+            'model2_score': None,
+            'winner': 'Невозможно определить',
+            'reasoning': 'Не удалось получить ответы обеих моделей, оценка не проводилась',
+            'criteria_scores': {},
+            'judge_status': 'skipped'
+        }
+        for pair in result_pairs
+    ]
+
     eval_pairs = []
-    for prompt_data in selected_prompts:
+    for prompt_data, pair, evaluation in zip(selected_prompts, result_pairs, evaluations):
         prompt = prompt_data['prompt']
 
-        responses = []
-        model_info = []
-
-        for i in range(2):
-            model = selected_models[i]
-            model_data = {
-                'id': model['id'],
-                'name': model['name'],
-                'api_url': model['api_url'],
-                'api_key': model['api_key']
-            }
-            model_info.append(model_data)
-
-            try:
-                response = call_model_api(prompt, model_data)
-            except Exception as e:
-                response = f"Ошибка получения ответа: {str(e)}"
-            responses.append(response)
-
-        criteria = ['accuracy', 'helpfulness', 'clarity']
-        evaluation = evaluate_responses_with_judge(
-            prompt,
-            responses[0],
-            responses[1],
-            model_info[0]['name'],
-            model_info[1]['name'],
-            criteria,
-            judge_info
-        )
-
         pair = {
             'promptId': prompt_data['id'],
             'prompt': prompt,
@@ -636,13 +756,17 @@ def generate_judge_eval_data(selected_models, judge_model_id, selected_datasets)
                 {
                     'modelId': model_info[0]['id'],
                     'modelName': model_info[0]['name'],
-                    'response': responses[0],
+                    'response': pair[0].content,
+                    'status': pair[0].status,
+                    'latency': pair[0].timings(),
                     'score': evaluation['model1_score']
                 },
                 {
                     'modelId': model_info[1]['id'],
                     'modelName': model_info[1]['name'],
-                    'response': responses[1],
+                    'response': pair[1].content,
+                    'status': pair[1].status,
+                    'latency': pair[1].timings(),
                     'score': evaluation['model2_score']
                 }
             ],
@@ -650,13 +774,16 @@ def generate_judge_eval_data(selected_models, judge_model_id, selected_datasets)
                 'winner': evaluation['winner'],
                 'reasoning': evaluation['reasoning'],
                 'criteria_scores': evaluation['criteria_scores'],
-                'judge_model': judge_info['name']
+                'judge_model': judge_info['name'],
+                'status': evaluation.get('judge_status', 'ok')
             }
         }
         eval_pairs.append(pair)
 
-    model1_total = sum(pair['responses'][0]['score'] for pair in eval_pairs)
-    model2_total = sum(pair['responses'][1]['score'] for pair in eval_pairs)
+    # Пары без оценки судьи (нет ответа модели или судьи) в суммы не входят
+    evaluated_pairs = [pair for pair in eval_pairs if pair['evaluation']['status'] == 'ok']
+    model1_total = sum(pair['responses'][0]['score'] for pair in evaluated_pairs)
+    model2_total = sum(pair['responses'][1]['score'] for pair in evaluated_pairs)
     model1_wins = sum(1 for pair in eval_pairs if pair['evaluation']['winner'] == model_info[0]['name'])
     model2_wins = sum(1 for pair in eval_pairs if pair['evaluation']['winner'] == model_info[1]['name'])
 
@@ -666,24 +793,32 @@ def generate_judge_eval_data(selected_models, judge_model_id, selected_datasets)
                 'id': model_info[0]['id'],
                 'name': model_info[0]['name'],
                 'totalScore': model1_total,
-                'wins': model1_wins
+                'wins': model1_wins,
+                'callStats': summarize_call_stats(results[0::2]),
+                'latencyStats': summarize_latency(results[0::2])
             },
             {
                 'id': model_info[1]['id'],
                 'name': model_info[1]['name'],
                 'totalScore': model2_total,
-                'wins': model2_wins
+                'wins': model2_wins,
+                'callStats': summarize_call_stats(results[1::2]),
+                'latencyStats': summarize_latency(results[1::2])
             }
         ],
         'evalPairs': eval_pairs,
         'totalPrompts': len(selected_prompts),
+        'evaluatedPrompts': len(evaluated_pairs),
+        'judgeFailures': sum(1 for pair, evaluation in zip(result_pairs, evaluations)
+                             if pair[0].ok and pair[1].ok and evaluation.get('judge_status', 'ok') != 'ok'),
         'judgeModel': judge_info['name'],
+        'completionCache': summarize_completion_cache(results, cache_mode),
         'datasetsUsed': list(set([prompt.get('source_dataset', 'Неизвестный датасет') for prompt in selected_prompts]))
     }
 
 
-def generate_blind_test_data(selected_models, selected_datasets):
-    dataset_result = load_prompts_from_datasets(selected_datasets)
+def generate_blind_test_data(selected_models, selected_datasets, cache_mode=CACHE_MODE_USE, sampling=None):
+    dataset_result = load_prompts_from_datasets(selected_datasets, sampling)
     if dataset_result['error']:
         return {'error': dataset_result['error']}
 
@@ -694,29 +829,26 @@ def generate_blind_test_data(selected_models, selected_datasets):
 
     selected_prompts = prompts
 
-    model_info = []
-    for model in selected_models:
-        model_info.append({
-            'id': model['id'],
-            'name': model['name'],
-            'api_url': model['api_url'],
-            'api_key': model['api_key']
-        })
+    model_info = [get_model_call_info(model) for model in selected_models]
 
-    test_pairs = []
-    for prompt in selected_prompts:
+    model_orders = []
+    for _ in selected_prompts:
         model_order = list(range(2))
         random.shuffle(model_order)
+        model_orders.append(model_order)
+
+    results = fetch_model_responses([
+        (prompt['prompt'], model_info[model_idx])
+        for prompt, model_order in zip(selected_prompts, model_orders)
+        for model_idx in model_order
+    ], cache_mode)
 
-        responses = []
-        for i in range(2):
-            model_idx = model_order[i]
-            try:
-                response = call_model_api(prompt['prompt'], model_info[model_idx])
-            except Exception as e:
-                response = f"Ошибка получения ответа: {str(e)}"
-            responses.append(response)
+    results_by_model = [[], []]
+    for model_idx, result in zip((idx for order in model_orders for idx in order), results):
+        results_by_model[model_idx].append(result)
 
+    test_pairs = []
+    for i, (prompt, model_order) in enumerate(zip(selected_prompts, model_orders)):
         pair = {
             'promptId': prompt['id'],
             'prompt': prompt['prompt'],
@@ -729,13 +861,17 @@ def generate_blind_test_data(selected_models, selected_datasets):
                 {
                     'position': 'A',
                     'modelIndex': model_order[0],
-                    'response': responses[0],
+                    'response': results[2 * i].content,
+                    'status': results[2 * i].status,
+                    'latency': results[2 * i].timings(),
                     'votes': 0
                 },
                 {
                     'position': 'B',
                     'modelIndex': model_order[1],
-                    'response': responses[1],
+                    'response': results[2 * i + 1].content,
+                    'status': results[2 * i + 1].status,
+                    'latency': results[2 * i + 1].timings(),
                     'votes': 0
                 }
             ],
@@ -746,17 +882,49 @@ def generate_blind_test_data(selected_models, selected_datasets):
 
     return {
         'models': [
-            {'name': model_info[0]['name'], 'id': model_info[0]['id'], 'totalVotes': 0},
-            {'name': model_info[1]['name'], 'id': model_info[1]['id'], 'totalVotes': 0}
+            {'name': model_info[0]['name'], 'id': model_info[0]['id'], 'totalVotes': 0,
+             'callStats': summarize_call_stats(results_by_model[0]),
+             'latencyStats': summarize_latency(results_by_model[0])},
+            {'name': model_info[1]['name'], 'id': model_info[1]['id'], 'totalVotes': 0,
+             'callStats': summarize_call_stats(results_by_model[1]),
+             'latencyStats': summarize_latency(results_by_model[1])}
         ],
         'testPairs': test_pairs,
         'completedVotes': 0,
         'totalPairs': len(selected_prompts),
+        'completionCache': summarize_completion_cache(results, cache_mode),
         'datasetsUsed': list(set([prompt.get('source_dataset', 'Неизвестный датасет') for prompt in selected_prompts]))
     }
 
 
-def evaluate_against_reference(prompt, model_response, reference_answer, model_name, judge_info):
+def generate_performance_data(selected_models, selected_datasets, performance_config, sampling=None):
+    dataset_result = load_prompts_from_datasets(selected_datasets, sampling)
+    if dataset_result['error']:
+        return {'error': dataset_result['error']}
+
+    prompts = dataset_result['prompts']
+
+    if not prompts:
+        return {'error': 'В выбранных датасетах не найдено подходящих промптов'}
+
+    messages_list = [assistant_messages(prompt_data['prompt']) for prompt_data in prompts]
+
+    # Модели нагружаются по очереди, чтобы не влиять на результаты друг друга
+    model_results = [
+        run_load_test(get_model_call_info(model), messages_list, performance_config)
+        for model in selected_models
+    ]
+
+    return {
+        'models': model_results,
+        'config': performance_config.to_dict(),
+        'totalPrompts': len(prompts),
+        'datasetsUsed': list(set([prompt.get('source_dataset', 'Неизвестный датасет') for prompt in prompts]))
+    }
+
+
+def evaluate_against_reference(prompt, model_response, reference_answer, model_name, judge_info,
+                               cache_mode=CACHE_MODE_USE):
     try:
         system_prompt = f"""Вы эксперт по оценке качества ответов ИИ. Ваша задача - оценить, насколько хорошо ответ модели соответствует эталонному ответу.
 
@@ -786,7 +954,14 @@ def evaluate_against_reference(prompt, model_response, reference_answer, model_n
 
 Пожалуйста, оцените соответствие ответа модели эталонному ответу."""
 
-        judge_response = call_model_api_with_system(user_prompt, judge_info, system_prompt)
+        judge_result = call_model_api_with_system(user_prompt, judge_info, system_prompt, cache_mode)
+        if not judge_result.ok:
+            return {
+                "score": None,
+                "reasoning": f"Модель-судья не ответила, оценка не проводилась: {judge_result.content}",
+                "judge_status": judge_result.status
+            }
+        judge_response = judge_result.content
 
         try:
             json_match = re.search(r'\{.*\}', judge_response, re.DOTALL)
@@ -821,12 +996,14 @@ def evaluate_against_reference(prompt, model_response, reference_answer, model_n
 
     except Exception as e:
         return {
-            "score": 0.0,
-            "reasoning": f"Ошибка при получении оценки от модели-судьи: {str(e)}"
+            "score": None,
+            "reasoning": f"Ошибка при получении оценки от модели-судьи: {str(e)}",
+            "judge_status": "error"
         }
 
 
-def evaluate_responses_with_judge(prompt, response1, response2, model1_name, model2_name, criteria, judge_info):
+def evaluate_responses_with_judge(prompt, response1, response2, model1_name, model2_name, criteria, judge_info,
+                                  cache_mode=CACHE_MODE_USE):
     try:
         criteria_str = ", ".join(criteria)
 
@@ -860,7 +1037,17 @@ def evaluate_responses_with_judge(prompt, response1, response2, model1_name, mod
 
 Пожалуйста, оцените эти ответы согласно указанным критериям и формату."""
 
-        judge_response = call_model_api_with_system(user_prompt, judge_info, system_prompt)
+        judge_result = call_model_api_with_system(user_prompt, judge_info, system_prompt, cache_mode)
+        if not judge_result.ok:
+            return {
+                "model1_score": None,
+                "model2_score": None,
+                "winner": "Невозможно определить",
+                "reasoning": f"Модель-судья не ответила, оценка не проводилась: {judge_result.content}",
+                "criteria_scores": {},
+                "judge_status": judge_result.status
+            }
+        judge_response = judge_result.content
 
         try:
             json_match = re.search(r'\{.*\}', judge_response, re.DOTALL)
@@ -929,11 +1116,12 @@ def evaluate_responses_with_judge(prompt, response1, response2, model1_name, mod
 
     except Exception as e:
         return {
-            "model1_score": 0.0,
-            "model2_score": 0.0,
+            "model1_score": None,
+            "model2_score": None,
             "winner": "Ошибка оценки",
             "reasoning": f"Ошибка при получении оценки от модели-судьи: {str(e)}",
-            "criteria_scores": {}
+            "criteria_scores": {},
+            "judge_status": "error"
         }
 
 
@@ -962,95 +1150,29 @@ def reveal_blind_test_models(test_data):
     return test_data
 
 
-def call_model_api(prompt, model_info):
-    try:
-        headers = {
-            'Content-Type': 'application/json'
-        }
-
-        if model_info.get('api_key'):
-            headers['Authorization'] = f'Bearer {model_info["api_key"]}'
-
-        payload = {
-            'model': model_info.get('name', 'default'),
-            'messages': [
-                {"role": "system", "content": "Вы очень полезный помощник. Отвечайте на вопросы кратко и по делу."},
-                {"role": "user", "content": prompt}
-            ],
-            'max_tokens': 500,
-            'temperature': 0.7
-        }
-
-        response = requests.post(
-            f"{model_info['api_url'].rstrip('/')}/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
-
-        if response.status_code == 200:
-            response_data = response.json()
-
-            if 'choices' in response_data and len(response_data['choices']) > 0:
-                if 'message' in response_data['choices'][0]:
-                    content = response_data['choices'][0]['message'].get('content', 'Нет ответа')
-                elif 'text' in response_data['choices'][0]:
-                    content = response_data['choices'][0]['text']
-                else:
-                    content = "Не удалось извлечь ответ из API"
-
-                return clean_model_response(content)
-            else:
-                return "Не удалось извлечь ответ из API"
-        else:
-            return f"Ошибка API: HTTP {response.status_code}"
-
-    except Exception as e:
-        return f"Ошибка генерации ответа: {str(e)}"
-
+def assistant_messages(prompt):
+    """Сообщения запроса к тестируемой модели с системным промптом ассистента."""
+    return [
+        {"role": "system", "content": "Вы очень полезный помощник. Отвечайте на вопросы кратко и по делу."},
+        {"role": "user", "content": prompt}
+    ]
 
-def call_model_api_with_system(prompt, model_info, system_prompt):
-    try:
-        headers = {
-            'Content-Type': 'application/json'
-        }
 
-        if model_info.get('api_key'):
-            headers['Authorization'] = f'Bearer {model_info["api_key"]}'
+def call_model_api_detailed(prompt, model_info, cache_mode=CACHE_MODE_USE):
+    """Запрашивает ответ тестируемой модели и возвращает CompletionResult."""
+    return request_chat_completion(model_info, assistant_messages(prompt), max_tokens=500, temperature=0.7, timeout=30,
+                                   cache_mode=cache_mode)
 
-        payload = {
-            'model': model_info.get('name', 'default'),
-            'messages': [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            'max_tokens': 1000,
-            'temperature': 0.3
-        }
 
-        response = requests.post(
-            f"{model_info['api_url'].rstrip('/')}/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=60
-        )
-
-        if response.status_code == 200:
-            response_data = response.json()
-
-            if 'choices' in response_data and len(response_data['choices']) > 0:
-                if 'message' in response_data['choices'][0]:
-                    content = response_data['choices'][0]['message'].get('content', 'Нет ответа')
-                elif 'text' in response_data['choices'][0]:
-                    content = response_data['choices'][0]['text']
-                else:
-                    content = "Не удалось извлечь ответ из API"
+def call_model_api(prompt, model_info, cache_mode=CACHE_MODE_USE):
+    return call_model_api_detailed(prompt, model_info, cache_mode).content
 
-                return clean_model_response(content)
-            else:
-                return "Не удалось извлечь ответ из API"
-        else:
-            return f"Ошибка API: HTTP {response.status_code}"
 
-    except Exception as e:
-        return f"Ошибка генерации ответа: {str(e)}"
+def call_model_api_with_system(prompt, model_info, system_prompt, cache_mode=CACHE_MODE_USE):
+    """Запрос к модели-судье; возвращает CompletionResult, чтобы отказ API не разбирался как ответ судьи."""
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+    return request_chat_completion(model_info, messages, max_tokens=1000, temperature=0.3, timeout=60,
+                                   cache_mode=cache_mode)
@@ -0,0 +1,132 @@
+import threading
+import time
+
+from app.services.execution_engine import integration_key
+
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+def is_endpoint_failure(result):
+    """
+    Говорит ли результат о недоступности API: сетевая ошибка, тайм-аут или 5xx.
+
+    Ответы 429 означают перегрузку, а не отказ, и учитываются ограничителем
+    запросов; ошибки клиента 4xx тоже не размыкают цепь.
+    """
+    if result.ok:
+        return False
+    return result.status_code is None or 500 <= result.status_code < 600
+
+
+class CircuitBreaker:
+    """
+    Предохранитель одной API интеграции.
+
+    В состоянии closed запросы проходят, а после failure_threshold отказов
+    подряд цепь размыкается (open) и запросы сразу отклоняются. Через
+    reset_timeout секунд цепь переходит в half_open и пропускает один пробный
+    запрос: успех замыкает цепь, отказ снова размыкает её. Остальные запросы
+    ждут исхода пробного, а не отклоняются, чтобы восстановившийся API не терял
+    уже поставленные в очередь промпты.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self._condition = threading.Condition()
+
+    def allow(self):
+        """Можно ли отправить запрос; в half_open пропускает только один пробный запрос."""
+        with self._condition:
+            while self.state == STATE_HALF_OPEN and self.probe_in_flight:
+                self._condition.wait()
+
+            if self.state == STATE_OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = STATE_HALF_OPEN
+
+            if self.state == STATE_HALF_OPEN:
+                self.probe_in_flight = True
+            return True
+
+    def record(self, result):
+        """Учитывает результат запроса, пропущенного через allow()."""
+        failed = is_endpoint_failure(result)
+        with self._condition:
+            if self.state == STATE_HALF_OPEN:
+                self.probe_in_flight = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = STATE_CLOSED
+                    self.failures = 0
+                self._condition.notify_all()
+                return
+
+            # Ответы запросов, отправленных до размыкания, состояние не меняют
+            if self.state == STATE_OPEN:
+                return
+
+            if not failed:
+                self.failures = 0
+                return
+
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = STATE_OPEN
+        self.opened_at = time.monotonic()
+        self.failures = 0
+
+    def snapshot(self):
+        """Текущее состояние предохранителя для диагностики."""
+        with self._condition:
+            retry_in = self.reset_timeout - (time.monotonic() - self.opened_at) if self.state == STATE_OPEN else 0
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'retry_in': round(max(0.0, retry_in), 2)
+            }
+
+
+class CircuitBreakerRegistry:
+    """Предохранители по API интеграциям, общие для всех запусков в процессе."""
+
+    def __init__(self, enabled=True, failure_threshold=5, reset_timeout=30.0):
+        self.enabled = enabled
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('CIRCUIT_BREAKER_ENABLED', self.enabled)
+        self.failure_threshold = app.config.get('CIRCUIT_BREAKER_FAILURE_THRESHOLD', self.failure_threshold)
+        self.reset_timeout = app.config.get('CIRCUIT_BREAKER_RESET_TIMEOUT', self.reset_timeout)
+        with self._lock:
+            self._breakers = {}
+
+    def get(self, model_info):
+        """Возвращает предохранитель интеграции модели или None, если предохранители выключены."""
+        if not self.enabled:
+            return None
+        key = integration_key(model_info)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self._breakers[key] = breaker
+            return breaker
+
+
+circuit_breakers = CircuitBreakerRegistry()
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+CACHE_MODE_USE = 'use'
+CACHE_MODE_BYPASS = 'bypass'
+CACHE_MODE_REFRESH = 'refresh'
+
+
+def completion_fingerprint(api_url, model_name, messages, temperature, max_tokens):
+    """
+    Возвращает отпечаток запроса к модели — SHA-256 от канонического JSON.
+
+    Одинаковые запросы (тот же API, модель, сообщения и параметры генерации)
+    всегда дают один и тот же ключ.
+    """
+    canonical = json.dumps({
+        'api_url': (api_url or '').rstrip('/'),
+        'model': model_name,
+        'messages': messages,
+        'temperature': temperature,
+        'max_tokens': max_tokens
+    }, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class CompletionCache:
+    """
+    Постоянный кэш ответов моделей на диске (SQLite), адресуемый отпечатком запроса.
+
+    При превышении max_bytes вытесняются записи, к которым дольше всего
+    не обращались (LRU). Файл кэша общий для всех процессов приложения.
+    """
+
+    def __init__(self, path=None, max_bytes=256 * 1024 * 1024, enabled=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.path = app.config.get('COMPLETION_CACHE_PATH') or os.path.join(
+            os.getcwd(), 'cache', 'completions.sqlite3'
+        )
+        self.max_bytes = app.config.get('COMPLETION_CACHE_MAX_BYTES', self.max_bytes)
+        self.enabled = app.config.get('COMPLETION_CACHE_ENABLED', self.enabled)
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS completions ('
+                'key TEXT PRIMARY KEY, '
+                'value TEXT NOT NULL, '
+                'size INTEGER NOT NULL, '
+                'accessed_at REAL NOT NULL)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS idx_completions_accessed_at ON completions (accessed_at)'
+            )
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def get(self, key):
+        """Возвращает сохранённый ответ (словарь) или None, если записи нет."""
+        if not self.enabled or not self.path:
+            return None
+
+        try:
+            with self._lock:
+                connection = self._connect()
+                row = connection.execute('SELECT value FROM completions WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    return None
+                connection.execute('UPDATE completions SET accessed_at = ? WHERE key = ?', (time.time(), key))
+                connection.commit()
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError):
+            return None
+
+    def set(self, key, value):
+        """Сохраняет ответ (словарь) и при необходимости вытесняет старые записи."""
+        if not self.enabled or not self.path:
+            return
+
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode('utf-8'))
+
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute(
+                    'INSERT OR REPLACE INTO completions (key, value, size, accessed_at) VALUES (?, ?, ?, ?)',
+                    (key, data, size, time.time())
+                )
+                self._evict(connection)
+                connection.commit()
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, connection):
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM completions').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Освобождаем место с запасом, чтобы не вытеснять записи на каждой вставке
+        target = int(self.max_bytes * 0.9)
+        rows = connection.execute('SELECT key, size FROM completions ORDER BY accessed_at').fetchall()
+        stale_keys = []
+        for key, size in rows:
+            if total <= target:
+                break
+            stale_keys.append((key,))
+            total -= size
+        connection.executemany('DELETE FROM completions WHERE key = ?', stale_keys)
+
+    def clear(self):
+        """Удаляет все записи кэша."""
+        if not self.path:
+            return
+        with self._lock:
+            connection = self._connect()
+            connection.execute('DELETE FROM completions')
+            connection.commit()
+
+
+completion_cache = CompletionCache()
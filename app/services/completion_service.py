@@ -0,0 +1,549 @@
+import json
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, TimeoutError, wait
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from app.services.circuit_breaker import circuit_breakers
+from app.services.completion_cache import (
+    CACHE_MODE_BYPASS,
+    CACHE_MODE_USE,
+    completion_cache,
+    completion_fingerprint,
+)
+from app.services.http_client import session_pool
+from app.services.rate_limiter import (
+    THROTTLE_STATUS_CODES,
+    estimate_request_tokens,
+    parse_retry_after,
+    rate_limiter,
+)
+from app.services.execution_engine import integration_key, integration_settings
+from app.services.retry_policy import is_retryable, percentile, retry_manager
+from app.services.single_flight import completion_flights
+
+
+def round_or_none(value, digits=4):
+    return None if value is None else round(value, digits)
+
+
+@dataclass
+class CompletionResult:
+    """Результат запроса к модели: текст ответа и сведения о том, как он был получен."""
+    content: str
+    ok: bool = True
+    status_code: Optional[int] = None
+    cached: bool = False
+    retry_after: Optional[float] = None
+    total_tokens: Optional[int] = None
+    latency: Optional[float] = None
+    throttled_retries: int = 0
+    retries: int = 0
+    hedged: bool = False
+    hedge_won: bool = False
+    skipped: bool = False
+    coalesced: bool = False
+    streamed: bool = False
+    ttft: Optional[float] = None
+    inter_token_latency: Optional[float] = None
+    output_tokens: Optional[int] = None
+
+    @property
+    def status(self):
+        """Статус ответа для результатов бенчмарка: 'ok', 'error' или 'skipped'."""
+        if self.skipped:
+            return 'skipped'
+        return 'ok' if self.ok else 'error'
+
+    @property
+    def tokens_per_second(self):
+        """Скорость вывода: число токенов ответа на секунду полной задержки."""
+        if not self.output_tokens or not self.latency:
+            return None
+        return self.output_tokens / self.latency
+
+    def timings(self):
+        """Задержки ответа для результатов бенчмарка или None, если ответ взят из кэша."""
+        if self.latency is None:
+            return None
+        return {
+            'streamed': self.streamed,
+            'ttft': round_or_none(self.ttft),
+            'interTokenLatency': round_or_none(self.inter_token_latency),
+            'totalLatency': round_or_none(self.latency),
+            'outputTokens': self.output_tokens,
+            'tokensPerSecond': round_or_none(self.tokens_per_second, 2)
+        }
+
+
+class StreamingSettings:
+    """
+    Включены ли потоковые ответы (SSE) по умолчанию и для конкретной интеграции.
+    Интеграции, отклонившие потоковый запрос с ответом 400, до перезапуска
+    приложения опрашиваются без потока.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self._unsupported = set()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('COMPLETION_STREAMING_ENABLED', self.enabled)
+
+    def enabled_for(self, model_info):
+        if integration_key(model_info) in self._unsupported:
+            return False
+        enabled = integration_settings(model_info).get('streaming_enabled')
+        return self.enabled if enabled is None else enabled
+
+    def mark_unsupported(self, model_info):
+        self._unsupported.add(integration_key(model_info))
+
+
+streaming_settings = StreamingSettings()
+
+
+class HedgedAttempt:
+    """
+    Один из двух запросов хеджирования. Когда побеждает другой, cancel()
+    закрывает HTTP-ответ проигравшего и сразу освобождает его слот в
+    ограничителе интеграции, а не ждёт, пока запрос завершится по тайм-ауту.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self._limiter = None
+        self._response = None
+        self._released = False
+        self._lock = threading.Lock()
+
+    def start(self, limiter):
+        """Вызывается после получения слота в limiter; False — попытка уже отменена и запрос не нужен."""
+        with self._lock:
+            self._limiter = limiter
+            return not self.cancelled
+
+    def attach(self, response):
+        """Запоминает HTTP-ответ попытки; ответ отменённой попытки закрывается сразу."""
+        with self._lock:
+            self._response = response
+            cancelled = self.cancelled
+        if cancelled:
+            response.close()
+
+    def finish(self):
+        """Вызывается по завершении запроса; True — слот в ограничителе нужно освободить вызывающему."""
+        with self._lock:
+            released, self._released = self._released, True
+            return not released
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            response = self._response
+            limiter = self._limiter if not self._released else None
+            self._released = self._released or limiter is not None
+        if response is not None:
+            response.close()
+        if limiter is not None:
+            limiter.cancel()
+
+
+def clean_model_response(response):
+    if not response:
+        return response
+
+    response = re.sub(r'<think>.*?</think>', '', response, flags=re.DOTALL | re.IGNORECASE)
+
+    response = response.lstrip()
+
+    return response
+
+
+def extract_completion_content(response_data):
+    """Достаёт текст ответа из JSON ответа /chat/completions или возвращает None."""
+    if 'choices' in response_data and len(response_data['choices']) > 0:
+        if 'message' in response_data['choices'][0]:
+            return response_data['choices'][0]['message'].get('content', 'Нет ответа')
+        elif 'text' in response_data['choices'][0]:
+            return response_data['choices'][0]['text']
+    return None
+
+
+def iter_event_stream(response):
+    """Выдаёт значения полей data: SSE-потока по мере поступления байтов."""
+    buffer = b''
+    for chunk in response.iter_content(chunk_size=None):
+        buffer += chunk
+        while b'\n' in buffer:
+            line, buffer = buffer.split(b'\n', 1)
+            line = line.strip()
+            if line.startswith(b'data:'):
+                yield line[5:].strip().decode('utf-8')
+
+
+def read_streamed_completion(response, started_at):
+    """
+    Собирает потоковый ответ /chat/completions и замеряет его задержки.
+
+    Время до первого токена отсчитывается до первого непустого фрагмента
+    текста. Число токенов берётся из usage, если провайдер его прислал,
+    иначе считается по числу фрагментов (обычно один токен на фрагмент).
+    """
+    parts = []
+    first_token_at = last_token_at = None
+    chunks = 0
+    usage = {}
+
+    for data in iter_event_stream(response):
+        if data == '[DONE]':
+            break
+        event = json.loads(data)
+        usage = event.get('usage') or usage
+        choices = event.get('choices') or []
+        if not choices:
+            continue
+        text = (choices[0].get('delta') or {}).get('content') or choices[0].get('text')
+        if text:
+            last_token_at = time.perf_counter()
+            if first_token_at is None:
+                first_token_at = last_token_at
+            chunks += 1
+            parts.append(text)
+
+    latency = time.perf_counter() - started_at
+    output_tokens = usage.get('completion_tokens') or chunks
+    if not parts:
+        return CompletionResult(
+            content="Не удалось извлечь ответ из API",
+            ok=False,
+            status_code=response.status_code,
+            total_tokens=usage.get('total_tokens'),
+            latency=latency,
+            streamed=True
+        )
+
+    return CompletionResult(
+        content=clean_model_response(''.join(parts)),
+        status_code=response.status_code,
+        total_tokens=usage.get('total_tokens'),
+        latency=latency,
+        streamed=True,
+        ttft=first_token_at - started_at,
+        inter_token_latency=(last_token_at - first_token_at) / (output_tokens - 1) if output_tokens > 1 else None,
+        output_tokens=output_tokens
+    )
+
+
+def read_json_completion(response, started_at):
+    """Разбирает обычный (не потоковый) JSON-ответ /chat/completions."""
+    response_data = response.json()
+    latency = time.perf_counter() - started_at
+    usage = response_data.get('usage') or {}
+    content = extract_completion_content(response_data)
+    if content is None:
+        return CompletionResult(
+            content="Не удалось извлечь ответ из API",
+            ok=False,
+            status_code=response.status_code,
+            total_tokens=usage.get('total_tokens'),
+            latency=latency
+        )
+
+    # Без потока первый токен становится доступен вместе со всем ответом
+    return CompletionResult(
+        content=clean_model_response(content),
+        status_code=response.status_code,
+        total_tokens=usage.get('total_tokens'),
+        latency=latency,
+        ttft=latency,
+        output_tokens=usage.get('completion_tokens')
+    )
+
+
+def post_chat_completion(model_info, payload, timeout, attempt=None):
+    """
+    Отправляет запрос /chat/completions без кэширования и возвращает CompletionResult.
+
+    Если для интеграции включены потоковые ответы, запрос уходит со
+    stream: true и задержки замеряются по SSE-фрагментам; stream_options
+    просит прислать usage последним фрагментом, без него OpenAI-совместимые
+    серверы не сообщают расход токенов и бюджет TPM не уточняется.
+    Провайдер, проигнорировавший stream, отвечает обычным JSON, который тоже
+    принимается; если же он отвечает на поток ошибкой 400, запрос
+    повторяется без потока. attempt — HedgedAttempt, если запрос хеджируется.
+    """
+    if not streaming_settings.enabled_for(model_info):
+        return send_chat_completion(model_info, payload, timeout, stream=False, attempt=attempt)
+
+    result = send_chat_completion(
+        model_info, dict(payload, stream=True, stream_options={'include_usage': True}), timeout, stream=True,
+        attempt=attempt)
+    if result.status_code != 400 or (attempt is not None and attempt.cancelled):
+        return result
+    fallback = send_chat_completion(model_info, payload, timeout, stream=False, attempt=attempt)
+    if fallback.status_code != 400:
+        streaming_settings.mark_unsupported(model_info)
+    return fallback
+
+
+def send_chat_completion(model_info, payload, timeout, stream, attempt=None):
+    """
+    Один HTTP-запрос /chat/completions с готовым телом; stream — читать ли ответ потоком.
+    Ответ хеджируемого запроса всегда читается лениво, чтобы его можно было закрыть при отмене.
+    """
+    started_at = time.perf_counter()
+    try:
+        response = session_pool.post(
+            model_info['api_url'],
+            model_info.get('api_key'),
+            '/chat/completions',
+            json=payload,
+            timeout=timeout,
+            stream=stream or attempt is not None
+        )
+        if attempt is not None:
+            attempt.attach(response)
+
+        with response:
+            if response.status_code != 200:
+                return CompletionResult(
+                    content=f"Ошибка API: HTTP {response.status_code}",
+                    ok=False,
+                    status_code=response.status_code,
+                    retry_after=parse_retry_after(response.headers.get('Retry-After')),
+                    latency=time.perf_counter() - started_at
+                )
+
+            if 'text/event-stream' in response.headers.get('Content-Type', ''):
+                return read_streamed_completion(response, started_at)
+            return read_json_completion(response, started_at)
+
+    except Exception as e:
+        return CompletionResult(content=f"Ошибка генерации ответа: {str(e)}", ok=False)
+
+
+def post_rate_limited(model_info, payload, timeout, started=None, attempt=None):
+    """
+    Отправляет запрос с учётом лимитов интеграции (RPM, TPM, AIMD-параллелизм).
+
+    Ответ 429 не возвращается сразу: запрос повторяется после паузы из
+    Retry-After, пока не исчерпано RATE_LIMIT_MAX_THROTTLE_RETRIES попыток.
+    Событие started устанавливается, когда запрос прошёл ограничитель.
+    Отменённая попытка хеджирования (attempt) не отправляется и не повторяется.
+    """
+    limiter = rate_limiter.get(model_info)
+    estimated_tokens = estimate_request_tokens(payload['messages'], payload.get('max_tokens'))
+    throttled_retries = 0
+
+    while True:
+        limiter.acquire(estimated_tokens)
+        if started is not None:
+            started.set()
+        if attempt is not None and not attempt.start(limiter):
+            limiter.cancel()
+            return CompletionResult(content="Запрос отменён: ответ получен по другому запросу", ok=False, skipped=True)
+        result = None
+        try:
+            result = post_chat_completion(model_info, payload, timeout, attempt)
+        finally:
+            if attempt is None or attempt.finish():
+                limiter.release(
+                    result.status_code if result else None,
+                    result.retry_after if result else None,
+                    estimated_tokens,
+                    result.total_tokens if result else None
+                )
+
+        if (result.status_code not in THROTTLE_STATUS_CODES or throttled_retries >= rate_limiter.max_throttle_retries
+                or (attempt is not None and attempt.cancelled)):
+            result.throttled_retries = throttled_retries
+            return result
+        throttled_retries += 1
+
+
+def post_hedged(model_info, payload, timeout):
+    """
+    Отправляет запрос с хеджированием, если оно включено для интеграции.
+
+    Если ответ не пришёл за время p95 задержек интеграции, отправляется
+    дублирующий запрос и берётся первый успешный из двух ответов; второй
+    запрос отменяется, а его соединение и слот в ограничителе освобождаются.
+    """
+    delay = retry_manager.hedge_delay(model_info)
+    if delay is None:
+        return post_rate_limited(model_info, payload, timeout)
+
+    executor = retry_manager.hedge_executor()
+    started = threading.Event()
+    attempts = {}
+    primary_attempt = HedgedAttempt()
+    primary = executor.submit(post_rate_limited, model_info, payload, timeout, started, primary_attempt)
+    attempts[primary] = primary_attempt
+
+    # Отсчёт задержки начинается после ожидания в ограничителе, иначе
+    # очередь к провайдеру сама провоцировала бы лишние дубли
+    while not started.wait(0.05) and not primary.done():
+        pass
+
+    try:
+        return primary.result(timeout=delay)
+    except TimeoutError:
+        pass
+
+    hedge_attempt = HedgedAttempt()
+    hedge = executor.submit(post_rate_limited, model_info, payload, timeout, None, hedge_attempt)
+    attempts[hedge] = hedge_attempt
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            result = future.result()
+            if result.ok or not pending:
+                for loser in pending:
+                    loser.cancel()
+                    attempts[loser].cancel()
+                result.hedged = True
+                result.hedge_won = future is hedge
+                return result
+
+
+def post_with_retries(model_info, payload, timeout):
+    """
+    Отправляет запрос, повторяя его при временных ошибках.
+
+    Между попытками выдерживается экспоненциальная задержка с джиттером;
+    число повторов задаётся настройками интеграции или COMPLETION_MAX_RETRIES.
+    Если предохранитель интеграции разомкнут, запрос не отправляется и
+    возвращается пропущенный результат, а повторы прекращаются с последней ошибкой.
+    """
+    policy = retry_manager.policy_for(model_info)
+    breaker = circuit_breakers.get(model_info)
+    retries = 0
+    result = None
+
+    while True:
+        if breaker is not None and not breaker.allow():
+            if result is not None:
+                result.retries = retries
+                return result
+            return CompletionResult(
+                content="Запрос пропущен: API интеграции недоступен, предохранитель разомкнут",
+                ok=False,
+                skipped=True
+            )
+
+        try:
+            result = post_hedged(model_info, payload, timeout)
+        except Exception as e:
+            result = CompletionResult(content=f"Ошибка генерации ответа: {str(e)}", ok=False)
+        if breaker is not None:
+            breaker.record(result)
+        if result.ok and result.latency is not None:
+            retry_manager.record_latency(model_info, result.latency)
+
+        if not is_retryable(result) or retries >= policy.max_retries:
+            result.retries = retries
+            return result
+
+        time.sleep(policy.backoff(retries))
+        retries += 1
+
+
+def request_chat_completion(model_info, messages, max_tokens, temperature, timeout, cache_mode=CACHE_MODE_USE):
+    """
+    Запрашивает ответ модели с учётом постоянного кэша ответов.
+
+    cache_mode: 'use' — читать и пополнять кэш, 'refresh' — всегда обращаться
+    к API и перезаписывать кэш, 'bypass' — не использовать кэш вовсе.
+    В кэш попадают только успешные ответы.
+
+    Одинаковые запросы (с тем же отпечатком), выполняющиеся одновременно,
+    объединяются: к провайдеру уходит один, остальные получают его результат.
+    """
+    model_name = model_info.get('name', 'default')
+    key = completion_fingerprint(model_info['api_url'], model_name, messages, temperature, max_tokens)
+
+    if cache_mode == CACHE_MODE_USE:
+        cached = completion_cache.get(key)
+        if cached is not None:
+            return CompletionResult(content=cached['content'], cached=True)
+
+    payload = {
+        'model': model_name,
+        'messages': messages,
+        'max_tokens': max_tokens,
+        'temperature': temperature
+    }
+    result, shared = completion_flights.do(key, lambda: post_with_retries(model_info, payload, timeout))
+    if shared:
+        # Повторы и хеджирование уже учтены в результате первого запроса
+        result = replace(result, coalesced=True, retries=0, throttled_retries=0, hedged=False, hedge_won=False)
+
+    if result.ok and cache_mode != CACHE_MODE_BYPASS:
+        completion_cache.set(key, {'content': result.content})
+
+    return result
+
+
+def summarize_call_stats(results):
+    """
+    Сводка по повторам, хеджированию, пропускам и объединённым запросам
+    для списка CompletionResult одной модели.
+    """
+    return {
+        'requests': len(results),
+        'retries': sum(result.retries for result in results),
+        'throttledRetries': sum(result.throttled_retries for result in results),
+        'hedged': sum(1 for result in results if result.hedged),
+        'hedgeWins': sum(1 for result in results if result.hedge_won),
+        'skipped': sum(1 for result in results if result.skipped),
+        'coalesced': sum(1 for result in results if result.coalesced)
+    }
+
+
+def summarize_latency(results):
+    """
+    Перцентили задержек (p50/p95/p99) по списку CompletionResult одной модели.
+
+    Учитываются только успешные ответы, полученные от API: ответы из кэша
+    и ошибки не отражают скорость модели, а объединённые запросы повторяли
+    бы замер первого.
+    """
+    measured = [
+        result for result in results
+        if result.ok and not result.cached and not result.coalesced and result.latency is not None
+    ]
+
+    def distribution(values):
+        values = sorted(value for value in values if value is not None)
+        if not values:
+            return None
+        return {
+            'p50': round(percentile(values, 0.5), 4),
+            'p95': round(percentile(values, 0.95), 4),
+            'p99': round(percentile(values, 0.99), 4)
+        }
+
+    return {
+        'samples': len(measured),
+        'streamed': sum(1 for result in measured if result.streamed),
+        'ttft': distribution(result.ttft for result in measured),
+        'interTokenLatency': distribution(result.inter_token_latency for result in measured),
+        'totalLatency': distribution(result.latency for result in measured),
+        'tokensPerSecond': distribution(result.tokens_per_second for result in measured)
+    }
+
+
+def summarize_completion_cache(results, cache_mode):
+    """Считает попадания и промахи кэша по списку CompletionResult для ответа API."""
+    hits = sum(1 for result in results if result.cached)
+    looked_up = len(results) if cache_mode == CACHE_MODE_USE else 0
+    return {
+        'mode': cache_mode,
+        'hits': hits,
+        'misses': looked_up - hits,
+        'bypassed': len(results) - looked_up
+    }
@@ -0,0 +1,283 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import db
+from app.models.user_dataset import UserDataset
+from app.services.dataset_store import sniff_delimiter, write_columns
+
+ANALYSIS_PENDING = 'pending'
+ANALYSIS_RUNNING = 'running'
+ANALYSIS_READY = 'ready'
+ANALYSIS_FAILED = 'failed'
+
+# Примеры значений колонки — первые SAMPLE_VALUES непустых значений в первых SAMPLE_ROWS строках
+SAMPLE_ROWS = 100
+SAMPLE_VALUES = 5
+PROGRESS_INTERVAL = 1.0
+
+
+def find_prompt_column(fieldnames):
+    if not fieldnames:
+        return None
+
+    prompt_keywords = [
+        'prompt', 'prompts', 'question', 'questions', 'query', 'queries',
+        'input', 'instruction', 'instructions', 'task', 'tasks',
+        'запрос', 'вопрос', 'задача', 'задание', 'инструкция'
+    ]
+
+    for field in fieldnames:
+        if field.lower() in prompt_keywords:
+            return field
+
+    for field in fieldnames:
+        for keyword in prompt_keywords:
+            if keyword in field.lower():
+                return field
+
+    return None
+
+
+def find_reference_column(fieldnames):
+    if not fieldnames:
+        return None
+
+    reference_keywords = [
+        'reference', 'answer', 'answers', 'response', 'responses', 'output',
+        'solution', 'solutions', 'result', 'results', 'expected', 'target',
+        'эталон', 'ответ', 'ответы', 'решение', 'результат', 'ожидаемый',
+        'ref', 'ans', 'ground_truth', 'truth', 'correct', 'ideal'
+    ]
+
+    for field in fieldnames:
+        if field.lower() in reference_keywords:
+            return field
+
+    for field in fieldnames:
+        for keyword in reference_keywords:
+            if keyword in field.lower():
+                return field
+
+    return None
+
+
+def find_category_column(fieldnames):
+    if not fieldnames:
+        return None
+
+    category_keywords = ['category', 'categories', 'topic', 'subject', 'domain', 'категория', 'тема', 'раздел']
+
+    for field in fieldnames:
+        if field.lower() in category_keywords:
+            return field
+
+    return None
+
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _column_type(non_empty_count, numeric_count):
+    return 'numeric' if non_empty_count and numeric_count / non_empty_count > 0.8 else 'text'
+
+
+def update_columns_info(columns_info, changes):
+    """
+    Пересчитывает статистики колонок после изменения строк без повторного
+    чтения файла: из счётчиков непустых и числовых значений вычитаются
+    значения прежних строк и прибавляются значения новых.
+    changes — пары (строка до, строка после); None — строки не было.
+    Колонки, проанализированные до появления счётчиков, не меняются.
+    """
+    columns_info = json.loads(columns_info) if columns_info else {}
+    for column, info in columns_info.items():
+        if 'non_empty_count' not in info:
+            continue
+        for old_row, new_row in changes:
+            for row, sign in ((old_row, -1), (new_row, 1)):
+                value = row.get(column) if row else None
+                if value and value.strip():
+                    info['non_empty_count'] += sign
+                    info['numeric_count'] += sign * _is_number(value)
+                    if sign < 0 and value in info['sample_values']:
+                        info['sample_values'].remove(value)
+                    elif sign > 0 and len(info['sample_values']) < SAMPLE_VALUES:
+                        info['sample_values'].append(value)
+        info['type'] = _column_type(info['non_empty_count'], info['numeric_count'])
+    return json.dumps(columns_info, ensure_ascii=False)
+
+
+def _decoded_lines(file, total_bytes, progress):
+    """Строки бинарного файла в UTF-8; progress(доля прочитанного) — не чаще раза в PROGRESS_INTERVAL."""
+    reported_at = time.monotonic()
+    for line in file:
+        yield line.decode('utf-8')
+        if progress is not None and time.monotonic() - reported_at >= PROGRESS_INTERVAL:
+            reported_at = time.monotonic()
+            progress(file.tell() / total_bytes if total_bytes else 1.0)
+
+
+def analyze_csv_file(file_path, progress=None):
+    """
+    Анализирует CSV файл датасета за один проход с постоянной памятью:
+    число строк, колонки промптов и эталонов, тип и примеры значений колонок.
+    Строки не накапливаются: тип колонки определяется по счётчикам
+    непустых и числовых значений во всём файле (они же позволяют
+    пересчитывать тип при правке строк); для примеров хранятся только
+    первые SAMPLE_VALUES непустых значений из первых SAMPLE_ROWS строк.
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            delimiter = sniff_delimiter(file)
+
+        with open(file_path, 'rb') as file:
+            reader = csv.DictReader(_decoded_lines(file, os.path.getsize(file_path), progress), delimiter=delimiter)
+
+            columns = [column for column in (reader.fieldnames or []) if column is not None]
+            sample_values = {column: [] for column in columns}
+            counts = {column: [0, 0] for column in columns}
+            row_count = 0
+            for row in reader:
+                for column in columns:
+                    value = row.get(column)
+                    if value and value.strip():
+                        counts[column][0] += 1
+                        counts[column][1] += _is_number(value)
+                        if row_count < SAMPLE_ROWS and len(sample_values[column]) < SAMPLE_VALUES:
+                            sample_values[column].append(value)
+                row_count += 1
+
+        if not columns:
+            raise ValueError('в файле нет заголовка с названиями колонок')
+
+        prompt_column = find_prompt_column(columns)
+        reference_column = find_reference_column(columns)
+
+        columns_info = {}
+        for col in columns:
+            non_empty_count, numeric_count = counts[col]
+            columns_info[col] = {
+                'type': _column_type(non_empty_count, numeric_count),
+                'sample_values': sample_values[col],
+                'is_prompt': col == prompt_column,
+                'is_reference': col == reference_column,
+                'non_empty_count': non_empty_count,
+                'numeric_count': numeric_count
+            }
+
+        return {
+            'row_count': row_count,
+            'column_count': len(columns),
+            'columns_info': json.dumps(columns_info, ensure_ascii=False),
+            'format_validated': bool(prompt_column and reference_column),
+            'prompt_column': prompt_column,
+            'reference_column': reference_column
+        }
+
+    except Exception as e:
+        raise Exception(f"Ошибка при анализе CSV файла: {str(e)}")
+
+
+def apply_file_info(dataset, file_info):
+    dataset.row_count = file_info['row_count']
+    dataset.column_count = file_info['column_count']
+    dataset.columns_info = file_info['columns_info']
+    dataset.format_validated = file_info['format_validated']
+    dataset.prompt_column = file_info['prompt_column']
+    dataset.reference_column = file_info['reference_column']
+    dataset.analysis_status = ANALYSIS_READY
+    dataset.analysis_progress = 1.0
+    dataset.analysis_error = None
+
+
+class DatasetAnalyzer:
+    """
+    Анализ загруженных датасетов: сразу в запросе загрузки или, при
+    DATASET_ANALYSIS_IN_BACKGROUND, в фоновом потоке. Во втором случае
+    запрос загрузки только сохраняет файл и возвращается, а ход анализа
+    (analysis_status, analysis_progress) виден в записи датасета.
+    """
+
+    def __init__(self, background=False):
+        self.background = background
+        self.app = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dataset-analysis')
+
+    def init_app(self, app):
+        self.app = app
+        self.background = app.config.get('DATASET_ANALYSIS_IN_BACKGROUND', self.background)
+
+    def prepare(self, dataset):
+        """
+        Вызывается перед сохранением записи датасета: без фонового режима
+        анализирует файл и строит колоночный кэш (ошибка прерывает загрузку),
+        иначе помечает датасет как ожидающий анализа.
+        """
+        if self.background:
+            dataset.analysis_status = ANALYSIS_PENDING
+            dataset.analysis_progress = 0.0
+            dataset.analysis_error = None
+            return
+        apply_file_info(dataset, analyze_csv_file(dataset.file_path))
+        write_columns(dataset.file_path)
+
+    def start(self, dataset):
+        """Вызывается после сохранения записи: ставит анализ в очередь или сразу готовит эмбеддинги эталонов."""
+        if self.background:
+            self._executor.submit(self._run, dataset.id, dataset.file_path)
+        else:
+            self._precompute_references(dataset)
+
+    def _precompute_references(self, dataset):
+        """Заранее считает эмбеддинги эталонов нового датасета, если это включено в настройках."""
+        if self.app.config.get('EMBEDDING_PRECOMPUTE_ON_UPLOAD'):
+            from app.services.benchmark_service import precompute_reference_embeddings
+            precompute_reference_embeddings(dataset)
+
+    def _current(self, dataset_id, file_path):
+        # Пока анализ ждал в очереди, датасет могли удалить или заменить его файл
+        dataset = db.session.get(UserDataset, dataset_id)
+        if dataset is None or dataset.file_path != file_path:
+            return None
+        return dataset
+
+    def _update(self, dataset_id, file_path, **fields):
+        dataset = self._current(dataset_id, file_path)
+        if dataset is not None:
+            for name, value in fields.items():
+                setattr(dataset, name, value)
+            db.session.commit()
+        return dataset
+
+    def _run(self, dataset_id, file_path):
+        with self.app.app_context():
+            if self._update(dataset_id, file_path, analysis_status=ANALYSIS_RUNNING) is None:
+                return
+            try:
+                file_info = analyze_csv_file(
+                    file_path,
+                    progress=lambda fraction: self._update(dataset_id, file_path, analysis_progress=round(fraction, 3))
+                )
+                write_columns(file_path)
+            except Exception as e:
+                db.session.rollback()
+                self._update(dataset_id, file_path, analysis_status=ANALYSIS_FAILED, analysis_error=str(e))
+                return
+
+            dataset = self._current(dataset_id, file_path)
+            if dataset is None:
+                return
+            apply_file_info(dataset, file_info)
+            db.session.commit()
+            self._precompute_references(dataset)
+
+
+dataset_analyzer = DatasetAnalyzer()
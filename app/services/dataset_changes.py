@@ -0,0 +1,387 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from app.services.dataset_store import open_columns, remove_columns, write_columns
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка между процессами недоступна
+    fcntl = None
+
+# Журнал изменений датасета рядом с его CSV (<файл>.changes): JSON-строки,
+# которые только дописываются. Первая строка — {"base": подпись CSV}, на
+# который ссылаются операции; остальные — операции в порядке применения:
+#   {"op": "insert", "row": i, "values": {...}} — вставить строку перед i;
+#   {"op": "update", "row": i, "values": {...}} — заменить строку i целиком;
+#   {"op": "delete", "row": i}                  — удалить строку i.
+# Номера строк относятся к виду датасета после предыдущих операций.
+# При компактизации CSV переписывается с учётом журнала, и журнал очищается.
+CHANGES_SUFFIX = '.changes'
+LOCK_SUFFIX = '.changes.lock'
+OPERATIONS = ('insert', 'update', 'delete')
+
+
+class PatchError(ValueError):
+    """Некорректная операция изменения датасета."""
+
+
+class VersionConflict(Exception):
+    """Датасет изменился после того, как клиент прочитал его версию."""
+
+
+def changes_path(csv_path):
+    return csv_path + CHANGES_SUFFIX
+
+
+def remove_sidecars(csv_path):
+    """Удаляет файлы рядом с CSV датасета: колоночный кэш, журнал изменений и файл блокировки."""
+    remove_columns(csv_path)
+    for path in (changes_path(csv_path), csv_path + LOCK_SUFFIX):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+@contextmanager
+def _locked(csv_path, exclusive):
+    """Блокировка CSV и журнала между процессами: общая для чтения, исключительная для записи."""
+    with open(csv_path + LOCK_SUFFIX, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _base_signature(columns):
+    return {'sourceSize': columns.header['sourceSize'], 'sourceMtimeNs': columns.header['sourceMtimeNs']}
+
+
+def read_changes(csv_path, base):
+    """Операции журнала, относящиеся к текущему CSV; журнал от прежней версии файла игнорируется."""
+    try:
+        with open(changes_path(csv_path), 'r', encoding='utf-8') as file:
+            lines = file.read().split('\n')
+    except FileNotFoundError:
+        return []
+    # Последняя строка без перевода строки могла не дописаться при сбое
+    lines = lines[:-1]
+    if not lines or json.loads(lines[0]).get('base') != base:
+        return []
+    return [json.loads(line) for line in lines[1:]]
+
+
+def _write_changes(csv_path, base, operations):
+    fd, partial_path = tempfile.mkstemp(dir=os.path.dirname(csv_path) or '.',
+                                        prefix=os.path.basename(csv_path), suffix='.partial')
+    with os.fdopen(fd, 'w', encoding='utf-8') as file:
+        file.write(json.dumps({'base': base}) + '\n')
+        file.writelines(json.dumps(operation, ensure_ascii=False) + '\n' for operation in operations)
+    os.replace(partial_path, changes_path(csv_path))
+
+
+def _append_changes(csv_path, base, operations, existing):
+    if not existing:
+        # Журнала нет или он от прежней версии CSV — пишется новый
+        _write_changes(csv_path, base, operations)
+        return
+    with open(changes_path(csv_path), 'a', encoding='utf-8') as file:
+        file.writelines(json.dumps(operation, ensure_ascii=False) + '\n' for operation in operations)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def _segment_length(segment):
+    return segment[1] - segment[0] if isinstance(segment, tuple) else 1
+
+
+class DatasetView:
+    """
+    Текущий вид датасета: строки CSV с применёнными операциями журнала.
+
+    Вид хранится как список сегментов — диапазонов строк исходного CSV
+    (start, stop) и отдельных изменённых или вставленных строк (словарей),
+    поэтому его размер зависит от числа операций, а не от числа строк.
+    """
+
+    def __init__(self, csv_path, columns, operations):
+        self.csv_path = csv_path
+        self.columns = columns.columns
+        self.base = _base_signature(columns)
+        self.operations = len(operations)
+        self.version = f"{columns.header['sourceMtimeNs']}.{len(operations)}"
+        self._store = columns
+        # Файл открывается сразу: при компактизации CSV заменяется, а этот
+        # дескриптор продолжает указывать на версию, с которой согласован индекс
+        self._file = open(csv_path, 'rb')
+        self.segments = [(0, columns.rows)] if columns.rows else []
+        self.rows = columns.rows
+        for operation in operations:
+            self._apply(operation)
+
+    def _split(self, row):
+        """Разрезает сегменты так, чтобы строка row начинала сегмент; возвращает его индекс."""
+        position = 0
+        for index, segment in enumerate(self.segments):
+            length = _segment_length(segment)
+            if row == position:
+                return index
+            if row < position + length:
+                start, stop = segment
+                cut = start + row - position
+                self.segments[index:index + 1] = [(start, cut), (cut, stop)]
+                return index + 1
+            position += length
+        return len(self.segments)
+
+    def _apply(self, operation):
+        row = operation['row']
+        index = self._split(row)
+        if operation['op'] == 'insert':
+            self.segments.insert(index, dict(operation['values']))
+            self.rows += 1
+            return
+        self._split(row + 1)
+        if operation['op'] == 'update':
+            self.segments[index] = dict(operation['values'])
+        else:
+            del self.segments[index]
+            self.rows -= 1
+
+    def _read_base(self, start, stop):
+        if start >= stop:
+            return []
+        begin, end = self._store.row_range(start, stop)
+        self._file.seek(begin)
+        data = self._file.read(end - begin).decode('utf-8')
+        reader = csv.reader(io.StringIO(data, newline=''), delimiter=self._store.header['delimiter'])
+        return [
+            {column: row[index] if index < len(row) else None for index, column in enumerate(self.columns)}
+            for row in reader if row
+        ]
+
+    def read_rows(self, start, stop):
+        """Строки вида [start, stop) в виде словарей; диапазоны исходного CSV читаются одним seek."""
+        start = max(0, min(start, self.rows))
+        stop = max(start, min(stop, self.rows))
+        result = []
+        position = 0
+        for segment in self.segments:
+            length = _segment_length(segment)
+            if position + length > start and position < stop:
+                first = max(start, position) - position
+                last = min(stop, position + length) - position
+                if isinstance(segment, tuple):
+                    result.extend(self._read_base(segment[0] + first, segment[0] + last))
+                else:
+                    result.append({column: segment.get(column) for column in self.columns})
+            position += length
+            if position >= stop:
+                break
+        return result
+
+    def row(self, index):
+        return self.read_rows(index, index + 1)[0]
+
+    def column(self, name):
+        """Значения колонки по всем строкам вида (генератор)."""
+        values = self._store.column(name)
+        for segment in self.segments:
+            if isinstance(segment, tuple):
+                for index in range(*segment):
+                    yield values[index]
+            else:
+                yield segment.get(name) or ''
+
+    def iter_segments(self):
+        return iter(self.segments)
+
+    def close(self):
+        self._file.close()
+        self._store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_dataset(csv_path):
+    """Открывает текущий вид датасета: колоночный кэш CSV и журнал его изменений."""
+    with _locked(csv_path, exclusive=False):
+        columns = open_columns(csv_path)
+        try:
+            return DatasetView(csv_path, columns, read_changes(csv_path, _base_signature(columns)))
+        except BaseException:
+            columns.close()
+            raise
+
+
+def _normalize(view, operation):
+    """Проверяет операцию относительно текущего вида и дополняет её до полной строки."""
+    if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+        raise PatchError(f'Неизвестная операция: {operation!r}. Допустимые: {", ".join(OPERATIONS)}')
+    try:
+        row = int(operation.get('row', view.rows if operation['op'] == 'insert' else -1))
+    except (TypeError, ValueError):
+        raise PatchError(f'Некорректный номер строки в операции {operation!r}')
+    last_row = view.rows if operation['op'] == 'insert' else view.rows - 1
+    if not 0 <= row <= last_row:
+        raise PatchError(f'Строка {row} вне диапазона 0–{last_row}')
+
+    if operation['op'] == 'delete':
+        return {'op': 'delete', 'row': row}, view.row(row), None
+
+    values = operation.get('values') or {}
+    unknown = [column for column in values if column not in view.columns]
+    if unknown:
+        raise PatchError(f'Неизвестные колонки: {", ".join(map(str, unknown))}')
+    old_row = view.row(row) if operation['op'] == 'update' else None
+    new_row = {column: '' if value is None else str(value)
+               for column, value in (old_row or {column: '' for column in view.columns}).items()}
+    new_row.update({column: '' if value is None else str(value) for column, value in values.items()})
+    return {'op': operation['op'], 'row': row, 'values': new_row}, old_row, new_row
+
+
+def apply_patch(csv_path, operations, version=None):
+    """
+    Проверяет операции и дописывает их в журнал изменений.
+
+    Операции применяются по очереди, каждая — к виду после предыдущих; при
+    ошибке в любой из них журнал не меняется. Если передана version, а вид
+    датасета уже другой, бросается VersionConflict. Возвращает список пар
+    (строка до, строка после) для пересчёта статистик колонок, число строк,
+    число операций в журнале и новую версию датасета.
+    """
+    with _locked(csv_path, exclusive=True):
+        columns = open_columns(csv_path)
+        base = _base_signature(columns)
+        existing = read_changes(csv_path, base)
+        with DatasetView(csv_path, columns, existing) as view:
+            if version is not None and str(version) != view.version:
+                raise VersionConflict('Датасет изменился, загрузите данные заново')
+            normalized = []
+            changes = []
+            for operation in operations:
+                operation, old_row, new_row = _normalize(view, operation)
+                view._apply(operation)
+                normalized.append(operation)
+                changes.append((old_row, new_row))
+            _append_changes(csv_path, base, normalized, existing)
+            total_operations = len(existing) + len(normalized)
+            return changes, view.rows, total_operations, f"{base['sourceMtimeNs']}.{total_operations}"
+
+
+def _ensure_newline(data):
+    return data if not data or data.endswith(b'\n') else data + b'\r\n'
+
+
+def _write_compacted(view, path):
+    """Пишет CSV вида: диапазоны исходных строк копируются байтами, изменённые строки сериализуются заново."""
+    store = view._store
+    first_row = store.row_range(0, 0)[0]
+    with open(path, 'wb') as output:
+        view._file.seek(0)
+        output.write(_ensure_newline(view._file.read(first_row)))
+        for segment in view.iter_segments():
+            if isinstance(segment, tuple):
+                begin, end = store.row_range(*segment)
+                view._file.seek(begin)
+                remaining = end - begin
+                while remaining > 0:
+                    data = view._file.read(min(remaining, 1 << 20))
+                    if not data:
+                        raise ValueError('CSV короче, чем указано в колоночном кэше')
+                    output.write(data if remaining > len(data) else _ensure_newline(data))
+                    remaining -= len(data)
+            else:
+                line = io.StringIO()
+                csv.writer(line, delimiter=store.header['delimiter']).writerow(
+                    [segment.get(column) or '' for column in view.columns])
+                output.write(line.getvalue().encode('utf-8'))
+
+
+def compact(csv_path):
+    """
+    Переписывает CSV с применёнными операциями журнала и очищает журнал.
+
+    Новый CSV строится без блокировки по снимку журнала; под исключительной
+    блокировкой файл подменяется, колоночный кэш перестраивается, а в новый
+    журнал переносятся операции, дописанные за время построения.
+    Возвращает размер нового CSV или None, если журнал пуст или CSV за это
+    время заменили.
+    """
+    view = open_dataset(csv_path)
+    try:
+        if not view.operations:
+            return None
+        fd, partial_path = tempfile.mkstemp(dir=os.path.dirname(csv_path) or '.',
+                                            prefix=os.path.basename(csv_path), suffix='.partial')
+        os.close(fd)
+        try:
+            _write_compacted(view, partial_path)
+        except BaseException:
+            os.remove(partial_path)
+            raise
+    finally:
+        view.close()
+
+    with _locked(csv_path, exclusive=True):
+        if not os.path.exists(csv_path):
+            os.remove(partial_path)
+            return None
+        with open_columns(csv_path) as columns:
+            base = _base_signature(columns)
+            remaining = read_changes(csv_path, base)[view.operations:]
+        if base != view.base:
+            os.remove(partial_path)
+            return None
+        os.replace(partial_path, csv_path)
+        write_columns(csv_path)
+        with open_columns(csv_path) as columns:
+            _write_changes(csv_path, _base_signature(columns), remaining)
+    return os.path.getsize(csv_path)
+
+
+class DatasetChanges:
+    """Компактизация журналов изменений в фоне, когда в журнале накопилось compact_after операций."""
+
+    def __init__(self, compact_after=500):
+        self.compact_after = compact_after
+        self.app = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dataset-compaction')
+
+    def init_app(self, app):
+        self.app = app
+        self.compact_after = app.config.get('DATASET_COMPACT_AFTER_CHANGES', self.compact_after)
+
+    def maybe_compact(self, dataset_id, csv_path, operations):
+        if operations >= self.compact_after:
+            self._executor.submit(self._compact, dataset_id, csv_path)
+
+    def _compact(self, dataset_id, csv_path):
+        from app import db
+        from app.models.user_dataset import UserDataset
+
+        with self.app.app_context():
+            try:
+                file_size = compact(csv_path)
+            except Exception as e:
+                print(f"Не удалось компактизировать журнал изменений {csv_path}: {str(e)}")
+                return
+            dataset = db.session.get(UserDataset, dataset_id)
+            if file_size is not None and dataset is not None and dataset.file_path == csv_path:
+                dataset.file_size = file_size
+                db.session.commit()
+
+
+dataset_changes = DatasetChanges()
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка между процессами недоступна
+    fcntl = None
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ModelEmbeddings:
+    """
+    Эмбеддинги одной модели на диске.
+
+    vectors.f32 — матрица float32, куда строки только дописываются, keys.txt —
+    sha256 текста на каждую строку матрицы, meta.json — размерность векторов.
+    Матрица читается через numpy.memmap, поэтому несколько процессов делят
+    одни и те же страницы файла без копирования; новые строки других
+    процессов подхватываются при следующем обращении.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, 'vectors.f32')
+        self.keys_path = os.path.join(directory, 'keys.txt')
+        self.meta_path = os.path.join(directory, 'meta.json')
+        self.lock_path = os.path.join(directory, '.lock')
+        self.dim = None
+        self.index = {}
+        self.rows = 0
+        self._keys_offset = 0
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        """Дочитывает строки keys.txt, дописанные с прошлого обращения."""
+        if self.dim is None and os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as file:
+                self.dim = json.load(file)['dim']
+        if not os.path.exists(self.keys_path):
+            return
+
+        with open(self.keys_path, 'rb') as file:
+            file.seek(self._keys_offset)
+            data = file.read()
+        # Незавершённая последняя строка дописывается другим процессом прямо сейчас
+        data = data[:data.rfind(b'\n') + 1]
+        self._keys_offset += len(data)
+        for line in data.splitlines():
+            self.index.setdefault(line.decode('ascii'), self.rows)
+            self.rows += 1
+
+    def _matrix_view(self):
+        import numpy as np
+
+        if self._matrix is None or self._matrix.shape[0] < self.rows:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(self.rows, self.dim))
+        return self._matrix
+
+    def get_many(self, hashes):
+        """Векторы по хэшам текстов; для отсутствующих — None."""
+        import numpy as np
+
+        with self._lock:
+            self._refresh()
+            if not self.rows:
+                return [None] * len(hashes)
+            matrix = self._matrix_view()
+            return [np.array(matrix[self.index[key]]) if key in self.index else None for key in hashes]
+
+    def put_many(self, hashes, vectors):
+        """Дописывает векторы текстов, которых ещё нет в хранилище."""
+        import numpy as np
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.lock_path, 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._refresh()
+                    if self.dim is None:
+                        self.dim = int(vectors.shape[1])
+                        with open(self.meta_path, 'w', encoding='utf-8') as file:
+                            json.dump({'dim': self.dim}, file)
+
+                    new_rows = []
+                    for key, vector in zip(hashes, vectors):
+                        if key not in self.index:
+                            self.index[key] = self.rows + len(new_rows)
+                            new_rows.append((key, vector))
+                    if not new_rows:
+                        return
+
+                    with open(self.vectors_path, 'ab') as file:
+                        # Векторы, дописанные без ключей при сбое, отбрасываются
+                        file.truncate(self.rows * self.dim * 4)
+                        file.write(np.stack([vector for _, vector in new_rows]).tobytes())
+                    with open(self.keys_path, 'a', encoding='ascii') as file:
+                        file.write(''.join(f'{key}\n' for key, _ in new_rows))
+
+                    self.rows += len(new_rows)
+                    self._keys_offset = os.path.getsize(self.keys_path)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class EmbeddingStore:
+    """Постоянное хранилище эмбеддингов по ключу (имя модели, хэш текста)."""
+
+    def __init__(self, directory=None, enabled=True):
+        self.directory = directory or os.path.join(os.getcwd(), 'cache', 'embeddings')
+        self.enabled = enabled
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('EMBEDDING_STORE_ENABLED', self.enabled)
+        self.directory = app.config.get('EMBEDDING_STORE_DIR', self.directory)
+        with self._lock:
+            self._models = {}
+
+    def _model(self, model_name):
+        with self._lock:
+            embeddings = self._models.get(model_name)
+            if embeddings is None:
+                safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+                embeddings = ModelEmbeddings(os.path.join(self.directory, safe_name))
+                self._models[model_name] = embeddings
+            return embeddings
+
+    def get_many(self, model_name, texts):
+        """Сохранённые эмбеддинги текстов (None для отсутствующих)."""
+        if not self.enabled:
+            return [None] * len(texts)
+        return self._model(model_name).get_many([text_hash(text) for text in texts])
+
+    def put_many(self, model_name, texts, vectors):
+        if not self.enabled or not texts:
+            return
+        self._model(model_name).put_many([text_hash(text) for text in texts], vectors)
+
+
+embedding_store = EmbeddingStore()
@@ -0,0 +1,143 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Queue
+
+
+def integration_key(model_info):
+    """Возвращает ключ API интеграции модели: пара (api_url, api_key)."""
+    api_url = (model_info.get('api_url') or '').rstrip('/')
+    return api_url, model_info.get('api_key') or ''
+
+
+def integration_settings(model_info):
+    """Возвращает настройки API интеграции из словаря модели (или пустой словарь)."""
+    integration = model_info.get('api_integration') or {}
+    return integration.get('settings') or {}
+
+
+class _IntegrationQueue:
+    """Очередь ожидающих вызовов одной API интеграции и число вызовов в работе."""
+
+    def __init__(self):
+        self.pending = deque()
+        self.in_flight = 0
+
+
+class ExecutionEngine:
+    """
+    Общий движок параллельного выполнения вызовов API моделей.
+
+    Глобальное число одновременных вызовов ограничено размером пула потоков,
+    а число одновременных вызовов к одной API интеграции — лимитом интеграции.
+    Вызовы сверх лимита интеграции ждут в очереди и не занимают потоки пула,
+    поэтому медленная интеграция не блокирует запросы к остальным.
+    Лимиты общие для всех запусков бенчмарков в процессе.
+    """
+
+    def __init__(self, max_workers=16, integration_limit=4):
+        self.max_workers = max_workers
+        self.integration_limit = integration_limit
+        self._executor = None
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_workers = app.config.get('BENCHMARK_MAX_CONCURRENCY', self.max_workers)
+        self.integration_limit = app.config.get('BENCHMARK_INTEGRATION_CONCURRENCY', self.integration_limit)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='benchmark-worker'
+                )
+            return self._executor
+
+    def _limit_for(self, model_info):
+        limit = integration_settings(model_info).get('max_concurrency')
+        return max(1, int(limit)) if limit else self.integration_limit
+
+    def submit(self, fn, *args, model_info=None):
+        """
+        Ставит вызов fn(*args) в очередь и возвращает Future с его результатом.
+
+        Если передан model_info, вызов учитывается в лимите API интеграции модели.
+        """
+        if model_info is None:
+            return self._get_executor().submit(fn, *args)
+
+        future = Future()
+        key = integration_key(model_info)
+        limit = self._limit_for(model_info)
+
+        with self._lock:
+            queue = self._queues.setdefault(key, _IntegrationQueue())
+            queue.pending.append((future, fn, args))
+
+        self._drain(key, limit)
+        return future
+
+    def _drain(self, key, limit):
+        executor = self._get_executor()
+        while True:
+            with self._lock:
+                queue = self._queues[key]
+                if queue.in_flight >= limit or not queue.pending:
+                    return
+                future, fn, args = queue.pending.popleft()
+                queue.in_flight += 1
+
+            if not future.set_running_or_notify_cancel():
+                with self._lock:
+                    queue.in_flight -= 1
+                continue
+
+            inner = executor.submit(fn, *args)
+            inner.add_done_callback(
+                lambda done, outer=future: self._on_done(key, limit, done, outer)
+            )
+
+    def _on_done(self, key, limit, done, outer):
+        with self._lock:
+            self._queues[key].in_flight -= 1
+
+        exception = done.exception()
+        if exception is not None:
+            outer.set_exception(exception)
+        else:
+            outer.set_result(done.result())
+
+        self._drain(key, limit)
+
+    def map(self, fn, items, model_of=None):
+        """
+        Выполняет fn(item) для всех элементов параллельно.
+
+        Результаты возвращаются в исходном порядке элементов. model_of(item)
+        должен возвращать словарь модели, чтобы учитывать лимит её интеграции.
+        """
+        futures = [
+            self.submit(fn, item, model_info=model_of(item) if model_of else None)
+            for item in items
+        ]
+        return [future.result() for future in futures]
+
+    def as_completed(self, fn, items, model_of=None):
+        """
+        Выполняет fn(item) для всех элементов параллельно и отдаёт пары
+        (индекс элемента, результат) по мере завершения вызовов, чтобы
+        обработка готовых результатов шла одновременно с остальными вызовами.
+        """
+        done = Queue()
+        for index, item in enumerate(items):
+            future = self.submit(fn, item, model_info=model_of(item) if model_of else None)
+            future.add_done_callback(lambda finished, index=index: done.put((index, finished)))
+
+        for _ in range(len(items)):
+            index, future = done.get()
+            yield index, future.result()
+
+
+execution_engine = ExecutionEngine()
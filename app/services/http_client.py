@@ -0,0 +1,83 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class SessionPool:
+    """
+    Пул HTTP-сессий для обращения к API моделей.
+
+    Для каждой пары (api_url, api_key) создаётся одна сессия requests с
+    keep-alive соединениями, поэтому повторные запросы к той же интеграции
+    не тратят время на новое TCP/TLS-рукопожатие. Сессии общие для всех
+    потоков движка выполнения.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=32, connect_retries=2, backoff_factor=0.3):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.connect_retries = connect_retries
+        self.backoff_factor = backoff_factor
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.pool_connections = app.config.get('HTTP_POOL_CONNECTIONS', self.pool_connections)
+        self.pool_maxsize = app.config.get('HTTP_POOL_MAXSIZE', self.pool_maxsize)
+        self.connect_retries = app.config.get('HTTP_CONNECT_RETRIES', self.connect_retries)
+        self.close_all()
+
+    def _create_session(self, api_key):
+        # Повторяем только ошибки установки соединения: в этом случае запрос
+        # гарантированно не дошёл до сервера и повтор POST безопасен.
+        # Ответы 429/5xx и Retry-After обрабатывает ограничитель запросов.
+        retry = Retry(
+            total=self.connect_retries,
+            connect=self.connect_retries,
+            read=0,
+            status=0,
+            backoff_factor=self.backoff_factor,
+            allowed_methods=None,
+            respect_retry_after_header=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry
+        )
+
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({'Content-Type': 'application/json'})
+        if api_key:
+            session.headers['Authorization'] = f'Bearer {api_key}'
+        return session
+
+    def get_session(self, api_url, api_key=None):
+        """Возвращает сессию для интеграции, создавая её при первом обращении."""
+        key = ((api_url or '').rstrip('/'), api_key or '')
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._create_session(api_key)
+                self._sessions[key] = session
+            return session
+
+    def post(self, api_url, api_key, path, **kwargs):
+        """Отправляет POST-запрос на api_url + path через сессию интеграции."""
+        session = self.get_session(api_url, api_key)
+        return session.post(f"{api_url.rstrip('/')}{path}", **kwargs)
+
+    def close_all(self):
+        """Закрывает все сессии и их соединения."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions = {}
+        for session in sessions:
+            session.close()
+
+
+session_pool = SessionPool()
@@ -0,0 +1,159 @@
+import importlib.metadata
+import importlib.util
+import os
+import re
+
+# Бэкенды вывода моделей метрик на CPU:
+# torch — исходные веса fp32;
+# int8  — динамическое квантование линейных слоёв PyTorch (qint8);
+# onnx  — граф модели, экспортированный в ONNX и исполняемый ONNX Runtime.
+BACKEND_TORCH = 'torch'
+BACKEND_INT8 = 'int8'
+BACKEND_ONNX = 'onnx'
+INFERENCE_BACKENDS = [BACKEND_TORCH, BACKEND_INT8, BACKEND_ONNX]
+
+
+def validate_backend(backend):
+    backend = (backend or BACKEND_TORCH).lower()
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f'Неизвестный бэкенд вывода: {backend}. Допустимые значения: {", ".join(INFERENCE_BACKENDS)}')
+    return backend
+
+
+# Пакеты, без которых бэкенд не запустится (модуль, пакет в pip), и минимальная версия
+# sentence-transformers с параметром backend; все они перечислены в requirements-inference.txt
+BACKEND_REQUIREMENTS = {
+    BACKEND_INT8: [('torch', 'torch')],
+    BACKEND_ONNX: [('torch', 'torch'), ('onnx', 'onnx'), ('onnxruntime', 'onnxruntime'),
+                   ('optimum', 'optimum[onnxruntime]')],
+}
+SENTENCE_TRANSFORMERS_BACKEND_VERSION = (3, 2)
+
+
+def _version_tuple(version):
+    return tuple(int(part) for part in re.findall(r'\d+', version)[:2])
+
+
+def check_backend_requirements(backend):
+    """
+    Проверяет при старте, что пакеты выбранного бэкенда установлены, чтобы
+    ошибка конфигурации была видна сразу, а не при первой оценке метрик.
+    """
+    missing = [package for module, package in BACKEND_REQUIREMENTS.get(backend, [])
+               if importlib.util.find_spec(module) is None]
+    if backend == BACKEND_ONNX:
+        try:
+            version = importlib.metadata.version('sentence-transformers')
+        except importlib.metadata.PackageNotFoundError:
+            version = None
+        if version is None or _version_tuple(version) < SENTENCE_TRANSFORMERS_BACKEND_VERSION:
+            missing.append('sentence-transformers>=%d.%d' % SENTENCE_TRANSFORMERS_BACKEND_VERSION)
+    if missing:
+        raise RuntimeError(f'Для бэкенда вывода {backend} не установлены пакеты: {", ".join(missing)}. '
+                           f'Установите их: pip install -r requirements-inference.txt')
+
+
+def quantize_int8(model):
+    """Динамическое int8-квантование линейных слоёв: веса int8, активации квантуются на лету."""
+    import torch
+
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_sentence_transformer(model_name, backend):
+    """SentenceTransformer с выбранным бэкендом вывода."""
+    from sentence_transformers import SentenceTransformer
+
+    if backend == BACKEND_ONNX:
+        # Экспорт и запуск через ONNX Runtime встроены в sentence-transformers (нужен optimum[onnxruntime])
+        return SentenceTransformer(model_name, device='cpu', backend='onnx')
+
+    model = SentenceTransformer(model_name, device='cpu' if backend == BACKEND_INT8 else None)
+    if backend == BACKEND_INT8:
+        model = quantize_int8(model)
+    return model
+
+
+class OnnxEncoder:
+    """
+    Замена трансформерного энкодера BERTScorer на сессию ONNX Runtime.
+
+    BERTScorer вызывает модель как model(input_ids, attention_mask=...) и
+    берёт out[0] — эмбеддинги токенов выбранного слоя. Энкодер, уже
+    обрезанный BERTScorer до этого слоя, экспортируется в ONNX один раз и
+    сохраняется в onnx_dir; дальше файл только загружается.
+    """
+
+    def __init__(self, model, model_type, onnx_dir):
+        import onnxruntime
+
+        os.makedirs(onnx_dir, exist_ok=True)
+        num_layers = len(model.encoder.layer) if hasattr(model, 'encoder') else 'all'
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_type)
+        path = os.path.join(onnx_dir, f'{safe_name}-L{num_layers}.onnx')
+        if not os.path.exists(path):
+            self._export(model, path)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+    @staticmethod
+    def _export(model, path):
+        import torch
+
+        model.eval()
+        dummy_ids = torch.ones((1, 8), dtype=torch.long)
+        dummy_mask = torch.ones((1, 8), dtype=torch.long)
+        partial_path = f'{path}.partial'
+        torch.onnx.export(
+            model,
+            (dummy_ids, {'attention_mask': dummy_mask}),
+            partial_path,
+            input_names=['input_ids', 'attention_mask'],
+            output_names=['last_hidden_state'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'last_hidden_state': {0: 'batch', 1: 'sequence'}
+            },
+            opset_version=14,
+        )
+        os.replace(partial_path, path)
+
+    def eval(self):
+        return self
+
+    def to(self, *args, **kwargs):
+        return self
+
+    def __call__(self, input_ids, attention_mask=None, output_hidden_states=False):
+        import torch
+
+        if output_hidden_states:
+            raise ValueError('ONNX-бэкенд BERTScore не поддерживает all_layers')
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        hidden = self.session.run(None, {
+            'input_ids': input_ids.cpu().numpy(),
+            'attention_mask': attention_mask.cpu().numpy()
+        })[0]
+        return (torch.from_numpy(hidden),)
+
+
+def load_bert_scorer(model_type, lang, batch_size, backend, onnx_dir):
+    """BERTScorer с энкодером, переведённым на выбранный бэкенд вывода."""
+    from bert_score import BERTScorer
+
+    scorer = BERTScorer(
+        model_type=model_type,
+        lang=lang,
+        rescale_with_baseline=True,
+        batch_size=batch_size,
+        device='cpu' if backend != BACKEND_TORCH else None,
+    )
+    if backend == BACKEND_INT8:
+        scorer._model = quantize_int8(scorer._model)
+    elif backend == BACKEND_ONNX:
+        scorer._model = OnnxEncoder(scorer._model, model_type, onnx_dir)
+    return scorer
@@ -0,0 +1,109 @@
+import threading
+
+
+def token_lengths(tokenizer, texts, max_length):
+    """
+    Длины текстов в токенах модели (со служебными токенами, с учётом обрезки).
+    Без токенизатора длина оценивается по числу слов.
+    """
+    texts = list(texts)
+    if tokenizer is None:
+        return [min(max_length, len(text.split()) + 2) for text in texts]
+    encoded = tokenizer(texts, add_special_tokens=True, truncation=True, max_length=max_length)['input_ids']
+    return [len(ids) for ids in encoded]
+
+
+def plan_length_buckets(lengths, max_tokens, max_batch_size):
+    """
+    Разбивает элементы на пакеты близкой длины.
+
+    Элементы сортируются по убыванию длины и набираются в пакет, пока
+    число элементов × длина самого длинного из них (размер пакета после
+    дополнения паддингом) не превысит max_tokens. Короткие тексты поэтому
+    идут большими пакетами, длинные — маленькими, а паддинга почти нет.
+    Возвращает списки индексов исходных элементов.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches = []
+    current = []
+    for index in order:
+        if current:
+            width = lengths[current[0]]
+            if len(current) >= max_batch_size or (len(current) + 1) * width > max_tokens:
+                batches.append(current)
+                current = []
+        current.append(index)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def padded_tokens(batches, lengths):
+    """Число токенов, которое модель обработает с учётом дополнения пакетов до самого длинного элемента."""
+    return sum(len(batch) * max(lengths[i] for i in batch) for batch in batches)
+
+
+class PaddingStats:
+    """Накопленная статистика паддинга: доля полезных токенов в обработанных моделью пакетах."""
+
+    def __init__(self):
+        self.texts = 0
+        self.batches = 0
+        self.real_tokens = 0
+        self.padded_tokens = 0
+        self.unbucketed_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, lengths, batches, unbucketed_tokens):
+        with self._lock:
+            self.texts += len(lengths)
+            self.batches += len(batches)
+            self.real_tokens += sum(lengths)
+            self.padded_tokens += padded_tokens(batches, lengths)
+            self.unbucketed_tokens += unbucketed_tokens
+
+    def snapshot(self):
+        with self._lock:
+            return self.texts, self.batches, self.real_tokens, self.padded_tokens, self.unbucketed_tokens
+
+    def to_dict(self, since=None):
+        """
+        Сводка: paddingEfficiency — доля полезных токенов в пакетах по длине,
+        unbucketedEfficiency — какой она была бы при пакетах фиксированного
+        размера в исходном порядке. since — снимок snapshot() для расчёта
+        статистики только за период после него.
+        """
+        texts, batches, real, padded, unbucketed = self.snapshot()
+        if since is not None:
+            texts, batches, real, padded, unbucketed = (
+                value - before for value, before in zip((texts, batches, real, padded, unbucketed), since)
+            )
+        return {
+            'texts': texts,
+            'batches': batches,
+            'realTokens': real,
+            'paddedTokens': padded,
+            'paddingEfficiency': round(real / padded, 3) if padded else None,
+            'unbucketedEfficiency': round(real / unbucketed, 3) if unbucketed else None
+        }
+
+
+def run_length_bucketed(items, lengths, fn, max_tokens, max_batch_size, stats=None):
+    """
+    Вызывает fn(список элементов) по пакетам близкой длины и возвращает
+    результаты в исходном порядке элементов. fn должна возвращать по одному
+    результату на элемент пакета.
+    """
+    items = list(items)
+    batches = plan_length_buckets(lengths, max_tokens, max_batch_size)
+    results = [None] * len(items)
+    for batch in batches:
+        outputs = fn([items[i] for i in batch])
+        for index, output in zip(batch, outputs):
+            results[index] = output
+
+    if stats is not None:
+        fixed_batches = [list(range(start, min(start + max_batch_size, len(items))))
+                         for start in range(0, len(items), max_batch_size)]
+        stats.record(lengths, batches, padded_tokens(fixed_batches, lengths))
+    return results
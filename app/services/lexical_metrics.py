@@ -0,0 +1,319 @@
+import re
+import string
+from collections import Counter
+from functools import cached_property
+
+
+# Ключи лексических метрик в metrics_config и в результатах; 'rouge' — это ROUGE-L
+LEXICAL_METRICS = ['rouge', 'rouge1', 'rouge2', 'rougeLsum', 'bleu', 'chrf', 'tokenF1', 'exactMatch']
+
+BLEU_MAX_ORDER = 4
+CHRF_MAX_ORDER = 6
+CHRF_BETA = 2
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n+')
+_PUNCTUATION = re.compile(f'[{re.escape(string.punctuation)}«»—–…]')
+_ARTICLES = re.compile(r'\b(a|an|the)\b')
+
+
+def tokenize(text):
+    """Токены для лексических метрик: слова в нижнем регистре."""
+    return re.findall(r'\w+', text.lower())
+
+
+def normalize_answer(text):
+    """Нормализация ответа для exact match и token F1 (как в SQuAD)."""
+    text = _ARTICLES.sub(' ', _PUNCTUATION.sub(' ', text.lower()))
+    return ' '.join(text.split())
+
+
+def ngram_counts(tokens, order):
+    return Counter(tuple(tokens[i:i + order]) for i in range(len(tokens) - order + 1))
+
+
+class TextFeatures:
+    """
+    Всё, что нужно лексическим метрикам от одного текста, вычисленное один раз:
+    токены, предложения, n-граммы слов и символов, нормализованная форма.
+    Всё, кроме токенов, считается при первом обращении, поэтому признаки
+    метрик, которые не запрошены, не вычисляются.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+
+    @cached_property
+    def sentences(self):
+        return [tokens for tokens in (tokenize(part) for part in _SENTENCE_SPLIT.split(self.text)) if tokens]
+
+    @cached_property
+    def word_ngrams(self):
+        return [ngram_counts(self.tokens, order) for order in range(1, BLEU_MAX_ORDER + 1)]
+
+    @cached_property
+    def char_ngrams(self):
+        chars = ''.join(self.text.split())
+        return [
+            Counter(chars[i:i + order] for i in range(len(chars) - order + 1))
+            for order in range(1, CHRF_MAX_ORDER + 1)
+        ]
+
+    @cached_property
+    def normalized(self):
+        return normalize_answer(self.text)
+
+    @cached_property
+    def normalized_tokens(self):
+        return Counter(self.normalized.split())
+
+
+def lcs_length(seq1, seq2):
+    """
+    Длина наибольшей общей подпоследовательности двух последовательностей токенов.
+
+    Используется бит-параллельный алгоритм (Allison–Dix, Hyyrö): более короткая
+    последовательность кодируется битовыми масками позиций каждого токена, а
+    строка таблицы ДП хранится одним целым числом, так что шаг по токену второй
+    последовательности стоит несколько операций над m-битным числом.
+    Время O(n·⌈m/w⌉), память O(m) вместо таблицы (m+1)×(n+1).
+    Для нехешируемых элементов используется ДП с двумя строками.
+    """
+    if not seq1 or not seq2:
+        return 0
+    try:
+        return lcs_length_bit_parallel(seq1, seq2)
+    except TypeError:
+        return lcs_length_linear(seq1, seq2)
+
+
+def lcs_length_bit_parallel(seq1, seq2):
+    pattern, text = (seq1, seq2) if len(seq1) <= len(seq2) else (seq2, seq1)
+
+    masks = {}
+    for position, token in enumerate(pattern):
+        masks[token] = masks.get(token, 0) | (1 << position)
+
+    full = (1 << len(pattern)) - 1
+    row = full
+    for token in text:
+        matches = row & masks.get(token, 0)
+        if matches:
+            row = ((row + matches) | (row - matches)) & full
+
+    # Нулевые биты строки соответствуют символам, вошедшим в LCS
+    return len(pattern) - bin(row).count('1')
+
+
+def lcs_length_linear(seq1, seq2):
+    """Классическое ДП для LCS, хранящее только две строки таблицы: память O(min(m, n))."""
+    if len(seq1) < len(seq2):
+        seq1, seq2 = seq2, seq1
+
+    previous = [0] * (len(seq2) + 1)
+    for item in seq1:
+        current = [0]
+        for j, other in enumerate(seq2):
+            if item == other:
+                current.append(previous[j] + 1)
+            else:
+                current.append(max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+def rouge_l_f1(ref_tokens, cand_tokens):
+    """ROUGE-L F1 по спискам токенов эталона и ответа."""
+    if not ref_tokens or not cand_tokens:
+        return 0.0
+
+    lcs_len = lcs_length(ref_tokens, cand_tokens)
+    if lcs_len == 0:
+        return 0.0
+
+    precision = lcs_len / len(cand_tokens)
+    recall = lcs_len / len(ref_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def lcs_table(seq1, seq2):
+    m, n = len(seq1), len(seq2)
+    table = [[0] * (n + 1) for _ in range(m + 1)]
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            if seq1[i - 1] == seq2[j - 1]:
+                table[i][j] = table[i - 1][j - 1] + 1
+            else:
+                table[i][j] = max(table[i - 1][j], table[i][j - 1])
+    return table
+
+
+def lcs_positions(seq1, seq2):
+    """Позиции seq1, вошедшие в одну из LCS с seq2 (для коротких последовательностей — предложений)."""
+    table = lcs_table(seq1, seq2)
+    positions = set()
+    i, j = len(seq1), len(seq2)
+    while i > 0 and j > 0:
+        if seq1[i - 1] == seq2[j - 1]:
+            positions.add(i - 1)
+            i -= 1
+            j -= 1
+        elif table[i - 1][j] >= table[i][j - 1]:
+            i -= 1
+        else:
+            j -= 1
+    return positions
+
+
+def rouge_lsum_hits(reference, candidate):
+    """
+    Число совпадений для ROUGE-Lsum: для каждого предложения эталона берётся
+    объединение LCS со всеми предложениями ответа, совпадения ограничиваются
+    количеством токенов в обоих текстах.
+    """
+    ref_counts = Counter(reference.tokens)
+    cand_counts = Counter(candidate.tokens)
+    hits = 0
+    for ref_sentence in reference.sentences:
+        union = set()
+        for cand_sentence in candidate.sentences:
+            union |= lcs_positions(ref_sentence, cand_sentence)
+        for position in sorted(union):
+            token = ref_sentence[position]
+            if ref_counts[token] > 0 and cand_counts[token] > 0:
+                hits += 1
+                ref_counts[token] -= 1
+                cand_counts[token] -= 1
+    return hits
+
+
+def overlap(ref_counts, cand_counts):
+    return sum((ref_counts & cand_counts).values())
+
+
+def safe_ratio(numerator, denominator):
+    import numpy as np
+
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+
+def f_beta(precision, recall, beta=1.0):
+    """Векторизованная F-мера по массивам точности и полноты; при нулевых значениях — 0."""
+    return safe_ratio((1 + beta ** 2) * precision * recall, beta ** 2 * precision + recall)
+
+
+def f_measure(hits, cand_total, ref_total):
+    """F1 по массивам числа совпадений и длин ответа и эталона."""
+    return f_beta(safe_ratio(hits, cand_total), safe_ratio(hits, ref_total))
+
+
+def score_lexical_batch(references, candidates, metrics=None):
+    """
+    Лексические метрики для списка пар (эталон, ответ) за один проход.
+
+    Каждый уникальный текст токенизируется один раз (эталон, общий для
+    нескольких моделей, — тоже), счётчики совпадений всех пар собираются
+    в массивы, а F-меры, BLEU и chrF считаются над ними векторно.
+    metrics ограничивает набор метрик (по умолчанию — все LEXICAL_METRICS);
+    признаки, нужные только незапрошенным метрикам, не вычисляются.
+    Возвращает список словарей {метрика: значение от 0 до 1}.
+    """
+    if not references:
+        return []
+    metrics = [metric for metric in LEXICAL_METRICS if metrics is None or metric in metrics]
+    if not metrics:
+        return [{} for _ in references]
+    # numpy импортируется здесь, чтобы импорт модуля не замедлял старт приложения
+    import numpy as np
+
+    need_words = any(metric in metrics for metric in ('rouge1', 'rouge2', 'bleu'))
+    need_normalized = any(metric in metrics for metric in ('tokenF1', 'exactMatch'))
+
+    features = {}
+
+    def features_of(text):
+        if text not in features:
+            features[text] = TextFeatures(text)
+        return features[text]
+
+    pairs = len(references)
+    ref_len = np.zeros(pairs)
+    cand_len = np.zeros(pairs)
+    lcs_hits = np.zeros(pairs)
+    lsum_hits = np.zeros(pairs)
+    word_hits = np.zeros((pairs, BLEU_MAX_ORDER))
+    word_ref_total = np.zeros((pairs, BLEU_MAX_ORDER))
+    word_cand_total = np.zeros((pairs, BLEU_MAX_ORDER))
+    char_hits = np.zeros((pairs, CHRF_MAX_ORDER))
+    char_ref_total = np.zeros((pairs, CHRF_MAX_ORDER))
+    char_cand_total = np.zeros((pairs, CHRF_MAX_ORDER))
+    token_hits = np.zeros(pairs)
+    token_ref_total = np.zeros(pairs)
+    token_cand_total = np.zeros(pairs)
+    exact = np.zeros(pairs)
+
+    for i, (reference_text, candidate_text) in enumerate(zip(references, candidates)):
+        reference = features_of(reference_text or '')
+        candidate = features_of(candidate_text or '')
+
+        ref_len[i] = len(reference.tokens)
+        cand_len[i] = len(candidate.tokens)
+        if 'rouge' in metrics:
+            lcs_hits[i] = lcs_length(reference.tokens, candidate.tokens)
+        if 'rougeLsum' in metrics:
+            lsum_hits[i] = rouge_lsum_hits(reference, candidate)
+
+        if need_words:
+            for order in range(BLEU_MAX_ORDER):
+                word_hits[i, order] = overlap(reference.word_ngrams[order], candidate.word_ngrams[order])
+                word_ref_total[i, order] = max(0, len(reference.tokens) - order)
+                word_cand_total[i, order] = max(0, len(candidate.tokens) - order)
+
+        if 'chrf' in metrics:
+            for order in range(CHRF_MAX_ORDER):
+                char_hits[i, order] = overlap(reference.char_ngrams[order], candidate.char_ngrams[order])
+                char_ref_total[i, order] = sum(reference.char_ngrams[order].values())
+                char_cand_total[i, order] = sum(candidate.char_ngrams[order].values())
+
+        if need_normalized:
+            token_hits[i] = overlap(reference.normalized_tokens, candidate.normalized_tokens)
+            token_ref_total[i] = sum(reference.normalized_tokens.values())
+            token_cand_total[i] = sum(candidate.normalized_tokens.values())
+            exact[i] = float(bool(reference.normalized) and reference.normalized == candidate.normalized)
+
+    def bleu():
+        # BLEU со сглаживанием add-one для n > 1 (Lin, Och 2004) и штрафом за краткость
+        smoothing = np.zeros(BLEU_MAX_ORDER)
+        smoothing[1:] = 1.0
+        precisions = (word_hits + smoothing) / np.maximum(word_cand_total + smoothing, 1.0)
+        log_precision = np.log(np.maximum(precisions, 1e-9)).mean(axis=1)
+        brevity = np.where(cand_len >= ref_len, 1.0, np.exp(1 - ref_len / np.maximum(cand_len, 1.0)))
+        return np.where((cand_len > 0) & (word_hits[:, 0] > 0), brevity * np.exp(log_precision), 0.0)
+
+    def chrf():
+        # chrF: средние по порядкам n точность и полнота символьных n-грамм, F-beta с beta=2.
+        # Усредняются только порядки, для которых n-граммы есть и в ответе, и в эталоне
+        # (effective order, как в sacrebleu), иначе короткие совпадающие ответы получают меньше 1
+        effective = (char_cand_total > 0) & (char_ref_total > 0)
+        orders = np.maximum(effective.sum(axis=1), 1)
+        return f_beta(
+            np.where(effective, safe_ratio(char_hits, char_cand_total), 0.0).sum(axis=1) / orders,
+            np.where(effective, safe_ratio(char_hits, char_ref_total), 0.0).sum(axis=1) / orders,
+            CHRF_BETA
+        )
+
+    column_builders = {
+        'rouge': lambda: f_measure(lcs_hits, cand_len, ref_len),
+        'rouge1': lambda: f_measure(word_hits[:, 0], word_cand_total[:, 0], word_ref_total[:, 0]),
+        'rouge2': lambda: f_measure(word_hits[:, 1], word_cand_total[:, 1], word_ref_total[:, 1]),
+        'rougeLsum': lambda: f_measure(lsum_hits, cand_len, ref_len),
+        'bleu': bleu,
+        'chrf': chrf,
+        'tokenF1': lambda: f_measure(token_hits, token_cand_total, token_ref_total),
+        'exactMatch': lambda: exact
+    }
+    columns = {metric: column_builders[metric]() for metric in metrics}
+    return [
+        {metric: float(min(1.0, max(0.0, values[i]))) for metric, values in columns.items()}
+        for i in range(pairs)
+    ]
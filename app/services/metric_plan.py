@@ -0,0 +1,115 @@
+from app.services.lexical_metrics import LEXICAL_METRICS
+
+SCORING_MODE_FULL = 'full'
+SCORING_MODE_CASCADE = 'cascade'
+SCORING_MODES = [SCORING_MODE_FULL, SCORING_MODE_CASCADE]
+
+# Метрики на трансформерных моделях: дорогие по сравнению с лексическими
+TRANSFORMER_METRICS = ['semantic', 'bertScore']
+
+DEFAULT_WEIGHTS = {'rouge': 0.4, 'semantic': 0.3, 'bertScore': 0.3}
+
+
+class MetricPlan:
+    """
+    План расчёта метрик по весам из metrics_config.
+
+    Метрики с нулевым весом не считаются вовсе. В каскадном режиме
+    (scoring_mode='cascade') сначала считаются дешёвые лексические метрики,
+    а трансформерные — только для тех пар, от которых ещё может зависеть
+    порядок моделей в рейтинге (см. cascade_transformer_scores).
+    """
+
+    def __init__(self, metrics_config, scoring_mode=SCORING_MODE_FULL):
+        self.weights = {
+            metric: float((metrics_config.get(metric) or {}).get('weight', DEFAULT_WEIGHTS.get(metric, 0)) or 0)
+            for metric in LEXICAL_METRICS + TRANSFORMER_METRICS
+        }
+        self.lexical_metrics = [metric for metric in LEXICAL_METRICS if self.weights[metric] > 0]
+        self.transformer_metrics = [metric for metric in TRANSFORMER_METRICS if self.weights[metric] > 0]
+        self.cascade = scoring_mode == SCORING_MODE_CASCADE and bool(self.transformer_metrics)
+        self.mode = SCORING_MODE_CASCADE if self.cascade else SCORING_MODE_FULL
+
+    @property
+    def skipped_metrics(self):
+        return [metric for metric, weight in self.weights.items() if weight <= 0]
+
+    def weighted_score(self, scores):
+        """Взвешенная оценка пары по шкале 0–10 по уже посчитанным метрикам."""
+        return sum(
+            scores[metric] * weight
+            for metric, weight in self.weights.items()
+            if weight > 0 and scores.get(metric) is not None
+        ) * 10
+
+    def score_bounds(self, scores):
+        """
+        Границы взвешенной оценки пары: не посчитанные трансформерные метрики
+        могут принять любое значение от 0 до 1.
+        """
+        known = self.weighted_score(scores)
+        unknown = sum(self.weights[metric] for metric in self.transformer_metrics if scores.get(metric) is None) * 10
+        return known, known + unknown
+
+    def average_bounds(self, pair_scores):
+        """Границы средней оценки модели по оценкам её пар."""
+        if not pair_scores:
+            return 0.0, 0.0
+        bounds = [self.score_bounds(scores) for scores in pair_scores]
+        return (sum(low for low, _ in bounds) / len(bounds),
+                sum(high for _, high in bounds) / len(bounds))
+
+    def to_dict(self):
+        return {
+            'mode': self.mode,
+            'metrics': self.lexical_metrics + self.transformer_metrics,
+            'skippedMetrics': self.skipped_metrics
+        }
+
+
+def intervals_overlap(first, second):
+    return first[0] <= second[1] and second[0] <= first[1]
+
+
+def cascade_transformer_scores(plan, scores, pairs_by_model, score_transformer, chunk_size=32):
+    """
+    Каскадный расчёт трансформерных метрик.
+
+    scores — {ключ пары: словарь метрик} с уже посчитанными лексическими
+    метриками, pairs_by_model — {модель: [(ключ, эталон, ответ), ...]}.
+    Пока интервал возможной средней оценки модели пересекается с интервалом
+    другой модели, их порядок не определён, и для неоценённых пар этих моделей
+    порциями по chunk_size вызывается score_transformer(эталоны, ответы).
+    Когда интервалы разошлись, остальные пары не оцениваются: порядок моделей
+    получится тем же, что и при полном расчёте.
+    Возвращает {модель: (нижняя, верхняя граница средней оценки)} и число
+    оценённых трансформерными метриками пар.
+    """
+    pending = {model: list(pairs) for model, pairs in pairs_by_model.items()}
+    scored_pairs = 0
+
+    while True:
+        bounds = {
+            model: plan.average_bounds([scores[key] for key, _, _ in pairs])
+            for model, pairs in pairs_by_model.items()
+        }
+        contested = [
+            model for model in pairs_by_model
+            if pending[model] and any(
+                intervals_overlap(bounds[model], bounds[other]) for other in pairs_by_model if other != model
+            )
+        ]
+        if not contested:
+            return bounds, scored_pairs
+
+        # Порция набирается поровну из всех спорных моделей, чтобы их интервалы сужались одновременно
+        chunk = []
+        while len(chunk) < chunk_size and any(pending[model] for model in contested):
+            for model in contested:
+                if pending[model] and len(chunk) < chunk_size:
+                    chunk.append(pending[model].pop(0))
+
+        values = score_transformer([reference for _, reference, _ in chunk], [candidate for _, _, candidate in chunk])
+        for (key, _, _), value in zip(chunk, values):
+            scores[key].update(value)
+        scored_pairs += len(chunk)
@@ -3,16 +3,11 @@ import requests
 import time
 from flask import current_app
 
+from app.services.http_client import session_pool
+
 
 def test_model_connection(api_url, api_key=None, model_name=None, timeout=10):
     try:
-        headers = {
-            'Content-Type': 'application/json'
-        }
-
-        if api_key:
-            headers['Authorization'] = f'Bearer {api_key}'
-
         payload = {
             'model': model_name or 'default',
             'messages': [
@@ -25,9 +20,10 @@ def test_model_connection(api_url, api_key=None, model_name=None, timeout=10):
 
         start_time = time.time()
 
-        response = requests.post(
-            f"{api_url.rstrip('/')}/chat/completions",
-            headers=headers,
+        response = session_pool.post(
+            api_url,
+            api_key,
+            '/chat/completions',
             json=payload,
             timeout=timeout
         )
@@ -0,0 +1,176 @@
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.completion_service import post_chat_completion
+from app.services.retry_policy import percentile
+
+
+ARRIVAL_MODE_CLOSED = 'closed'
+ARRIVAL_MODE_OPEN = 'open'
+
+# Уровень считается точкой насыщения, если следующий уровень нагрузки
+# прибавляет меньше 10% пропускной способности или даёт больше 5% ошибок
+SATURATION_THROUGHPUT_GAIN = 0.10
+SATURATION_ERROR_RATE = 0.05
+
+# При такой доле ошибок следующие уровни нагрузки не запускаются
+ABORT_ERROR_RATE = 0.5
+
+
+def run_closed_loop(model_info, payloads, concurrency, timeout):
+    """
+    Закрытая модель нагрузки: concurrency виртуальных пользователей,
+    каждый отправляет следующий запрос сразу после ответа на предыдущий.
+
+    Возвращает список пар (задержка, CompletionResult).
+    """
+    queue = iter(payloads)
+    queue_lock = threading.Lock()
+    samples = []
+    samples_lock = threading.Lock()
+
+    def user():
+        while True:
+            with queue_lock:
+                payload = next(queue, None)
+            if payload is None:
+                return
+            started_at = time.perf_counter()
+            result = post_chat_completion(model_info, payload, timeout)
+            with samples_lock:
+                samples.append((time.perf_counter() - started_at, result))
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='load-test') as executor:
+        for _ in range(concurrency):
+            executor.submit(user)
+    return samples
+
+
+def run_open_loop(model_info, payloads, rate, timeout, max_in_flight):
+    """
+    Открытая модель нагрузки: запросы поступают пуассоновским потоком
+    с интенсивностью rate запросов в секунду независимо от ответов.
+
+    Задержка отсчитывается от запланированного момента поступления, поэтому
+    ожидание свободного потока при перегрузке входит в неё и не скрывает
+    рост очереди.
+    """
+    samples = []
+    samples_lock = threading.Lock()
+
+    def send(payload, scheduled_at):
+        result = post_chat_completion(model_info, payload, timeout)
+        with samples_lock:
+            samples.append((time.perf_counter() - scheduled_at, result))
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='load-test') as executor:
+        scheduled_at = time.perf_counter()
+        for payload in payloads:
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, payload, scheduled_at)
+            scheduled_at += random.expovariate(rate)
+    return samples
+
+
+def summarize_level(level, samples, duration):
+    """Пропускная способность, доля ошибок и перцентили задержек одного уровня нагрузки."""
+    succeeded = [(latency, result) for latency, result in samples if result.ok]
+    errors = len(samples) - len(succeeded)
+    output_tokens = sum(result.output_tokens or 0 for _, result in succeeded)
+
+    def distribution(values):
+        values = sorted(value for value in values if value is not None)
+        if not values:
+            return None
+        return {
+            'p50': round(percentile(values, 0.5), 4),
+            'p95': round(percentile(values, 0.95), 4),
+            'p99': round(percentile(values, 0.99), 4)
+        }
+
+    return {
+        'level': level,
+        'requests': len(samples),
+        'errors': errors,
+        'errorRate': round(errors / len(samples), 4) if samples else 0.0,
+        'duration': round(duration, 3),
+        'throughput': round(len(succeeded) / duration, 3) if duration > 0 else 0.0,
+        'outputTokensPerSecond': round(output_tokens / duration, 2) if duration > 0 else 0.0,
+        'latency': distribution(latency for latency, _ in succeeded),
+        'ttft': distribution(result.ttft for _, result in succeeded)
+    }
+
+
+def find_saturation_point(levels):
+    """
+    Последний уровень нагрузки, после которого рост нагрузки перестаёт
+    давать прирост пропускной способности или начинает давать ошибки.
+
+    Возвращает None, если насыщение на проверенных уровнях не достигнуто.
+    """
+    for previous, current in zip(levels, levels[1:]):
+        if current['errorRate'] > SATURATION_ERROR_RATE:
+            reason = 'error_rate'
+        elif current['throughput'] < previous['throughput'] * (1 + SATURATION_THROUGHPUT_GAIN):
+            reason = 'throughput_plateau'
+        else:
+            continue
+        return {
+            'level': previous['level'],
+            'throughput': previous['throughput'],
+            'reason': reason
+        }
+    return None
+
+
+def run_load_test(model_info, messages_list, config):
+    """
+    Нагрузочный тест одной модели на всех уровнях нагрузки из config.
+
+    Промпты из messages_list повторяются по кругу, пока на уровне не наберётся
+    нужное число запросов. Запросы идут напрямую к API, минуя кэш ответов,
+    ограничитель запросов и повторы, чтобы измерялся сам эндпоинт.
+    """
+    levels = []
+    stopped_early = False
+
+    for level in config.levels:
+        count = max(config.requests_per_level, level * 2) if config.arrival_mode == ARRIVAL_MODE_CLOSED \
+            else config.requests_per_level
+        payloads = [
+            {
+                'model': model_info.get('name', 'default'),
+                'messages': messages,
+                'max_tokens': config.max_tokens,
+                'temperature': 0.7
+            }
+            for messages in itertools.islice(itertools.cycle(messages_list), count)
+        ]
+
+        started_at = time.perf_counter()
+        if config.arrival_mode == ARRIVAL_MODE_OPEN:
+            samples = run_open_loop(model_info, payloads, level, config.timeout, config.max_in_flight)
+        else:
+            samples = run_closed_loop(model_info, payloads, level, config.timeout)
+        summary = summarize_level(level, samples, time.perf_counter() - started_at)
+        levels.append(summary)
+
+        if summary['errorRate'] >= ABORT_ERROR_RATE:
+            stopped_early = True
+            break
+
+    peak = max(levels, key=lambda item: item['throughput']) if levels else None
+    return {
+        'id': model_info['id'],
+        'name': model_info['name'],
+        'levels': levels,
+        'peakThroughput': peak['throughput'] if peak else 0.0,
+        'peakLevel': peak['level'] if peak else None,
+        'saturationPoint': find_saturation_point(levels),
+        'stoppedEarly': stopped_early
+    }
@@ -0,0 +1,136 @@
+import hashlib
+import heapq
+import random
+from itertools import islice
+
+# Стратегии выборки промптов из датасета:
+# head       — первые size строк;
+# reservoir  — равномерная случайная выборка (резервуарная, с seed);
+# hash       — детерминированная: size строк с наименьшим хэшем (seed, текст промпта),
+#              выборка не меняется между запусками и почти не меняется при дописывании строк;
+# stratified — пропорционально долям категорий (колонка категории или весь датасет).
+SAMPLING_HEAD = 'head'
+SAMPLING_RESERVOIR = 'reservoir'
+SAMPLING_HASH = 'hash'
+SAMPLING_STRATIFIED = 'stratified'
+SAMPLING_STRATEGIES = [SAMPLING_HEAD, SAMPLING_RESERVOIR, SAMPLING_HASH, SAMPLING_STRATIFIED]
+
+
+class SamplingSettings:
+    """Выборка промптов по умолчанию, если в запросе бенчмарка она не задана."""
+
+    def __init__(self, strategy=SAMPLING_HEAD, size=20, seed=0):
+        self.strategy = strategy
+        self.size = size
+        self.seed = seed
+
+    def init_app(self, app):
+        strategy = app.config.get('PROMPT_SAMPLING_STRATEGY') or self.strategy
+        if strategy not in SAMPLING_STRATEGIES:
+            raise ValueError(f'Неизвестная стратегия выборки промптов: {strategy}. '
+                             f'Допустимые значения: {", ".join(SAMPLING_STRATEGIES)}')
+        self.strategy = strategy
+        self.size = app.config.get('PROMPT_SAMPLE_SIZE', self.size)
+        self.seed = app.config.get('PROMPT_SAMPLING_SEED', self.seed)
+
+
+sampling_settings = SamplingSettings()
+
+
+def head_sample(items, size):
+    return list(islice(items, size))
+
+
+def reservoir_sample(items, size, seed):
+    """Равномерная выборка size элементов за один проход (алгоритм R), в порядке следования в датасете."""
+    rng = random.Random(seed)
+    reservoir = []
+    for position, item in enumerate(items):
+        if position < size:
+            reservoir.append((position, item))
+        else:
+            slot = rng.randint(0, position)
+            if slot < size:
+                reservoir[slot] = (position, item)
+    return [item for _, item in sorted(reservoir, key=lambda entry: entry[0])]
+
+
+def _hash_key(seed, text):
+    return hashlib.sha1(f'{seed}\0{text}'.encode('utf-8')).digest()
+
+
+def hash_sample(items, size, seed, key):
+    """size элементов с наименьшим хэшем key(элемент); в памяти — куча из size элементов."""
+    heap = []
+    for position, item in enumerate(items):
+        # В куче хранится инвертированный хэш, чтобы на вершине был наибольший из отобранных
+        entry = (bytes(255 - byte for byte in _hash_key(seed, key(item))), position, item)
+        if len(heap) < size:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    return [item for _, _, item in sorted(heap, key=lambda entry: entry[1])]
+
+
+def stratified_sample(items, size, seed, stratum):
+    """
+    Выборка, в которой доли страт (stratum(элемент)) те же, что в датасете.
+
+    За один проход для каждой страты ведётся свой резервуар из size
+    элементов и счётчик строк; затем size распределяется между стратами
+    пропорционально их размеру (методом наибольших остатков), и из каждого
+    резервуара берётся нужное число случайных элементов.
+    """
+    rng = random.Random(seed)
+    reservoirs = {}
+    counts = {}
+    for position, item in enumerate(items):
+        name = stratum(item)
+        seen = counts.get(name, 0)
+        counts[name] = seen + 1
+        reservoir = reservoirs.setdefault(name, [])
+        if seen < size:
+            reservoir.append((position, item))
+        else:
+            slot = rng.randint(0, seen)
+            if slot < size:
+                reservoir[slot] = (position, item)
+
+    total = sum(counts.values())
+    if total <= size:
+        quotas = dict(counts)
+    else:
+        shares = {name: size * count / total for name, count in counts.items()}
+        quotas = {name: int(share) for name, share in shares.items()}
+        remainder = size - sum(quotas.values())
+        for name in sorted(shares, key=lambda name: shares[name] - quotas[name], reverse=True)[:remainder]:
+            quotas[name] += 1
+
+    selected = []
+    for name, reservoir in reservoirs.items():
+        rng.shuffle(reservoir)
+        selected.extend(reservoir[:quotas[name]])
+    return [item for _, item in sorted(selected, key=lambda entry: entry[0])]
+
+
+def sample_items(items, strategy=None, size=None, seed=None, key=str, stratum=None):
+    """
+    Выбирает элементы из итератора items за один проход, храня в памяти
+    не больше size элементов (для stratified — size на страту).
+    Пустые strategy/size/seed берутся из настроек; size <= 0 — без ограничения.
+    """
+    strategy = strategy or sampling_settings.strategy
+    size = sampling_settings.size if size is None else size
+    seed = sampling_settings.seed if seed is None else seed
+    if strategy not in SAMPLING_STRATEGIES:
+        raise ValueError(f'Неизвестная стратегия выборки промптов: {strategy}')
+
+    if size <= 0:
+        return list(items)
+    if strategy == SAMPLING_RESERVOIR:
+        return reservoir_sample(items, size, seed)
+    if strategy == SAMPLING_HASH:
+        return hash_sample(items, size, seed, key)
+    if strategy == SAMPLING_STRATIFIED:
+        return stratified_sample(items, size, seed, stratum or (lambda item: None))
+    return head_sample(items, size)
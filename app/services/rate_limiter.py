@@ -0,0 +1,206 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from app.services.execution_engine import integration_key, integration_settings
+
+
+THROTTLE_STATUS_CODES = {429}
+
+# Пауза после 429, если провайдер не прислал Retry-After, секунды
+DEFAULT_THROTTLE_DELAY = 1.0
+
+
+def is_overload_status(status_code):
+    """Ответы, после которых нужно снизить нагрузку на провайдера: 429 и 5xx."""
+    return status_code is not None and (status_code in THROTTLE_STATUS_CODES or 500 <= status_code < 600)
+
+
+def parse_retry_after(value):
+    """Разбирает заголовок Retry-After (секунды или HTTP-дата) в число секунд."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_request_tokens(messages, max_tokens):
+    """
+    Грубая оценка числа токенов запроса для бюджета TPM.
+
+    Провайдеры учитывают в лимите и входные токены, и max_tokens ответа;
+    входные токены оцениваются как четыре символа на токен.
+    """
+    prompt_chars = sum(len(message.get('content') or '') for message in messages)
+    return prompt_chars // 4 + 1 + (max_tokens or 0)
+
+
+class TokenBucket:
+    """Токен-бакет с бюджетом на минуту; резервирование может уводить баланс в минус."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, amount):
+        """Списывает amount токенов и возвращает, сколько секунд нужно подождать."""
+        with self._lock:
+            self._refill(time.monotonic())
+            # Запрос больше всего бюджета иначе ждал бы вечно
+            amount = min(float(amount), self.capacity)
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def adjust(self, delta):
+        """Корректирует баланс, когда фактический расход отличается от оценки."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class AdaptiveConcurrency:
+    """
+    Лимит одновременных запросов по схеме AIMD.
+
+    Каждый успешный ответ увеличивает лимит примерно на единицу за «окно»
+    из limit запросов, а ответ 429/5xx уменьшает его вдвое.
+    """
+
+    def __init__(self, max_limit, min_limit=1, decrease_factor=0.5):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = min_limit
+        self.decrease_factor = decrease_factor
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= max(self.min_limit, int(self.limit)):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, overloaded):
+        with self._condition:
+            self.in_flight -= 1
+            if overloaded:
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1.0 / max(1.0, self.limit))
+            self._condition.notify_all()
+
+    def cancel(self):
+        """Освобождает слот отменённого запроса, не меняя лимит: отмена не говорит о нагрузке провайдера."""
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+
+class IntegrationRateLimiter:
+    """Ограничитель запросов одной API интеграции: RPM, TPM, AIMD и Retry-After."""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_concurrency=4):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, estimated_tokens):
+        """Блокирует поток, пока запрос не укладывается во все лимиты интеграции."""
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.reserve(estimated_tokens))
+        with self._lock:
+            wait = max(wait, self.blocked_until - time.monotonic())
+        if wait > 0:
+            time.sleep(wait)
+        self.concurrency.acquire()
+
+    def release(self, status_code=None, retry_after=None, estimated_tokens=0, used_tokens=None):
+        """Учитывает результат запроса: статус, Retry-After и фактический расход токенов."""
+        overloaded = is_overload_status(status_code)
+        self.concurrency.release(overloaded)
+
+        if self.tokens and used_tokens is not None:
+            self.tokens.adjust(used_tokens - estimated_tokens)
+
+        if status_code in THROTTLE_STATUS_CODES and not retry_after:
+            retry_after = DEFAULT_THROTTLE_DELAY
+
+        if overloaded and retry_after:
+            with self._lock:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def cancel(self):
+        """Освобождает слот параллелизма запроса, отменённого до получения ответа."""
+        self.concurrency.cancel()
+
+    def snapshot(self):
+        """Текущее состояние ограничителя для диагностики."""
+        return {
+            'requests_per_minute': self.requests_per_minute,
+            'tokens_per_minute': self.tokens_per_minute,
+            'concurrency_limit': round(self.concurrency.limit, 2),
+            'in_flight': self.concurrency.in_flight,
+            'blocked_for': round(max(0.0, self.blocked_until - time.monotonic()), 2)
+        }
+
+
+class RateLimiterRegistry:
+    """Ограничители запросов по API интеграциям, общие для всего процесса."""
+
+    def __init__(self, default_rpm=None, default_tpm=None, default_concurrency=4, max_throttle_retries=3):
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.default_concurrency = default_concurrency
+        self.max_throttle_retries = max_throttle_retries
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.default_rpm = app.config.get('RATE_LIMIT_DEFAULT_RPM') or None
+        self.default_tpm = app.config.get('RATE_LIMIT_DEFAULT_TPM') or None
+        self.default_concurrency = app.config.get('BENCHMARK_INTEGRATION_CONCURRENCY', self.default_concurrency)
+        self.max_throttle_retries = app.config.get('RATE_LIMIT_MAX_THROTTLE_RETRIES', self.max_throttle_retries)
+        with self._lock:
+            self._limiters = {}
+
+    def get(self, model_info):
+        """Возвращает ограничитель интеграции модели, пересоздавая его при смене настроек."""
+        settings = integration_settings(model_info)
+        config = (
+            settings.get('requests_per_minute') or self.default_rpm,
+            settings.get('tokens_per_minute') or self.default_tpm,
+            settings.get('max_concurrency') or self.default_concurrency
+        )
+        key = integration_key(model_info)
+
+        with self._lock:
+            entry = self._limiters.get(key)
+            if entry is None or entry[0] != config:
+                entry = (config, IntegrationRateLimiter(*config))
+                self._limiters[key] = entry
+            return entry[1]
+
+
+rate_limiter = RateLimiterRegistry()
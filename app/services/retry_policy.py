@@ -0,0 +1,139 @@
+import math
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from app.services.execution_engine import integration_key, integration_settings
+
+
+# Временные ошибки, после которых запрос к модели имеет смысл повторить
+RETRYABLE_STATUS_CODES = {408, 409, 425, 500, 502, 503, 504}
+
+
+@dataclass
+class RetryPolicy:
+    """Политика повторов с экспоненциальной задержкой и полным джиттером."""
+    max_retries: int = 2
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    def backoff(self, attempt):
+        """Задержка перед повтором номер attempt (с нуля): случайная в [0, base * 2^attempt]."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def is_retryable(result):
+    """
+    Можно ли повторить неудачный запрос.
+
+    Повторяются сетевые ошибки и тайм-ауты (нет HTTP-статуса) и временные
+    ошибки сервера; ошибки клиента 4xx и ответы без текста не повторяются.
+    """
+    if result.ok:
+        return False
+    if result.status_code is None:
+        return True
+    return result.status_code in RETRYABLE_STATUS_CODES
+
+
+def percentile(sorted_samples, q):
+    """Квантиль q отсортированной выборки методом ближайшего ранга или None для пустой."""
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, max(0, math.ceil(q * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+class LatencyTracker:
+    """Скользящее окно задержек успешных ответов по API интеграциям."""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, latency):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = deque(maxlen=self.window)
+                self._samples[key] = samples
+            samples.append(latency)
+
+    def quantile(self, key, q, min_samples=1):
+        """Квантиль задержки интеграции или None, если наблюдений недостаточно."""
+        with self._lock:
+            samples = sorted(self._samples.get(key) or [])
+        if len(samples) < max(1, min_samples):
+            return None
+        return percentile(samples, q)
+
+
+class RetryManager:
+    """Настройки повторов и хеджирования запросов к моделям, общие для процесса."""
+
+    def __init__(self):
+        self.max_retries = 2
+        self.base_delay = 0.5
+        self.max_delay = 8.0
+        self.hedging_enabled = False
+        self.hedge_quantile = 0.95
+        self.hedge_min_samples = 20
+        self.hedge_pool_size = 32
+        self.latencies = LatencyTracker()
+        self._hedge_executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_retries = app.config.get('COMPLETION_MAX_RETRIES', self.max_retries)
+        self.base_delay = app.config.get('COMPLETION_RETRY_BASE_DELAY', self.base_delay)
+        self.max_delay = app.config.get('COMPLETION_RETRY_MAX_DELAY', self.max_delay)
+        self.hedging_enabled = app.config.get('COMPLETION_HEDGING_ENABLED', self.hedging_enabled)
+        self.hedge_quantile = app.config.get('COMPLETION_HEDGE_QUANTILE', self.hedge_quantile)
+        self.hedge_min_samples = app.config.get('COMPLETION_HEDGE_MIN_SAMPLES', self.hedge_min_samples)
+        self.hedge_pool_size = app.config.get('COMPLETION_HEDGE_POOL_SIZE', self.hedge_pool_size)
+        with self._lock:
+            # Пул пересоздаётся при следующем хеджированном запросе с новым размером
+            if self._hedge_executor is not None:
+                self._hedge_executor.shutdown(wait=False)
+            self._hedge_executor = None
+
+    def policy_for(self, model_info):
+        """Политика повторов для интеграции модели с учётом её настроек."""
+        max_retries = integration_settings(model_info).get('max_retries')
+        return RetryPolicy(
+            max_retries=self.max_retries if max_retries is None else max(0, int(max_retries)),
+            base_delay=self.base_delay,
+            max_delay=self.max_delay
+        )
+
+    def hedge_delay(self, model_info):
+        """
+        Через сколько секунд отправлять дублирующий запрос или None, если хеджирование выключено.
+
+        Задержка равна p95 (COMPLETION_HEDGE_QUANTILE) задержек интеграции, поэтому
+        дублируется лишь около 5% самых медленных запросов.
+        """
+        enabled = integration_settings(model_info).get('hedging_enabled')
+        if not (self.hedging_enabled if enabled is None else enabled):
+            return None
+        return self.latencies.quantile(
+            integration_key(model_info),
+            self.hedge_quantile,
+            min_samples=self.hedge_min_samples
+        )
+
+    def record_latency(self, model_info, latency):
+        self.latencies.record(integration_key(model_info), latency)
+
+    def hedge_executor(self):
+        with self._lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=max(2, self.hedge_pool_size),
+                                                          thread_name_prefix='hedged-request')
+            return self._hedge_executor
+
+
+retry_manager = RetryManager()
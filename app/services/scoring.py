@@ -0,0 +1,431 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.embedding_store import embedding_store
+from app.services.http_client import session_pool
+from app.services.length_batching import PaddingStats, run_length_bucketed, token_lengths
+from app.services.inference_backends import (
+    BACKEND_TORCH,
+    check_backend_requirements,
+    load_bert_scorer,
+    load_sentence_transformer,
+    validate_backend,
+)
+
+# numpy, bert_score и sentence_transformers (а с ними torch и transformers)
+# импортируются при первом обращении к модели, а не при импорте модуля:
+# маршруты, не считающие метрики, не должны платить секунды за их загрузку.
+
+
+class BertScoreModel:
+    """
+    Долгоживущая модель BERTScore, общая для всего процесса.
+
+    Токенизатор и веса загружаются один раз при первом обращении, после чего
+    оценка пары занимает миллисекунды вместо секунд на повторную загрузку.
+    Пары группируются в пакеты близкой длины в пределах max_batch_tokens,
+    чтобы короткие ответы не дополнялись паддингом до длины длинных.
+    """
+
+    name = 'bertScore'
+
+    def __init__(self, model_type="microsoft/deberta-base-mnli", lang="en", batch_size=64,
+                 backend=BACKEND_TORCH, onnx_dir=None, max_batch_tokens=8192):
+        self.model_type = model_type
+        self.lang = lang
+        self.batch_size = batch_size
+        self.backend = backend
+        self.onnx_dir = onnx_dir
+        self.max_batch_tokens = max_batch_tokens
+        self.padding = PaddingStats()
+        self.load_seconds = None
+        self.load_error = None
+        self._scorer = None
+        self._load_lock = threading.Lock()
+        self._score_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.backend = validate_backend(app.config.get('BERTSCORE_INFERENCE_BACKEND') or self.backend)
+        if not app.config.get('SCORING_SERVER_URL'):
+            # С сервером оценки модель в этом процессе не загружается, пакеты нужны только серверу
+            check_backend_requirements(self.backend)
+        self.onnx_dir = app.config.get('SCORING_ONNX_DIR', self.onnx_dir)
+        self.max_batch_tokens = app.config.get('SCORING_MAX_BATCH_TOKENS', self.max_batch_tokens)
+
+    @property
+    def loaded(self):
+        return self._scorer is not None
+
+    def load(self):
+        """Загружает модель, если она ещё не загружена, и возвращает объект BERTScorer."""
+        with self._load_lock:
+            if self._scorer is None:
+                started_at = time.perf_counter()
+                try:
+                    self._scorer = load_bert_scorer(self.model_type, self.lang, self.batch_size,
+                                                    self.backend, self.onnx_dir)
+                except Exception as e:
+                    self.load_error = str(e)
+                    raise
+                self.load_seconds = time.perf_counter() - started_at
+                self.load_error = None
+            return self._scorer
+
+    def score(self, references, candidates):
+        """F1 BERTScore для пар (эталон, ответ), ограниченный диапазоном [0, 1]; пары считаются пакетами."""
+        if not references:
+            return []
+        scorer = self.load()
+        tokenizer = getattr(scorer, '_tokenizer', None)
+        max_length = min(getattr(tokenizer, 'model_max_length', 512) or 512, 512)
+        references = list(references)
+        candidates = list(candidates)
+        # Пакет пар дополняется паддингом до самого длинного из текстов пар
+        lengths = [
+            max(reference_length, candidate_length)
+            for reference_length, candidate_length in zip(
+                token_lengths(tokenizer, references, max_length),
+                token_lengths(tokenizer, candidates, max_length)
+            )
+        ]
+
+        def score_bucket(pairs):
+            _, _, f1_scores = scorer.score([candidate for _, candidate in pairs],
+                                           [reference for reference, _ in pairs],
+                                           batch_size=2 * len(pairs))
+            return [float(value) for value in f1_scores]
+
+        with self._score_lock:
+            f1_scores = run_length_bucketed(list(zip(references, candidates)), lengths, score_bucket,
+                                            self.max_batch_tokens, self.batch_size, self.padding)
+        return [min(1.0, max(0.0, value)) for value in f1_scores]
+
+
+class SemanticModel:
+    """
+    Модель эмбеддингов предложений для семантического сходства, общая для процесса.
+
+    Тексты кодируются пакетами, повторяющиеся тексты (например, один эталон
+    для нескольких моделей) кодируются один раз, а косинусное сходство всех
+    пар считается одной матричной операцией. Эмбеддинги сохраняются в
+    постоянном хранилище, и уже встречавшиеся тексты не кодируются повторно.
+    """
+
+    name = 'semantic'
+
+    def __init__(self, model_name="sentence-transformers/distiluse-base-multilingual-cased-v1", batch_size=64,
+                 backend=BACKEND_TORCH, max_batch_tokens=8192):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.backend = backend
+        self.max_batch_tokens = max_batch_tokens
+        self.padding = PaddingStats()
+        self.load_seconds = None
+        self.load_error = None
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.backend = validate_backend(app.config.get('SEMANTIC_INFERENCE_BACKEND') or self.backend)
+        if not app.config.get('SCORING_SERVER_URL'):
+            check_backend_requirements(self.backend)
+        self.max_batch_tokens = app.config.get('SCORING_MAX_BATCH_TOKENS', self.max_batch_tokens)
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    @property
+    def store_name(self):
+        """
+        Имя модели в хранилище эмбеддингов: векторы int8- и ONNX-моделей
+        немного отличаются от fp32 и хранятся отдельно.
+        """
+        return self.model_name if self.backend == BACKEND_TORCH else f'{self.model_name}@{self.backend}'
+
+    def load(self):
+        with self._load_lock:
+            if self._model is None:
+                started_at = time.perf_counter()
+                try:
+                    self._model = load_sentence_transformer(self.model_name, self.backend)
+                except Exception as e:
+                    self.load_error = str(e)
+                    raise
+                self.load_seconds = time.perf_counter() - started_at
+                self.load_error = None
+            return self._model
+
+    def precompute(self, texts):
+        self.encode(texts)
+
+    def encode(self, texts):
+        """Нормированные эмбеддинги текстов (матрица float32, строка на текст)."""
+        import numpy as np
+
+        texts = list(texts)
+        vectors = embedding_store.get_many(self.store_name, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            model = self.load()
+            missing_texts = [texts[i] for i in missing]
+            lengths = token_lengths(getattr(model, 'tokenizer', None), missing_texts,
+                                    getattr(model, 'max_seq_length', None) or 512)
+            with self._encode_lock:
+                # Тексты кодируются пакетами близкой длины, результаты возвращаются в исходном порядке
+                encoded = np.asarray(run_length_bucketed(
+                    missing_texts, lengths,
+                    lambda batch: list(model.encode(batch, batch_size=len(batch))),
+                    self.max_batch_tokens, self.batch_size, self.padding
+                ), dtype=np.float32)
+            embedding_store.put_many(self.store_name, missing_texts, encoded)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+
+        embeddings = np.stack(vectors).astype(np.float32, copy=False)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return np.divide(embeddings, norms, out=np.zeros_like(embeddings), where=norms > 0)
+
+    def similarity(self, references, candidates):
+        """Семантическое сходство пар (эталон, ответ) в диапазоне [0, 1]."""
+        if not references:
+            return []
+        import numpy as np
+
+        texts = list(dict.fromkeys(list(references) + list(candidates)))
+        index = {text: position for position, text in enumerate(texts)}
+        embeddings = self.encode(texts)
+
+        ref_vectors = embeddings[[index[text] for text in references]]
+        cand_vectors = embeddings[[index[text] for text in candidates]]
+        cosine = np.einsum('ij,ij->i', ref_vectors, cand_vectors)
+        return np.clip((cosine + 1.0) / 2.0, 0.0, 1.0).tolist()
+
+
+class ScoringTimer:
+    """Замер времени оценки ответов одной метрикой в рамках одного запуска."""
+
+    def __init__(self, model):
+        self.model = model
+        self.cold_start = not model.loaded
+        self.pairs = 0
+        self.seconds = 0.0
+        padding = getattr(model, 'padding', None)
+        self._padding_since = padding.snapshot() if padding is not None else None
+
+    def measure(self, fn, references, candidates):
+        """Вызывает пакетную метрику fn(references, candidates) и учитывает её время."""
+        started_at = time.perf_counter()
+        try:
+            return fn(references, candidates)
+        finally:
+            self.seconds += time.perf_counter() - started_at
+            self.pairs += len(references)
+
+    def to_dict(self):
+        """
+        Сводка для результатов бенчмарка: при холодном старте время загрузки
+        модели выделяется отдельно, чтобы msPerPair отражало тёплую оценку.
+        """
+        load_seconds = (self.model.load_seconds or 0.0) if self.cold_start else 0.0
+        warm_seconds = max(0.0, self.seconds - load_seconds)
+        return {
+            'coldStart': self.cold_start,
+            'loadSeconds': round(load_seconds, 3),
+            'pairs': self.pairs,
+            'scoringSeconds': round(warm_seconds, 3),
+            'msPerPair': round(warm_seconds * 1000 / self.pairs, 2) if self.pairs else None,
+            # Статистика паддинга за время запуска (у модели на сервере оценки её нет)
+            'padding': self.model.padding.to_dict(self._padding_since) if self._padding_since is not None else None
+        }
+
+
+class ScoringServerError(Exception):
+    """Сервер оценки метрик недоступен или вернул ошибку."""
+
+
+class ScoringClient:
+    """
+    Клиент общего сервера оценки метрик (scoring_server.py).
+
+    Если очередь сервера заполнена (503), запрос повторяется с растущей
+    паузой, пока не истечёт timeout.
+    """
+
+    def __init__(self, url, timeout=120.0):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _post(self, path, payload):
+        deadline = time.monotonic() + self.timeout
+        delay = 0.05
+        while True:
+            try:
+                response = session_pool.post(self.url, None, path, json=payload, timeout=self.timeout)
+            except Exception as e:
+                raise ScoringServerError(f'Сервер оценки метрик недоступен: {e}')
+            if response.status_code != 503 or time.monotonic() + delay > deadline:
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+        if not response.ok:
+            raise ScoringServerError(f'Сервер оценки метрик вернул {response.status_code}: {response.text[:200]}')
+        return response.json()
+
+    def score(self, name, references, candidates):
+        return self._post(f'/score/{name}', {'references': list(references), 'candidates': list(candidates)})['scores']
+
+    def precompute(self, texts):
+        self._post('/precompute', {'texts': list(texts)})
+
+    def health(self):
+        """Состояние сервера оценки; при недоступности — ready=False с текстом ошибки."""
+        try:
+            response = session_pool.get_session(self.url).get(f'{self.url}/health', timeout=5)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            return {'ready': False, 'error': str(e)}
+
+
+class RemoteScoringModel:
+    """Модель метрики, загруженная в сервере оценки; интерфейс совпадает с локальными моделями."""
+
+    loaded = True
+    load_seconds = None
+    load_error = None
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def score(self, references, candidates):
+        return self.client.score(self.name, references, candidates)
+
+    similarity = score
+
+    def precompute(self, texts):
+        self.client.precompute(texts)
+
+
+class ScoringBackend:
+    """
+    Выбор, где считаются модельные метрики: в текущем процессе или в общем
+    сервере оценки (SCORING_SERVER_URL). С сервером каждый веб-воркер не
+    держит собственную копию моделей в памяти.
+    """
+
+    def __init__(self):
+        self.client = None
+
+    def init_app(self, app):
+        url = app.config.get('SCORING_SERVER_URL')
+        self.client = ScoringClient(url, app.config.get('SCORING_SERVER_TIMEOUT', 120.0)) if url else None
+
+    @property
+    def remote(self):
+        return self.client is not None
+
+    @property
+    def semantic(self):
+        return RemoteScoringModel(self.client, semantic_model.name) if self.client else semantic_model
+
+    @property
+    def bert_score(self):
+        return RemoteScoringModel(self.client, bert_score_model.name) if self.client else bert_score_model
+
+
+def score_pairs_safely(fn, references, candidates):
+    """
+    Пакетная оценка пар, в которой пустые тексты получают 0, а сбой модели
+    обнуляет весь пакет вместо прерывания бенчмарка.
+    """
+    scores = [0.0] * len(references)
+    positions = [i for i, (reference, candidate) in enumerate(zip(references, candidates)) if reference and candidate]
+    if not positions:
+        return scores
+    try:
+        values = fn([references[i] for i in positions], [candidates[i] for i in positions])
+    except Exception:
+        return scores
+    for position, value in zip(positions, values):
+        scores[position] = value
+    return scores
+
+
+def precompute_embeddings(texts):
+    """Кодирует тексты в фоне, чтобы при запуске бенчмарка их эмбеддинги уже были в хранилище."""
+    texts = [text for text in dict.fromkeys(texts) if text]
+    if texts:
+        _precompute_executor.submit(scoring_backend.semantic.precompute, texts)
+
+
+def model_status(model):
+    return {
+        'backend': model.backend,
+        'loaded': model.loaded,
+        'padding': model.padding.to_dict(),
+        'loadSeconds': round(model.load_seconds, 3) if model.load_seconds is not None else None,
+        'error': model.load_error
+    }
+
+
+class ScoringWarmup:
+    """
+    Необязательная фоновая загрузка моделей метрик при старте приложения.
+
+    Без прогрева модели загружаются при первом бенчмарке по метрикам;
+    с прогревом (SCORING_WARMUP_ON_START) загрузка идёт в отдельном потоке,
+    не задерживая старт, а готовность видна через status().
+    """
+
+    def __init__(self, models, enabled=False):
+        self.models = models
+        self.enabled = enabled
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        # С сервером оценки модели загружает он, а не веб-воркеры
+        self.enabled = app.config.get('SCORING_WARMUP_ON_START', self.enabled) and not app.config.get('SCORING_SERVER_URL')
+        if self.enabled:
+            self.start()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='scoring-warmup', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        for model in self.models:
+            try:
+                model.load()
+            except Exception:
+                # Ошибка сохраняется в load_error и видна в status(); при
+                # следующем обращении модель попробует загрузиться снова
+                pass
+
+    def status(self):
+        """
+        Готовность к оценке метрик: при включённом прогреве приложение готово,
+        когда все модели загружены; без прогрева модели грузятся по требованию.
+        """
+        models = {model.name: model_status(model) for model in self.models}
+        loaded = all(status['loaded'] for status in models.values())
+        return {
+            'ready': loaded or not self.enabled,
+            'warmup': self.enabled,
+            'warmingUp': self._thread is not None and self._thread.is_alive(),
+            'models': models
+        }
+
+
+bert_score_model = BertScoreModel()
+semantic_model = SemanticModel()
+scoring_backend = ScoringBackend()
+scoring_warmup = ScoringWarmup([semantic_model, bert_score_model])
+_precompute_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='embedding-precompute')
@@ -0,0 +1,121 @@
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class PipelineSettings:
+    """
+    Размер очереди между генерацией и оценкой, наибольший размер микропакета
+    и пауза (секунды), после которой накопленные пары отдаются на оценку.
+    """
+
+    def __init__(self, queue_size=64, micro_batch_size=256, batch_wait=0.02):
+        self.queue_size = queue_size
+        self.micro_batch_size = micro_batch_size
+        self.batch_wait = batch_wait
+
+    def init_app(self, app):
+        self.queue_size = app.config.get('SCORING_PIPELINE_QUEUE_SIZE', self.queue_size)
+        self.micro_batch_size = app.config.get('SCORING_MICRO_BATCH_SIZE', self.micro_batch_size)
+        self.batch_wait = app.config.get('SCORING_BATCH_WAIT_MS', self.batch_wait * 1000.0) / 1000.0
+
+
+pipeline_settings = PipelineSettings()
+
+
+class ScoringPipeline:
+    """
+    Конвейер «генерация → оценка» для одного запуска бенчмарка.
+
+    Готовые ответы моделей кладутся в ограниченную очередь (put), поток
+    оценки переносит их в свой накопитель и оценивает всё накопленное одним
+    вызовом score_batch, как только новых пар нет дольше batch_wait секунд
+    или набралось micro_batch_size пар. micro_batch_size — только верхняя
+    граница, не меньше min_batch_size (размера пакета модели метрики).
+    Пока модели отвечают по сети, уже полученные ответы оцениваются, поэтому
+    время запуска стремится к max(генерация, оценка), а не к их сумме.
+    Если оценка отстаёт, за время её вызова накапливается больше пар и
+    следующий микропакет получается крупнее, а заполненная очередь
+    притормаживает добавление.
+    """
+
+    def __init__(self, score_batch, queue_size=None, micro_batch_size=None, min_batch_size=0, batch_wait=None):
+        self.score_batch = score_batch
+        self.micro_batch_size = max(micro_batch_size or pipeline_settings.micro_batch_size, min_batch_size)
+        self.batch_wait = pipeline_settings.batch_wait if batch_wait is None else batch_wait
+        self.scores = {}
+        self.micro_batches = 0
+        self.pairs = 0
+        self.scoring_seconds = 0.0
+        self._started_at = time.perf_counter()
+        self._queue = queue.Queue(maxsize=queue_size or pipeline_settings.queue_size)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='scoring-pipeline', daemon=True)
+        self._thread.start()
+
+    def put(self, key, reference, candidate):
+        """Передаёт пару (эталон, ответ) на оценку; результат будет в scores[key]."""
+        self._queue.put((key, reference, candidate))
+
+    def _next_batch(self, pending):
+        """
+        Ждёт первую пару, затем забирает следующие, пока они приходят чаще
+        batch_wait и их меньше micro_batch_size; True — пар больше не будет.
+        """
+        item = self._queue.get()
+        while item is not _DONE:
+            pending.append(item)
+            if len(pending) >= self.micro_batch_size:
+                return False
+            try:
+                item = self._queue.get(timeout=self.batch_wait)
+            except queue.Empty:
+                return False
+        return True
+
+    def _run(self):
+        finished = False
+        while not finished:
+            batch = []
+            finished = self._next_batch(batch)
+            if not batch or self._error is not None:
+                # После ошибки очередь всё равно вычитывается, чтобы put() не заблокировался
+                continue
+            started_at = time.perf_counter()
+            try:
+                values = self.score_batch([reference for _, reference, _ in batch],
+                                          [candidate for _, _, candidate in batch])
+                for (key, _, _), value in zip(batch, values):
+                    self.scores[key] = value
+            except Exception as e:
+                self._error = e
+            self.scoring_seconds += time.perf_counter() - started_at
+            self.micro_batches += 1
+            self.pairs += len(batch)
+
+    def close(self):
+        """Завершает приём пар и дожидается оценки уже переданных; повторный вызов ничего не делает."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_DONE)
+        self._thread.join()
+
+    def finish(self):
+        """Дожидается оценки всех переданных пар и возвращает словарь {key: оценка}."""
+        self.close()
+        if self._error is not None:
+            raise self._error
+        return self.scores
+
+    def stats(self):
+        wall_seconds = time.perf_counter() - self._started_at
+        return {
+            'microBatches': self.micro_batches,
+            'pairs': self.pairs,
+            'avgBatchPairs': round(self.pairs / self.micro_batches, 1) if self.micro_batches else None,
+            'scoringSeconds': round(self.scoring_seconds, 3),
+            'wallSeconds': round(wall_seconds, 3)
+        }
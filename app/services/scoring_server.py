@@ -0,0 +1,170 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from flask import Flask, jsonify, request
+
+from app.config import Config
+from app.services.embedding_store import embedding_store
+from app.services.inference_backends import check_backend_requirements
+from app.services.scoring import ScoringWarmup, bert_score_model, semantic_model
+
+
+class QueueFullError(Exception):
+    """Очередь сервера оценки заполнена, запрос нужно повторить позже."""
+
+
+class _ScoringJob:
+    def __init__(self, references, candidates):
+        self.references = references
+        self.candidates = candidates
+        self.future = Future()
+
+
+class BatchingScorer:
+    """
+    Объединение запросов оценки от разных веб-воркеров в общие пакеты.
+
+    Запросы попадают в ограниченную очередь; поток оценки берёт первый из
+    них и в течение окна batch_window добирает следующие, пока пакет не
+    наберёт max_batch_pairs пар, после чего оценивает все пары одним вызовом
+    модели и раздаёт результаты. При переполнении очереди новый запрос
+    сразу отклоняется (QueueFullError), а не копится в памяти.
+    """
+
+    def __init__(self, name, fn, batch_window=0.01, max_batch_pairs=256, max_queue=64):
+        self.name = name
+        self.fn = fn
+        self.batch_window = batch_window
+        self.max_batch_pairs = max_batch_pairs
+        self.batches = 0
+        self.pairs = 0
+        self.rejected = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name=f'scoring-{name}', daemon=True)
+        self._thread.start()
+
+    def submit(self, references, candidates):
+        """Ставит пары в очередь; возвращает Future со списком оценок."""
+        job = _ScoringJob(list(references), list(candidates))
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self.rejected += 1
+            raise QueueFullError(f'Очередь оценки {self.name} заполнена')
+        return job.future
+
+    def _collect(self):
+        jobs = [self._queue.get()]
+        pairs = len(jobs[0].references)
+        deadline = time.monotonic() + self.batch_window
+        while pairs < self.max_batch_pairs:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            jobs.append(job)
+            pairs += len(job.references)
+        return jobs
+
+    def _run(self):
+        while True:
+            jobs = self._collect()
+            references = [text for job in jobs for text in job.references]
+            candidates = [text for job in jobs for text in job.candidates]
+            try:
+                scores = list(self.fn(references, candidates))
+            except Exception as e:
+                for job in jobs:
+                    job.future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.pairs += len(references)
+            position = 0
+            for job in jobs:
+                job.future.set_result(scores[position:position + len(job.references)])
+                position += len(job.references)
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'batches': self.batches,
+            'pairs': self.pairs,
+            'rejected': self.rejected,
+            'avgBatchPairs': round(self.pairs / self.batches, 1) if self.batches else None
+        }
+
+
+def create_scoring_app(config_class=Config):
+    """
+    Приложение сервера оценки метрик: модели BERTScore и эмбеддингов
+    загружаются один раз в этом процессе и обслуживают все веб-воркеры,
+    у которых задан SCORING_SERVER_URL.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    embedding_store.init_app(app)
+    semantic_model.init_app(app)
+    bert_score_model.init_app(app)
+    # Модели загружаются здесь, даже если в общем окружении задан SCORING_SERVER_URL
+    check_backend_requirements(semantic_model.backend)
+    check_backend_requirements(bert_score_model.backend)
+
+    batching = {
+        'batch_window': app.config['SCORING_BATCH_WINDOW_MS'] / 1000,
+        'max_batch_pairs': app.config['SCORING_MAX_BATCH_PAIRS'],
+        'max_queue': app.config['SCORING_QUEUE_SIZE']
+    }
+    models = {
+        semantic_model.name: (semantic_model, BatchingScorer(semantic_model.name, semantic_model.similarity, **batching)),
+        bert_score_model.name: (bert_score_model, BatchingScorer(bert_score_model.name, bert_score_model.score, **batching))
+    }
+    timeout = app.config['SCORING_SERVER_TIMEOUT']
+    precompute_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='embedding-precompute')
+    warmup = ScoringWarmup([model for model, _ in models.values()], enabled=app.config['SCORING_WARMUP_ON_START'])
+
+    @app.route('/health')
+    def health():
+        status = warmup.status()
+        for name, (_, scorer) in models.items():
+            status['models'][name].update(scorer.stats())
+        return jsonify(status)
+
+    @app.route('/score/<name>', methods=['POST'])
+    def score(name):
+        if name not in models:
+            return jsonify({'error': f'Неизвестная метрика: {name}'}), 404
+        data = request.json or {}
+        references = data.get('references') or []
+        candidates = data.get('candidates') or []
+        if len(references) != len(candidates):
+            return jsonify({'error': 'Число эталонов и ответов не совпадает'}), 400
+        if not references:
+            return jsonify({'scores': []})
+
+        _, scorer = models[name]
+        try:
+            future = scorer.submit(references, candidates)
+        except QueueFullError as e:
+            return jsonify({'error': str(e)}), 503
+        try:
+            return jsonify({'scores': future.result(timeout=timeout)})
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/precompute', methods=['POST'])
+    def precompute():
+        texts = [text for text in dict.fromkeys((request.json or {}).get('texts') or []) if text]
+        if texts:
+            precompute_executor.submit(semantic_model.encode, texts)
+        return jsonify({'queued': len(texts)}), 202
+
+    if warmup.enabled:
+        warmup.start()
+
+    return app
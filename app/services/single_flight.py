@@ -0,0 +1,56 @@
+import threading
+
+
+class _Call:
+    """Выполняющийся запрос, результат которого ждут совпавшие с ним вызовы."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных запросов.
+
+    Пока вызов с ключом key выполняется, повторные вызовы с тем же ключом
+    не запускают функцию заново, а ждут и получают тот же результат.
+    Счётчик saved_calls показывает, сколько обращений к провайдеру сэкономлено.
+    """
+
+    def __init__(self):
+        self.saved_calls = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Выполняет fn() или ждёт уже идущий вызов; возвращает (результат, был_ли_он_общим)."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self.saved_calls += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+completion_flights = SingleFlight()
@@ -1,7 +1,9 @@
+import base64
 import csv
 import json
 import os
 from datetime import datetime
+from functools import partial
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
@@ -10,6 +12,8 @@ from app import db
 from app.models.api_integration import ApiIntegration
 from app.models.user_dataset import UserDataset
 from app.models.user_model import UserModel
+from app.services.dataset_analysis import ANALYSIS_READY, dataset_analyzer, update_columns_info
+from app.services.dataset_changes import PatchError, VersionConflict, apply_patch, dataset_changes, open_dataset, remove_sidecars
 from app.services.model_service import test_model_connection
 from app.user.forms import ChangePasswordForm, AddModelForm, AddApiIntegrationForm, JudgeModelForm, AddDatasetForm
 
@@ -22,104 +26,105 @@ def get_upload_folder():
     return upload_folder
 
 
-def analyze_csv_file(file_path):
+def parse_int_setting(field, value, minimum):
+    """Целое значение настройки интеграции не меньше minimum; иначе ValueError с понятным сообщением."""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f'{field}: ожидается целое число')
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            sample = file.read(1024)
-            file.seek(0)
-            sniffer = csv.Sniffer()
-            delimiter = sniffer.sniff(sample).delimiter
-
-            reader = csv.DictReader(file, delimiter=delimiter)
-
-            columns = reader.fieldnames
-            rows = list(reader)
-
-            prompt_column = find_prompt_column(columns)
-            reference_column = find_reference_column(columns)
-
-            columns_info = {}
-            for col in columns:
-                sample_values = [row[col] for row in rows[:100] if
-                                 row[col] and row[col].strip()]
-
-                numeric_count = 0
-                for val in sample_values:
-                    try:
-                        float(val)
-                        numeric_count += 1
-                    except ValueError:
-                        pass
-
-                if numeric_count / len(sample_values) > 0.8 if sample_values else False:
-                    col_type = 'numeric'
-                else:
-                    col_type = 'text'
-
-                columns_info[col] = {
-                    'type': col_type,
-                    'sample_values': sample_values[:5],
-                    'is_prompt': col == prompt_column,
-                    'is_reference': col == reference_column
-                }
-
-            format_validated = bool(prompt_column and reference_column)
-
-            return {
-                'row_count': len(rows),
-                'column_count': len(columns),
-                'columns_info': json.dumps(columns_info, ensure_ascii=False),
-                'format_validated': format_validated,
-                'prompt_column': prompt_column,
-                'reference_column': reference_column
-            }
-
-    except Exception as e:
-        raise Exception(f"Ошибка при анализе CSV файла: {str(e)}")
-
-
-def find_prompt_column(fieldnames):
-    if not fieldnames:
-        return None
-
-    prompt_keywords = [
-        'prompt', 'prompts', 'question', 'questions', 'query', 'queries',
-        'input', 'instruction', 'instructions', 'task', 'tasks',
-        'запрос', 'вопрос', 'задача', 'задание', 'инструкция'
-    ]
-
-    for field in fieldnames:
-        if field.lower() in prompt_keywords:
-            return field
-
-    for field in fieldnames:
-        for keyword in prompt_keywords:
-            if keyword in field.lower():
-                return field
-
-    return None
-
-
-def find_reference_column(fieldnames):
-    if not fieldnames:
-        return None
-
-    reference_keywords = [
-        'reference', 'answer', 'answers', 'response', 'responses', 'output',
-        'solution', 'solutions', 'result', 'results', 'expected', 'target',
-        'эталон', 'ответ', 'ответы', 'решение', 'результат', 'ожидаемый'
-    ]
-
-    for field in fieldnames:
-        if field.lower() in reference_keywords:
-            return field
-
-    for field in fieldnames:
-        for keyword in reference_keywords:
-            if keyword in field.lower():
-                return field
-
-    return None
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{field}: ожидается целое число')
+    if number < minimum:
+        raise ValueError(f'{field}: значение должно быть не меньше {minimum}')
+    return number
+
+
+def parse_bool_setting(field, value):
+    """Логическое значение настройки: true/false, 1/0 (в том числе строками)."""
+    if isinstance(value, bool):
+        return value
+    normalized = str(value).strip().lower()
+    if normalized in ('true', '1'):
+        return True
+    if normalized in ('false', '0'):
+        return False
+    raise ValueError(f'{field}: ожидается true или false')
+
+
+# Настройки выполнения запросов интеграции и их разбор; пустое значение — настройка по умолчанию.
+# Для лимитов 0 не имеет смысла (он означал бы «по умолчанию»), поэтому минимум — 1
+INTEGRATION_SETTINGS_FIELDS = {
+    'max_concurrency': partial(parse_int_setting, minimum=1),
+    'requests_per_minute': partial(parse_int_setting, minimum=1),
+    'tokens_per_minute': partial(parse_int_setting, minimum=1),
+    'max_retries': partial(parse_int_setting, minimum=0),
+    'hedging_enabled': parse_bool_setting,
+    'streaming_enabled': parse_bool_setting,
+}
+
+
+def apply_integration_settings(integration, data):
+    """
+    Обновляет настройки выполнения запросов интеграции из JSON-данных запроса.
+    Все значения проверяются до изменения интеграции; при ошибке — ValueError.
+    """
+    settings = {}
+    for field, parse in INTEGRATION_SETTINGS_FIELDS.items():
+        if field in data:
+            value = data[field]
+            settings[field] = parse(field, value) if value not in (None, '') else None
+    for field, value in settings.items():
+        setattr(integration, field, value)
+
+
+# Размер страницы строк датасета в /datasets/preview и /datasets/get-data
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(row, version):
+    return base64.urlsafe_b64encode(f'{row}:{version}'.encode('ascii')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        row, version = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii').split(':')
+        return int(row), version
+    except (ValueError, UnicodeError):
+        raise ValueError('Некорректный курсор')
+
+
+def read_dataset_page(dataset, default_limit):
+    """
+    Страница строк датасета по параметрам запроса offset/limit или cursor
+    (курсор next_cursor из предыдущего ответа). Строки читаются по индексу
+    байтовых смещений из колоночного кэша: один seek и чтение только
+    нужного диапазона файла, с применёнными правками из журнала изменений.
+    Размер страницы не больше MAX_PAGE_SIZE.
+    """
+    limit = request.args.get('limit', type=int) or default_limit
+    offset = request.args.get('offset', 0, type=int)
+    if offset < 0 or limit <= 0:
+        raise ValueError('offset и limit должны быть положительными')
+
+    with open_dataset(dataset.file_path) as view:
+        version = view.version
+        cursor = request.args.get('cursor')
+        if cursor:
+            offset, cursor_version = decode_cursor(cursor)
+            if cursor_version != version:
+                raise ValueError('Датасет изменился, загрузите данные заново')
+
+        limit = min(limit, MAX_PAGE_SIZE)
+        rows = view.read_rows(offset, offset + limit)
+        next_row = offset + len(rows)
+        return rows, {
+            'offset': offset,
+            'limit': limit,
+            'total_rows': view.rows,
+            'columns': view.columns,
+            'version': version,
+            'next_cursor': encode_cursor(next_row, version) if next_row < view.rows else None
+        }
 
 
 @user_bp.route('/settings')
@@ -175,6 +180,7 @@ def get_api_integrations():
         'name': integration.name,
         'api_url': integration.api_url,
         'description': integration.description,
+        'settings': integration.settings_dict(),
         'provider': integration.name  # For compatibility
     } for integration in api_integrations])
 
@@ -202,6 +208,7 @@ def add_api_integration():
                 description=description,
                 user_id=current_user.id
             )
+            apply_integration_settings(integration, data)
             db.session.add(integration)
             db.session.commit()
             
@@ -213,9 +220,13 @@ def add_api_integration():
                     'name': integration.name,
                     'api_url': integration.api_url,
                     'description': integration.description,
+                    'settings': integration.settings_dict(),
                     'provider': integration.name
                 }
             })
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': f'Ошибка при добавлении интеграции: {str(e)}'}), 500
@@ -277,6 +288,8 @@ def update_api_integration(integration_id):
         # Update API key only if provided
         if 'api_key' in data and data['api_key']:
             integration.api_key = data['api_key']
+
+        apply_integration_settings(integration, data)
         
         db.session.commit()
         
@@ -288,9 +301,13 @@ def update_api_integration(integration_id):
                 'name': integration.name,
                 'api_url': integration.api_url,
                 'description': integration.description,
+                'settings': integration.settings_dict(),
                 'provider': integration.name
             }
         })
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Ошибка при обновлении интеграции: {str(e)}'}), 500
@@ -610,8 +627,6 @@ def add_dataset_from_web():
                         'reference': row.get('reference', '')
                     })
         
-        # Analyze the created file
-        file_info = analyze_csv_file(file_path)
         file_size = os.path.getsize(file_path)
         
         # Create dataset record
@@ -621,14 +636,14 @@ def add_dataset_from_web():
             filename=filename,
             file_path=file_path,
             file_size=file_size,
-            row_count=file_info['row_count'],
-            column_count=file_info['column_count'],
-            columns_info=file_info['columns_info'],
             user_id=current_user.id
         )
         
+        # Analyze the created file
+        dataset_analyzer.prepare(dataset)
         db.session.add(dataset)
         db.session.commit()
+        dataset_analyzer.start(dataset)
         
         return jsonify({
             'success': True,
@@ -640,6 +655,7 @@ def add_dataset_from_web():
         db.session.rollback()
         if 'file_path' in locals() and os.path.exists(file_path):
             os.remove(file_path)
+            remove_sidecars(file_path)
         return jsonify({'error': f'Ошибка при создании датасета: {str(e)}'}), 500
 
 
@@ -660,7 +676,6 @@ def add_dataset():
 
             file.save(file_path)
 
-            file_info = analyze_csv_file(file_path)
             file_size = os.path.getsize(file_path)
 
             dataset = UserDataset(
@@ -669,14 +684,13 @@ def add_dataset():
                 filename=filename,
                 file_path=file_path,
                 file_size=file_size,
-                row_count=file_info['row_count'],
-                column_count=file_info['column_count'],
-                columns_info=file_info['columns_info'],
                 user_id=current_user.id
             )
 
+            dataset_analyzer.prepare(dataset)
             db.session.add(dataset)
             db.session.commit()
+            dataset_analyzer.start(dataset)
 
             flash('Датасет успешно загружен!', 'success')
 
@@ -684,6 +698,7 @@ def add_dataset():
             db.session.rollback()
             if 'file_path' in locals() and os.path.exists(file_path):
                 os.remove(file_path)
+                remove_sidecars(file_path)
             flash(f'Ошибка при загрузке датасета: {str(e)}', 'danger')
     else:
         for field, errors in form.errors.items():
@@ -737,6 +752,7 @@ def update_dataset_content(dataset_id):
         # Delete old file
         if os.path.exists(dataset.file_path):
             os.remove(dataset.file_path)
+        remove_sidecars(dataset.file_path)
         
         # Save new file
         filename = secure_filename(file.filename)
@@ -748,20 +764,18 @@ def update_dataset_content(dataset_id):
         
         file.save(file_path)
         
-        # Analyze new file
-        file_info = analyze_csv_file(file_path)
         file_size = os.path.getsize(file_path)
         
         # Update dataset record
         dataset.filename = filename
         dataset.file_path = file_path
         dataset.file_size = file_size
-        dataset.row_count = file_info['row_count']
-        dataset.column_count = file_info['column_count']
-        dataset.columns_info = file_info['columns_info']
         dataset.uploaded_at = datetime.utcnow()
         
+        # Analyze new file
+        dataset_analyzer.prepare(dataset)
         db.session.commit()
+        dataset_analyzer.start(dataset)
         
         return jsonify({
             'success': True,
@@ -772,6 +786,7 @@ def update_dataset_content(dataset_id):
         db.session.rollback()
         if 'file_path' in locals() and os.path.exists(file_path):
             os.remove(file_path)
+            remove_sidecars(file_path)
         return jsonify({'error': f'Ошибка при обновлении содержимого датасета: {str(e)}'}), 500
 
 
@@ -786,6 +801,7 @@ def delete_dataset(dataset_id):
 
     try:
         dataset.delete_file()
+        remove_sidecars(dataset.file_path)
 
         db.session.delete(dataset)
         db.session.commit()
@@ -806,56 +822,124 @@ def preview_dataset(dataset_id):
         return jsonify({'error': 'У вас нет прав для просмотра этого датасета'}), 403
 
     try:
-        preview_data = []
-        with open(dataset.file_path, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for i, row in enumerate(reader):
-                if i >= 10:
-                    break
-                preview_data.append(row)
-
+        preview_data, page = read_dataset_page(dataset, default_limit=10)
         columns_info = json.loads(dataset.columns_info) if dataset.columns_info else {}
 
         return jsonify({
             'success': True,
             'preview_data': preview_data,
             'columns_info': columns_info,
-            'total_rows': dataset.row_count
+            **page
         })
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Ошибка при загрузке предпросмотра: {str(e)}'}), 500
 
 
+@user_bp.route('/datasets/analysis-status/<int:dataset_id>')
+@login_required
+def dataset_analysis_status(dataset_id):
+    """Состояние анализа датасета, загруженного при DATASET_ANALYSIS_IN_BACKGROUND"""
+    dataset = UserDataset.query.get_or_404(dataset_id)
+
+    if dataset.user_id != current_user.id:
+        return jsonify({'error': 'У вас нет прав для просмотра этого датасета'}), 403
+
+    return jsonify({
+        'success': True,
+        'status': dataset.analysis_status or 'ready',
+        'progress': dataset.analysis_progress,
+        'error': dataset.analysis_error,
+        'dataset': dataset.to_dict()
+    })
+
+
 @user_bp.route('/datasets/get-data/<int:dataset_id>')
 @login_required
 def get_dataset_data(dataset_id):
-    """Get full dataset data for editing"""
+    """Get a page of dataset rows for editing (offset/limit or cursor, at most MAX_PAGE_SIZE rows)"""
     dataset = UserDataset.query.get_or_404(dataset_id)
 
     if dataset.user_id != current_user.id:
         return jsonify({'error': 'У вас нет прав для просмотра этого датасета'}), 403
 
     try:
-        data = []
-        with open(dataset.file_path, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                data.append({
-                    'prompt': row.get('prompt', ''),
-                    'reference': row.get('reference', '')
-                })
+        rows, page = read_dataset_page(dataset, default_limit=MAX_PAGE_SIZE)
+        # Редактор показывает колонки промпта и эталона, найденные при анализе датасета
+        prompt_column = dataset.prompt_column or 'prompt'
+        reference_column = dataset.reference_column or 'reference'
+        data = [
+            {
+                'prompt': row.get(prompt_column) or '',
+                'reference': row.get(reference_column) or ''
+            }
+            for row in rows
+        ]
 
         return jsonify({
             'success': True,
             'data': data,
-            'total_rows': len(data)
+            'prompt_column': prompt_column if prompt_column in page['columns'] else None,
+            'reference_column': reference_column if reference_column in page['columns'] else None,
+            **page
         })
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Ошибка при загрузке данных: {str(e)}'}), 500
 
 
+@user_bp.route('/datasets/patch/<int:dataset_id>', methods=['POST'])
+@login_required
+def patch_dataset_data(dataset_id):
+    """
+    Построчное изменение датасета: {"operations": [{"op": "insert" | "update" | "delete",
+    "row": номер, "values": {колонка: значение}}, ...], "version": версия из get-data}.
+    Операции дописываются в журнал изменений, статистики колонок пересчитываются
+    только по изменённым строкам; CSV переписывается фоновой компактизацией.
+    """
+    dataset = UserDataset.query.get_or_404(dataset_id)
+
+    if dataset.user_id != current_user.id:
+        return jsonify({'error': 'У вас нет прав для редактирования этого датасета'}), 403
+
+    # Фоновый анализ перезапишет статистики и колоночный кэш по файлу без правок
+    if (dataset.analysis_status or ANALYSIS_READY) != ANALYSIS_READY:
+        return jsonify({'error': 'Датасет ещё анализируется, изменить его можно после завершения анализа'}), 409
+
+    data = request.json or {}
+    operations = data.get('operations') or []
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'Не переданы операции изменения'}), 400
+
+    try:
+        changes, row_count, logged, version = apply_patch(dataset.file_path, operations, data.get('version'))
+
+        dataset.row_count = row_count
+        dataset.columns_info = update_columns_info(dataset.columns_info, changes)
+        dataset.uploaded_at = datetime.utcnow()
+        db.session.commit()
+        dataset_changes.maybe_compact(dataset.id, dataset.file_path, logged)
+
+        return jsonify({
+            'success': True,
+            'message': 'Данные датасета успешно обновлены!',
+            'dataset': dataset.to_dict(),
+            'version': version,
+            'applied': len(changes)
+        })
+    except PatchError as e:
+        return jsonify({'error': str(e)}), 400
+    except VersionConflict as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка при сохранении данных: {str(e)}'}), 500
+
+
 @user_bp.route('/datasets/save-data/<int:dataset_id>', methods=['POST'])
 @login_required
 def save_dataset_data(dataset_id):
@@ -875,6 +959,7 @@ def save_dataset_data(dataset_id):
         # Delete old file
         if os.path.exists(dataset.file_path):
             os.remove(dataset.file_path)
+        remove_sidecars(dataset.file_path)
         
         # Create new file with updated data
         timestamp = str(int(datetime.utcnow().timestamp()))
@@ -895,20 +980,18 @@ def save_dataset_data(dataset_id):
                     'reference': row.get('reference', '')
                 })
         
-        # Analyze the updated file
-        file_info = analyze_csv_file(file_path)
         file_size = os.path.getsize(file_path)
         
         # Update dataset record
         dataset.filename = filename
         dataset.file_path = file_path
         dataset.file_size = file_size
-        dataset.row_count = file_info['row_count']
-        dataset.column_count = file_info['column_count']
-        dataset.columns_info = file_info['columns_info']
         dataset.uploaded_at = datetime.utcnow()
         
+        # Analyze the updated file
+        dataset_analyzer.prepare(dataset)
         db.session.commit()
+        dataset_analyzer.start(dataset)
         
         return jsonify({
             'success': True,
@@ -919,4 +1002,5 @@ def save_dataset_data(dataset_id):
         db.session.rollback()
         if 'file_path' in locals() and os.path.exists(file_path):
             os.remove(file_path)
+            remove_sidecars(file_path)
         return jsonify({'error': f'Ошибка при сохранении данных: {str(e)}'}), 500
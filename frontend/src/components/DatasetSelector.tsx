@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from 'react';
-import { Card, Checkbox, Space, Spin, Typography, Tag, Empty } from 'antd';
+import { Card, Checkbox, Space, Spin, Typography, Tag, Empty, Select, InputNumber } from 'antd';
 import { DatabaseOutlined, FileOutlined } from '@ant-design/icons';
-import { UserDataset } from '../types';
+import { PromptSampling, SamplingStrategy, UserDataset } from '../types';
 import { datasetsAPI } from '../services/api';
 
 const { Text, Link } = Typography;
@@ -29,11 +29,22 @@ const getPluralForm = (count: number): string => {
 interface DatasetSelectorProps {
   selectedDatasets: UserDataset[];
   onSelectionChange: (datasets: UserDataset[]) => void;
+  sampling: PromptSampling;
+  onSamplingChange: (sampling: PromptSampling) => void;
 }
 
+const SAMPLING_OPTIONS: { value: SamplingStrategy; label: string }[] = [
+  { value: 'head', label: 'Первые строки' },
+  { value: 'reservoir', label: 'Случайная выборка' },
+  { value: 'hash', label: 'Детерминированная (по хэшу)' },
+  { value: 'stratified', label: 'Пропорционально категориям' },
+];
+
 const DatasetSelector: React.FC<DatasetSelectorProps> = ({
   selectedDatasets,
   onSelectionChange,
+  sampling,
+  onSamplingChange,
 }) => {
   const [datasets, setDatasets] = useState<UserDataset[]>([]);
   const [loading, setLoading] = useState(true);
@@ -129,6 +140,26 @@ const DatasetSelector: React.FC<DatasetSelectorProps> = ({
               </Card>
             );
           })}
+          <div style={{ display: 'flex', gap: 8, alignItems: 'center' }}>
+            <Text type="secondary" style={{ fontSize: 12, flexShrink: 0 }}>Выборка:</Text>
+            <Select
+              size="small"
+              allowClear
+              placeholder="По умолчанию"
+              style={{ flex: 1, minWidth: 0 }}
+              value={sampling.strategy}
+              options={SAMPLING_OPTIONS}
+              onChange={(strategy) => onSamplingChange({ ...sampling, strategy })}
+            />
+            <InputNumber
+              size="small"
+              min={0}
+              placeholder="20"
+              style={{ width: 72 }}
+              value={sampling.size}
+              onChange={(size) => onSamplingChange({ ...sampling, size: size ?? undefined })}
+            />
+          </div>
         </Space>
       )}
     </Card>
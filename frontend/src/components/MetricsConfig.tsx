@@ -1,12 +1,14 @@
 import React from 'react';
-import { Card, Slider, Space, Typography } from 'antd';
-import { MetricsConfig as MetricsConfigType } from '../types';
+import { Card, Slider, Space, Switch, Typography } from 'antd';
+import { MetricsConfig as MetricsConfigType, ScoringMode } from '../types';
 
 const { Text } = Typography;
 
 interface MetricsConfigProps {
   metrics: MetricsConfigType;
   onMetricsChange: (metrics: MetricsConfigType) => void;
+  scoringMode: ScoringMode;
+  onScoringModeChange: (mode: ScoringMode) => void;
 }
 
 interface MetricInfo {
@@ -15,11 +17,18 @@ interface MetricInfo {
   color: string;
 }
 
-const MetricsConfig: React.FC<MetricsConfigProps> = ({ metrics, onMetricsChange }) => {
+const MetricsConfig: React.FC<MetricsConfigProps> = ({ metrics, onMetricsChange, scoringMode, onScoringModeChange }) => {
   const metricsInfo: MetricInfo[] = [
     { key: 'rouge', label: 'ROUGE (точность совпадений)', color: '#3b82f6' },
     { key: 'semantic', label: 'Семантическое сходство', color: '#8b5cf6' },
     { key: 'bertScore', label: 'BERT Score (контекст)', color: '#10b981' },
+    { key: 'rouge1', label: 'ROUGE-1 (совпадение слов)', color: '#0ea5e9' },
+    { key: 'rouge2', label: 'ROUGE-2 (совпадение биграмм)', color: '#06b6d4' },
+    { key: 'rougeLsum', label: 'ROUGE-Lsum (по предложениям)', color: '#6366f1' },
+    { key: 'bleu', label: 'BLEU', color: '#f59e0b' },
+    { key: 'chrf', label: 'chrF (символьные n-граммы)', color: '#ef4444' },
+    { key: 'tokenF1', label: 'Token F1', color: '#14b8a6' },
+    { key: 'exactMatch', label: 'Точное совпадение', color: '#64748b' },
   ];
 
   const handleWeightChange = (metric: keyof MetricsConfigType, value: number) => {
@@ -37,7 +46,7 @@ const MetricsConfig: React.FC<MetricsConfigProps> = ({ metrics, onMetricsChange
     >
       <Space direction="vertical" size="middle" style={{ width: '100%' }}>
         {metricsInfo.map((metricInfo) => {
-          const value = metrics[metricInfo.key].weight;
+          const value = metrics[metricInfo.key]?.weight ?? 0;
           const percentage = Math.round(value * 100);
 
           return (
@@ -66,6 +75,19 @@ const MetricsConfig: React.FC<MetricsConfigProps> = ({ metrics, onMetricsChange
             </div>
           );
         })}
+        <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center' }}>
+          <div>
+            <Text strong>Каскадная оценка</Text>
+            <br />
+            <Text type="secondary" style={{ fontSize: 12 }}>
+              Семантика и BERT Score только там, где они могут изменить рейтинг
+            </Text>
+          </div>
+          <Switch
+            checked={scoringMode === 'cascade'}
+            onChange={(checked) => onScoringModeChange(checked ? 'cascade' : 'full')}
+          />
+        </div>
       </Space>
     </Card>
   );
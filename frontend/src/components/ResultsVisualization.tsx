@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import { Card, Button, Typography, Space, Progress, Tag, Radio, Alert, Divider, Table, Collapse } from 'antd';
-import { TrophyOutlined, DatabaseOutlined, CheckCircleOutlined, EyeOutlined, BarChartOutlined, StarOutlined } from '@ant-design/icons';
+import { TrophyOutlined, DatabaseOutlined, CheckCircleOutlined, EyeOutlined, BarChartOutlined, StarOutlined, ThunderboltOutlined } from '@ant-design/icons';
 import { benchmarksAPI } from '../services/api';
 import { message } from 'antd';
 
@@ -31,6 +31,10 @@ const ResultsVisualization: React.FC<ResultsVisualizationProps> = ({ results })
     return <ReferenceComparisonView data={results.referenceComparison} />;
   }
 
+  if (results.testType === 'performance_benchmark' && results.performance) {
+    return <PerformanceView data={results.performance} />;
+  }
+
   if (results.testType === 'blind_test' && results.blindTest) {
     return <BlindTestView results={results} blindTestData={blindTestData} setBlindTestData={setBlindTestData} />;
   }
@@ -38,6 +42,20 @@ const ResultsVisualization: React.FC<ResultsVisualizationProps> = ({ results })
   return null;
 };
 
+// Метрики, которые не считались (нулевой вес или каскадная оценка), приходят как null и не показываются
+const METRIC_LABELS: Record<string, string> = {
+  rouge: 'ROUGE',
+  semantic: 'Semantic',
+  bertScore: 'BERT Score',
+  rouge1: 'ROUGE-1',
+  rouge2: 'ROUGE-2',
+  rougeLsum: 'ROUGE-Lsum',
+  bleu: 'BLEU',
+  chrf: 'chrF',
+  tokenF1: 'Token F1',
+  exactMatch: 'Exact Match',
+};
+
 // Metrics Comparison View
 const MetricsComparisonView: React.FC<{ data: any }> = ({ data }) => {
   return (
@@ -71,7 +89,14 @@ const MetricsComparisonView: React.FC<{ data: any }> = ({ data }) => {
             <Space>
               <Tag color={idx === 0 ? 'gold' : 'blue'}>#{idx + 1}</Tag>
               <Text strong>{model.name}</Text>
-              <Tag color="green">{model.averageScore.toFixed(2)} баллов</Tag>
+              {model.averageScoreEstimated ? (
+                <Tag color="default">≈ {model.averageScore.toFixed(2)} баллов (оценка)</Tag>
+              ) : (
+                <Tag color="green">{model.averageScore.toFixed(2)} баллов</Tag>
+              )}
+              {model.scoreBounds && (
+                <Tag>от {model.scoreBounds[0]} до {model.scoreBounds[1]}</Tag>
+              )}
             </Space>
           }
           style={{ boxShadow: '0 2px 8px rgba(0,0,0,0.08)' }}
@@ -107,18 +132,14 @@ const MetricsComparisonView: React.FC<{ data: any }> = ({ data }) => {
                     <Text strong>Метрики:</Text>
                     <div style={{ marginTop: 8 }}>
                       <Space direction="vertical" style={{ width: '100%' }}>
-                        <div>
-                          <Text>ROUGE: </Text>
-                          <Progress percent={Number((resp.metrics.rouge * 100).toFixed(1))} size="small" />
-                        </div>
-                        <div>
-                          <Text>Semantic: </Text>
-                          <Progress percent={Number((resp.metrics.semantic * 100).toFixed(1))} size="small" />
-                        </div>
-                        <div>
-                          <Text>BERT Score: </Text>
-                          <Progress percent={Number((resp.metrics.bertScore * 100).toFixed(1))} size="small" />
-                        </div>
+                        {Object.entries(METRIC_LABELS)
+                          .filter(([key]) => resp.metrics[key] !== null && resp.metrics[key] !== undefined)
+                          .map(([key, label]) => (
+                            <div key={key}>
+                              <Text>{label}: </Text>
+                              <Progress percent={Number((resp.metrics[key] * 100).toFixed(1))} size="small" />
+                            </div>
+                          ))}
                       </Space>
                     </div>
                   </div>
@@ -132,6 +153,98 @@ const MetricsComparisonView: React.FC<{ data: any }> = ({ data }) => {
   );
 };
 
+// Performance Benchmark View
+const formatSeconds = (value?: number) => (value === undefined || value === null ? '—' : `${value.toFixed(3)} с`);
+
+const PerformanceView: React.FC<{ data: any }> = ({ data }) => {
+  const isOpenLoop = data.config.arrivalMode === 'open';
+  const columns = [
+    { title: isOpenLoop ? 'Запросов/с' : 'Параллельность', dataIndex: 'level', key: 'level' },
+    { title: 'Запросов', dataIndex: 'requests', key: 'requests' },
+    {
+      title: 'Ошибки',
+      key: 'errorRate',
+      render: (level: any) => `${(level.errorRate * 100).toFixed(1)}%`,
+    },
+    {
+      title: 'Пропускная способность',
+      key: 'throughput',
+      render: (level: any) => `${level.throughput.toFixed(2)} запр/с`,
+    },
+    {
+      title: 'Токены/с',
+      dataIndex: 'outputTokensPerSecond',
+      key: 'outputTokensPerSecond',
+    },
+    { title: 'Задержка p50', key: 'p50', render: (level: any) => formatSeconds(level.latency?.p50) },
+    { title: 'Задержка p95', key: 'p95', render: (level: any) => formatSeconds(level.latency?.p95) },
+    { title: 'Задержка p99', key: 'p99', render: (level: any) => formatSeconds(level.latency?.p99) },
+    { title: 'TTFT p50', key: 'ttft', render: (level: any) => formatSeconds(level.ttft?.p50) },
+  ];
+
+  return (
+    <Space direction="vertical" size="large" style={{ width: '100%' }}>
+      <Card style={{ boxShadow: '0 2px 8px rgba(0,0,0,0.08)' }}>
+        <Title level={3}>
+          <ThunderboltOutlined /> Нагрузочный тест
+        </Title>
+        <Paragraph type="secondary">
+          {isOpenLoop
+            ? 'Открытая модель нагрузки: запросы поступают с заданной интенсивностью независимо от ответов'
+            : 'Закрытая модель нагрузки: каждый пользователь отправляет следующий запрос после ответа на предыдущий'}
+        </Paragraph>
+
+        {data.datasetsUsed && data.datasetsUsed.length > 0 && (
+          <div style={{ marginTop: 16 }}>
+            <Text strong><DatabaseOutlined /> Использованные датасеты:</Text>
+            <div style={{ marginTop: 8 }}>
+              <Space size={[8, 8]} wrap>
+                {data.datasetsUsed.map((dataset: string, idx: number) => (
+                  <Tag key={idx} color="orange">{dataset}</Tag>
+                ))}
+              </Space>
+            </div>
+          </div>
+        )}
+      </Card>
+
+      {data.models.map((model: any) => (
+        <Card
+          key={model.id}
+          title={
+            <Space>
+              <Text strong>{model.name}</Text>
+              <Tag color="green">пик {model.peakThroughput.toFixed(2)} запр/с</Tag>
+              {model.saturationPoint ? (
+                <Tag color="orange">насыщение на уровне {model.saturationPoint.level}</Tag>
+              ) : (
+                <Tag color="blue">насыщение не достигнуто</Tag>
+              )}
+            </Space>
+          }
+          style={{ boxShadow: '0 2px 8px rgba(0,0,0,0.08)' }}
+        >
+          {model.stoppedEarly && (
+            <Alert
+              type="warning"
+              showIcon
+              style={{ marginBottom: 16 }}
+              message="Тест остановлен досрочно: слишком много ошибок на последнем уровне нагрузки"
+            />
+          )}
+          <Table
+            size="small"
+            pagination={false}
+            rowKey="level"
+            columns={columns}
+            dataSource={model.levels}
+          />
+        </Card>
+      ))}
+    </Space>
+  );
+};
+
 // Judge Evaluation View
 const JudgeEvalView: React.FC<{ data: any }> = ({ data }) => {
   return (
@@ -170,10 +283,11 @@ const JudgeEvalView: React.FC<{ data: any }> = ({ data }) => {
                 <Space>
                   <Tag color="blue">{model.totalScore} баллов</Tag>
                   <Tag color="green">{model.wins} побед</Tag>
+                  {data.judgeFailures > 0 && <Tag color="red">без оценки судьи: {data.judgeFailures}</Tag>}
                 </Space>
               </Space>
               <Progress 
-                percent={Number(((model.totalScore / (data.totalPrompts * 10)) * 100).toFixed(1))} 
+                percent={Number(((model.totalScore / ((data.evaluatedPrompts ?? data.totalPrompts) * 10 || 1)) * 100).toFixed(1))} 
                 strokeColor={idx === 0 ? '#52c41a' : '#1890ff'}
               />
             </div>
@@ -200,7 +314,9 @@ const JudgeEvalView: React.FC<{ data: any }> = ({ data }) => {
                 title={
                   <Space>
                     <Text strong>{resp.modelName}</Text>
-                    <Tag color={resp.score >= 5 ? 'green' : 'orange'}>{resp.score}/10</Tag>
+                    {resp.score == null
+                      ? <Tag>без оценки</Tag>
+                      : <Tag color={resp.score >= 5 ? 'green' : 'orange'}>{resp.score}/10</Tag>}
                   </Space>
                 }
                 style={{ 
@@ -262,6 +378,7 @@ const ReferenceComparisonView: React.FC<{ data: any }> = ({ data }) => {
               <Tag color={idx === 0 ? 'gold' : 'blue'}>#{idx + 1}</Tag>
               <Text strong>{model.name}</Text>
               <Tag color="green">{model.averageScore.toFixed(2)}/10</Tag>
+              {model.judgeFailures > 0 && <Tag color="red">без оценки судьи: {model.judgeFailures}</Tag>}
             </Space>
           }
           style={{ boxShadow: '0 2px 8px rgba(0,0,0,0.08)' }}
@@ -272,9 +389,13 @@ const ReferenceComparisonView: React.FC<{ data: any }> = ({ data }) => {
                 header={
                   <Space>
                     <Text>Вопрос {respIdx + 1}</Text>
-                    <Tag color={resp.score >= 7 ? 'green' : resp.score >= 4 ? 'orange' : 'red'}>
-                      {resp.score}/10
-                    </Tag>
+                    {resp.score == null ? (
+                      <Tag>без оценки</Tag>
+                    ) : (
+                      <Tag color={resp.score >= 7 ? 'green' : resp.score >= 4 ? 'orange' : 'red'}>
+                        {resp.score}/10
+                      </Tag>
+                    )}
                   </Space>
                 }
                 key={respIdx}
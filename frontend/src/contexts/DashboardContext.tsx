@@ -27,6 +27,13 @@ export const DashboardProvider: React.FC<{ children: ReactNode }> = ({ children
     rouge: { weight: 0.4 },
     semantic: { weight: 0.3 },
     bertScore: { weight: 0.3 },
+    rouge1: { weight: 0 },
+    rouge2: { weight: 0 },
+    rougeLsum: { weight: 0 },
+    bleu: { weight: 0 },
+    chrf: { weight: 0 },
+    tokenF1: { weight: 0 },
+    exactMatch: { weight: 0 },
   });
   const [results, setResults] = useState<any | null>(null);
   const [resultsVisible, setResultsVisible] = useState<boolean>(false);
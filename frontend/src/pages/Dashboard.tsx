@@ -6,7 +6,7 @@ import BenchmarkSelector from '../components/BenchmarkSelector';
 import DatasetSelector from '../components/DatasetSelector';
 import MetricsConfig from '../components/MetricsConfig';
 import ResultsVisualization from '../components/ResultsVisualization';
-import { BenchmarkRequest } from '../types';
+import { BenchmarkRequest, PromptSampling, ScoringMode } from '../types';
 import { benchmarksAPI } from '../services/api';
 import { useDashboard } from '../contexts/DashboardContext';
 import { message } from 'antd';
@@ -30,6 +30,8 @@ const Dashboard: React.FC = () => {
   } = useDashboard();
   
   const [loading, setLoading] = useState(false);
+  const [scoringMode, setScoringMode] = useState<ScoringMode>('full');
+  const [sampling, setSampling] = useState<PromptSampling>({});
   const [sidebarWidth, setSidebarWidth] = useState(() => {
     const saved = localStorage.getItem('dashboardSidebarWidth');
     return saved ? parseInt(saved) : 33.33; // По умолчанию 33.33% (8/24 колонок)
@@ -98,6 +100,8 @@ const Dashboard: React.FC = () => {
       selectedBenchmarks: [selectedBenchmark.id],
       selectedDatasets: selectedDatasets.map(d => d.id),
       metrics,
+      scoringMode,
+      sampling,
     };
 
     try {
@@ -146,8 +150,15 @@ const Dashboard: React.FC = () => {
           <DatasetSelector
             selectedDatasets={selectedDatasets}
             onSelectionChange={setSelectedDatasets}
+            sampling={sampling}
+            onSamplingChange={setSampling}
+          />
+          <MetricsConfig
+            metrics={metrics}
+            onMetricsChange={setMetrics}
+            scoringMode={scoringMode}
+            onScoringModeChange={setScoringMode}
           />
-          <MetricsConfig metrics={metrics} onMetricsChange={setMetrics} />
         </Space>
       </div>
 
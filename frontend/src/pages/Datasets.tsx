@@ -1,9 +1,9 @@
 import React, { useEffect, useState } from 'react';
-import { Card, Button, Typography, Space, Empty, Spin, Modal, Form, Input, Upload, Table, message, Row, Col } from 'antd';
+import { Card, Button, Typography, Space, Empty, Spin, Modal, Form, Input, Upload, Table, message, Row, Col, Progress } from 'antd';
 import { PlusOutlined, DeleteOutlined, UploadOutlined, EditOutlined, DatabaseOutlined, MinusCircleOutlined, EyeOutlined } from '@ant-design/icons';
 import type { UploadFile } from 'antd/es/upload/interface';
 import { datasetsAPI } from '../services/api';
-import { UserDataset } from '../types';
+import { DatasetPatchOperation, UserDataset } from '../types';
 
 const { Title, Text } = Typography;
 const { TextArea } = Input;
@@ -28,6 +28,47 @@ const getPluralForm = (count: number, one: string, few: string, many: string): s
   return many;
 };
 
+// Строк на страницу при просмотре и редактировании вопросов
+const VIEW_PAGE_SIZE = 50;
+const EDIT_PAGE_SIZE = 100;
+
+type EditRow = { prompt?: string; reference?: string; _row?: number };
+
+// Операции построчной правки: сначала удаления с конца, затем по итоговому
+// порядку строк — вставки новых строк и замена изменённых (_row — номер
+// строки в датасете при загрузке, у новых строк его нет). Редактор загружает
+// датасет страницами с начала, поэтому загруженные строки — это первые
+// original.length строк, и позиции в списке совпадают с номерами строк датасета.
+// Значения пишутся в колонки промпта и эталона датасета.
+const buildPatchOperations = (
+  original: Array<{prompt: string; reference: string}>,
+  rows: EditRow[],
+  promptColumn: string,
+  referenceColumn: string
+): DatasetPatchOperation[] => {
+  const kept = new Set(rows.filter((row) => row._row !== undefined).map((row) => row._row));
+  const operations: DatasetPatchOperation[] = [];
+  for (let index = original.length - 1; index >= 0; index--) {
+    if (!kept.has(index)) {
+      operations.push({ op: 'delete', row: index });
+    }
+  }
+  rows.forEach((row, position) => {
+    const prompt = row.prompt || '';
+    const reference = row.reference || '';
+    const values = { [promptColumn]: prompt, [referenceColumn]: reference };
+    if (row._row === undefined) {
+      operations.push({ op: 'insert', row: position, values });
+      return;
+    }
+    const before = original[row._row];
+    if (before.prompt !== prompt || before.reference !== reference) {
+      operations.push({ op: 'update', row: position, values });
+    }
+  });
+  return operations;
+};
+
 const Datasets: React.FC = () => {
   const [datasets, setDatasets] = useState<UserDataset[]>([]);
   const [loading, setLoading] = useState(true);
@@ -38,7 +79,17 @@ const Datasets: React.FC = () => {
   const [fileList, setFileList] = useState<UploadFile[]>([]);
   const [editingDataset, setEditingDataset] = useState<UserDataset | null>(null);
   const [datasetData, setDatasetData] = useState<Array<{prompt: string; reference: string}>>([]);
+  // Просмотр загружает строки страницами: общее число строк и курсор следующей страницы
+  const [viewTotalRows, setViewTotalRows] = useState(0);
+  const [viewCursor, setViewCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loadingData, setLoadingData] = useState(false);
+  // Редактор тоже загружает строки страницами; правки отправляются построчно
+  // в колонки промпта и эталона датасета с версией, полученной при загрузке
+  const [editDataVersion, setEditDataVersion] = useState<string | undefined>(undefined);
+  const [editDataColumns, setEditDataColumns] = useState<{prompt?: string | null; reference?: string | null}>({});
+  const [editTotalRows, setEditTotalRows] = useState(0);
+  const [editCursor, setEditCursor] = useState<string | null>(null);
   const [form] = Form.useForm();
   const [webForm] = Form.useForm();
   const [editDataForm] = Form.useForm();
@@ -47,6 +98,16 @@ const Datasets: React.FC = () => {
     loadData();
   }, []);
 
+  // Пока файлы анализируются в фоне, список обновляется, чтобы показать прогресс
+  const analysisInProgress = datasets.some(
+    (dataset) => dataset.analysis_status === 'pending' || dataset.analysis_status === 'running'
+  );
+  useEffect(() => {
+    if (!analysisInProgress) return;
+    const timer = setInterval(loadData, 2000);
+    return () => clearInterval(timer);
+  }, [analysisInProgress]);
+
   const loadData = async () => {
     try {
       const data = await datasetsAPI.getUserDatasets();
@@ -106,6 +167,73 @@ const Datasets: React.FC = () => {
     }
   };
 
+  const openDatasetView = async (datasetIdNum: number) => {
+    const result = await datasetsAPI.getDatasetData(datasetIdNum, { limit: VIEW_PAGE_SIZE });
+    setDatasetData(result.data);
+    setViewTotalRows(result.total_rows);
+    setViewCursor(result.next_cursor || null);
+  };
+
+  const loadMoreRows = async () => {
+    if (!editingDataset || !viewCursor) return;
+    setLoadingMore(true);
+    try {
+      const datasetIdNum = parseInt(editingDataset.id.replace('dataset_', ''));
+      const result = await datasetsAPI.getDatasetData(datasetIdNum, { limit: VIEW_PAGE_SIZE, cursor: viewCursor });
+      setDatasetData((rows) => [...rows, ...result.data]);
+      setViewCursor(result.next_cursor || null);
+    } catch (error: any) {
+      message.error(error.response?.data?.error || 'Ошибка загрузки данных');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const openDatasetEditor = async (dataset: UserDataset, datasetIdNum: number) => {
+    const result = await datasetsAPI.getDatasetData(datasetIdNum, { limit: EDIT_PAGE_SIZE });
+    setDatasetData(result.data);
+    setEditDataVersion(result.version);
+    setEditDataColumns({ prompt: result.prompt_column, reference: result.reference_column });
+    setEditTotalRows(result.total_rows);
+    setEditCursor(result.next_cursor || null);
+    editDataForm.setFieldsValue({
+      name: dataset.name,
+      description: dataset.description,
+      rows: result.data.map((row, index) => ({ ...row, _row: index }))
+    });
+  };
+
+  const loadMoreEditRows = async () => {
+    if (!editingDataset || !editCursor) return;
+    setLoadingMore(true);
+    try {
+      const datasetIdNum = parseInt(editingDataset.id.replace('dataset_', ''));
+      const result = await datasetsAPI.getDatasetData(datasetIdNum, { limit: EDIT_PAGE_SIZE, cursor: editCursor });
+      setDatasetData((rows) => [...rows, ...result.data]);
+      setEditCursor(result.next_cursor || null);
+      editDataForm.setFieldValue('rows', [
+        ...(editDataForm.getFieldValue('rows') || []),
+        ...result.data.map((row, index) => ({ ...row, _row: result.offset + index }))
+      ]);
+    } catch (error: any) {
+      message.error(error.response?.data?.error || 'Ошибка загрузки данных');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Незагруженные в редактор строки — для сохранения датасета целиком
+  const loadRemainingRows = async (datasetIdNum: number) => {
+    const rows: Array<{prompt: string; reference: string}> = [];
+    let cursor = editCursor;
+    while (cursor) {
+      const result = await datasetsAPI.getDatasetData(datasetIdNum, { cursor });
+      rows.push(...result.data);
+      cursor = result.next_cursor || null;
+    }
+    return rows;
+  };
+
   const handleDelete = async (datasetId: number) => {
     Modal.confirm({
       title: 'Подтверждение удаления',
@@ -151,9 +279,9 @@ const Datasets: React.FC = () => {
   const handleEditDataSubmit = async (values: any) => {
     if (!editingDataset) return;
 
-    const validRows = values.rows.filter((row: any) => row?.prompt?.trim() || row?.reference?.trim());
+    const validRows = (values.rows || []).filter((row: any) => row?.prompt?.trim() || row?.reference?.trim());
     
-    if (validRows.length === 0) {
+    if (validRows.length === 0 && !editCursor) {
       message.error('Вопросы должны содержать хотя бы одну строку с данными');
       return;
     }
@@ -167,8 +295,16 @@ const Datasets: React.FC = () => {
         description: values.description || '',
       });
       
-      // Обновляем данные
-      await datasetsAPI.saveDatasetData(datasetIdNum, validRows);
+      // Обновляем данные: построчно, если в датасете найдены колонки промпта и эталона,
+      // иначе файл переписывается целиком вместе с ещё не загруженными строками
+      if (editDataColumns.prompt && editDataColumns.reference) {
+        const operations = buildPatchOperations(datasetData, validRows, editDataColumns.prompt, editDataColumns.reference);
+        if (operations.length > 0) {
+          await datasetsAPI.patchDataset(datasetIdNum, operations, editDataVersion);
+        }
+      } else {
+        await datasetsAPI.saveDatasetData(datasetIdNum, [...validRows, ...(await loadRemainingRows(datasetIdNum))]);
+      }
       message.success('Вопросы успешно обновлены!');
       setShowEditDataModal(false);
       setEditingDataset(null);
@@ -239,8 +375,7 @@ const Datasets: React.FC = () => {
                       setLoadingData(true);
                       setShowViewModal(true);
                       try {
-                        const result = await datasetsAPI.getDatasetData(datasetIdNum);
-                        setDatasetData(result.data);
+                        await openDatasetView(datasetIdNum);
                       } catch (error: any) {
                         message.error(error.response?.data?.error || 'Ошибка загрузки данных');
                         setShowViewModal(false);
@@ -305,6 +440,17 @@ const Datasets: React.FC = () => {
                             {dataset.row_count || 0}
                           </div>
                         </div>
+                        {(dataset.analysis_status === 'pending' || dataset.analysis_status === 'running') && (
+                          <div style={{ marginBottom: 10 }}>
+                            <Text type="secondary" style={{ fontSize: 12 }}>Анализ файла…</Text>
+                            <Progress percent={Math.round((dataset.analysis_progress || 0) * 100)} size="small" />
+                          </div>
+                        )}
+                        {dataset.analysis_status === 'failed' && (
+                          <Text type="danger" style={{ fontSize: 12, display: 'block', marginBottom: 10 }}>
+                            {dataset.analysis_error || 'Ошибка при анализе файла'}
+                          </Text>
+                        )}
                         {dataset.file_path && (
                           <div style={{ 
                             paddingTop: 10, 
@@ -331,8 +477,7 @@ const Datasets: React.FC = () => {
                               setLoadingData(true);
                               setShowViewModal(true);
                               try {
-                                const result = await datasetsAPI.getDatasetData(datasetIdNum);
-                                setDatasetData(result.data);
+                                await openDatasetView(datasetIdNum);
                               } catch (error: any) {
                                 message.error(error.response?.data?.error || 'Ошибка загрузки данных');
                                 setShowViewModal(false);
@@ -355,13 +500,7 @@ const Datasets: React.FC = () => {
                               setLoadingData(true);
                               setShowEditDataModal(true);
                               try {
-                                const result = await datasetsAPI.getDatasetData(datasetIdNum);
-                                setDatasetData(result.data);
-                                editDataForm.setFieldsValue({ 
-                                  name: dataset.name,
-                                  description: dataset.description,
-                                  rows: result.data 
-                                });
+                                await openDatasetEditor(dataset, datasetIdNum);
                               } catch (error: any) {
                                 message.error(error.response?.data?.error || 'Ошибка загрузки данных');
                                 setShowEditDataModal(false);
@@ -626,7 +765,7 @@ const Datasets: React.FC = () => {
               <TextArea rows={2} placeholder="Краткое описание вопросов" />
             </Form.Item>
 
-            <Form.Item label={`Данные вопросов (${datasetData.length} ${getPluralForm(datasetData.length, 'строка', 'строки', 'строк')})`}>
+            <Form.Item label={`Данные вопросов (${editTotalRows} ${getPluralForm(editTotalRows, 'строка', 'строки', 'строк')})`}>
               <Form.List name="rows">
                 {(fields, { add, remove }) => (
                   <>
@@ -647,6 +786,9 @@ const Datasets: React.FC = () => {
                           </Button>
                         }
                       >
+                        <Form.Item name={[field.name, '_row']} hidden>
+                          <Input />
+                        </Form.Item>
                         <Form.Item
                           {...field}
                           name={[field.name, 'prompt']}
@@ -665,6 +807,16 @@ const Datasets: React.FC = () => {
                         </Form.Item>
                       </Card>
                     ))}
+                    {editCursor && (
+                      <Button
+                        onClick={loadMoreEditRows}
+                        loading={loadingMore}
+                        block
+                        style={{ marginBottom: 12 }}
+                      >
+                        Показать ещё ({editTotalRows - datasetData.length})
+                      </Button>
+                    )}
                     <Button
                       type="dashed"
                       onClick={() => add()}
@@ -716,7 +868,7 @@ const Datasets: React.FC = () => {
         ) : (
           <div style={{ maxHeight: '60vh', overflowY: 'auto' }}>
             <Space direction="vertical" size="middle" style={{ width: '100%' }}>
-              <Text strong>Всего строк: {datasetData.length}</Text>
+              <Text strong>Всего строк: {viewTotalRows}</Text>
               {datasetData.map((row, index) => (
                 <Card key={index} size="small" title={`Строка ${index + 1}`}>
                   <Space direction="vertical" style={{ width: '100%' }}>
@@ -749,6 +901,11 @@ const Datasets: React.FC = () => {
                   </Space>
                 </Card>
               ))}
+              {viewCursor && (
+                <Button block loading={loadingMore} onClick={loadMoreRows}>
+                  Показать ещё ({viewTotalRows - datasetData.length})
+                </Button>
+              )}
             </Space>
           </div>
         )}
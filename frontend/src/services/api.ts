@@ -3,6 +3,7 @@ import {
   User,
   UserModel,
   UserDataset,
+  DatasetPatchOperation,
   Benchmark,
   BenchmarkRequest,
   BenchmarkResult,
@@ -151,8 +152,20 @@ export const datasetsAPI = {
     return response.data;
   },
 
-  getDatasetData: async (datasetId: number): Promise<{ data: Array<{prompt: string; reference: string}>; total_rows: number }> => {
-    const response = await api.get(`/user/datasets/get-data/${datasetId}`);
+  getDatasetData: async (
+    datasetId: number,
+    page?: { limit?: number; offset?: number; cursor?: string }
+  ): Promise<{
+    data: Array<{prompt: string; reference: string}>;
+    total_rows: number;
+    offset: number;
+    columns?: string[];
+    prompt_column?: string | null;
+    reference_column?: string | null;
+    version?: string;
+    next_cursor?: string | null;
+  }> => {
+    const response = await api.get(`/user/datasets/get-data/${datasetId}`, { params: page });
     return response.data;
   },
 
@@ -160,6 +173,15 @@ export const datasetsAPI = {
     const response = await api.post(`/user/datasets/save-data/${datasetId}`, { rows });
     return response.data;
   },
+
+  patchDataset: async (
+    datasetId: number,
+    operations: DatasetPatchOperation[],
+    version?: string
+  ): Promise<{ dataset: UserDataset; version: string; applied: number }> => {
+    const response = await api.post(`/user/datasets/patch/${datasetId}`, { operations, version });
+    return response.data;
+  },
 };
 
 // Settings API
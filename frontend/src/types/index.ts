@@ -27,6 +27,9 @@ export interface UserDataset {
   row_count?: number;
   user_id?: number;
   is_active?: boolean;
+  analysis_status?: 'ready' | 'pending' | 'running' | 'failed';
+  analysis_progress?: number | null;
+  analysis_error?: string | null;
 }
 
 export interface Benchmark {
@@ -42,6 +45,38 @@ export interface MetricsConfig {
   rouge: { weight: number };
   semantic: { weight: number };
   bertScore: { weight: number };
+  rouge1: { weight: number };
+  rouge2: { weight: number };
+  rougeLsum: { weight: number };
+  bleu: { weight: number };
+  chrf: { weight: number };
+  tokenF1: { weight: number };
+  exactMatch: { weight: number };
+}
+
+export type ScoringMode = 'full' | 'cascade';
+
+export type SamplingStrategy = 'head' | 'reservoir' | 'hash' | 'stratified';
+
+export interface PromptSampling {
+  strategy?: SamplingStrategy;
+  size?: number;
+  seed?: number;
+  categoryColumn?: string;
+}
+
+// Построчная правка датасета: row — номер строки с учётом предыдущих операций
+export interface DatasetPatchOperation {
+  op: 'insert' | 'update' | 'delete';
+  row: number;
+  values?: Record<string, string>;
+}
+
+export interface PerformanceConfig {
+  levels?: number[];
+  arrivalMode?: 'closed' | 'open';
+  requestsPerLevel?: number;
+  maxTokens?: number;
 }
 
 export interface BenchmarkRequest {
@@ -49,6 +84,10 @@ export interface BenchmarkRequest {
   selectedBenchmarks: string[];
   selectedDatasets: string[];
   metrics: MetricsConfig;
+  cacheMode?: 'use' | 'refresh' | 'bypass';
+  scoringMode?: ScoringMode;
+  sampling?: PromptSampling;
+  performance?: PerformanceConfig;
 }
 
 export interface BenchmarkResult {
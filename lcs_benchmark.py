@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the LCS implementations used for ROUGE-L.
+
+Compares the old full-table dynamic programming, the linear-memory fallback
+and the bit-parallel algorithm on synthetic answers of realistic lengths
+(word frequencies follow a Zipf distribution) and checks that all of them
+return the same LCS length.
+
+Usage: python lcs_benchmark.py [--repeat N]
+"""
+import argparse
+import random
+import time
+
+from app.services.lexical_metrics import lcs_length_bit_parallel, lcs_length_linear
+
+LENGTHS = [(50, 60), (200, 250), (500, 600), (2000, 2000)]
+FULL_TABLE_MAX_CELLS = 5_000_000
+
+
+def full_table_lcs(seq1, seq2):
+    """The previous implementation from calculate_rouge_score."""
+    m, n = len(seq1), len(seq2)
+    dp = [[0] * (n + 1) for _ in range(m + 1)]
+
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            if seq1[i - 1] == seq2[j - 1]:
+                dp[i][j] = dp[i - 1][j - 1] + 1
+            else:
+                dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
+
+    return dp[m][n]
+
+
+def make_answer(rng, vocabulary, weights, length):
+    return rng.choices(vocabulary, weights=weights, k=length)
+
+
+def best_time(fn, seq1, seq2, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = fn(seq1, seq2)
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    vocabulary = [f'w{i}' for i in range(3000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    print(f"{'tokens':>12} {'full table':>12} {'linear':>12} {'bit-parallel':>14} {'speedup':>9}")
+    for ref_len, cand_len in LENGTHS:
+        reference = make_answer(rng, vocabulary, weights, ref_len)
+        candidate = make_answer(rng, vocabulary, weights, cand_len)
+
+        bit_time, bit_result = best_time(lcs_length_bit_parallel, reference, candidate, args.repeat)
+        linear_time, linear_result = best_time(lcs_length_linear, reference, candidate, args.repeat)
+        if ref_len * cand_len <= FULL_TABLE_MAX_CELLS:
+            full_time, full_result = best_time(full_table_lcs, reference, candidate, 1)
+        else:
+            full_time, full_result = None, linear_result
+
+        assert bit_result == linear_result == full_result, (bit_result, linear_result, full_result)
+
+        baseline = full_time if full_time is not None else linear_time
+        print(f"{f'{ref_len}x{cand_len}':>12} "
+              f"{(f'{full_time * 1000:.2f} ms' if full_time is not None else '-'):>12} "
+              f"{linear_time * 1000:>9.2f} ms "
+              f"{bit_time * 1000:>11.3f} ms "
+              f"{baseline / bit_time:>8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Score drift of a CPU inference backend against the fp32 baseline.
+
+Scores the same (reference, candidate) pairs from a dataset CSV with the
+fp32 PyTorch models and with the selected backend (int8 or onnx), then
+reports how far the semantic similarity and BERTScore values moved and how
+much faster the backend was. Candidates come from --candidate-column, or
+from the prompt column when it is not given.
+
+Usage: python scoring_drift.py DATASET.csv --backend int8 [--limit N] [--max-drift 0.02]
+"""
+import argparse
+import csv
+import sys
+import time
+
+import numpy as np
+
+from app.services.dataset_analysis import find_prompt_column, find_reference_column
+from app.services.embedding_store import embedding_store
+from app.services.inference_backends import BACKEND_INT8, BACKEND_ONNX, BACKEND_TORCH, check_backend_requirements
+from app.services.scoring import BertScoreModel, SemanticModel
+
+
+def read_pairs(path, candidate_column, limit):
+    with open(path, 'r', encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        reference_column = find_reference_column(reader.fieldnames)
+        candidate_column = candidate_column or find_prompt_column(reader.fieldnames)
+        if not reference_column or not candidate_column:
+            sys.exit(f'Could not find reference/candidate columns in {reader.fieldnames}')
+
+        pairs = []
+        for row in reader:
+            reference = (row.get(reference_column) or '').strip()
+            candidate = (row.get(candidate_column) or '').strip()
+            if reference and candidate:
+                pairs.append((reference, candidate))
+            if limit and len(pairs) >= limit:
+                break
+    return pairs
+
+
+def timed_scores(fn, references, candidates):
+    started_at = time.perf_counter()
+    scores = np.asarray(fn(references, candidates), dtype=np.float64)
+    return scores, time.perf_counter() - started_at
+
+
+def ranks(values):
+    order = np.argsort(values, kind='stable')
+    result = np.empty(len(values))
+    result[order] = np.arange(len(values))
+    return result
+
+
+def correlation(a, b):
+    if len(a) < 2 or np.std(a) == 0 or np.std(b) == 0:
+        return float('nan')
+    return float(np.corrcoef(a, b)[0, 1])
+
+
+def compare(name, baseline_model, backend_model, method, references, candidates):
+    # Model loading is excluded: only scoring speed is compared
+    baseline_model.load()
+    backend_model.load()
+    baseline, baseline_seconds = timed_scores(getattr(baseline_model, method), references, candidates)
+    scores, backend_seconds = timed_scores(getattr(backend_model, method), references, candidates)
+    drift = np.abs(scores - baseline)
+    print(f'{name:>10}: mean |drift| {drift.mean():.4f}, max |drift| {drift.max():.4f}, '
+          f'pearson {correlation(baseline, scores):.4f}, spearman {correlation(ranks(baseline), ranks(scores)):.4f}, '
+          f'fp32 {baseline_seconds:.2f} s, {backend_model.backend} {backend_seconds:.2f} s '
+          f'({baseline_seconds / max(backend_seconds, 1e-9):.1f}x)')
+    return float(drift.max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('dataset')
+    parser.add_argument('--backend', choices=[BACKEND_INT8, BACKEND_ONNX], required=True)
+    parser.add_argument('--candidate-column')
+    parser.add_argument('--limit', type=int, default=200)
+    parser.add_argument('--metrics', nargs='+', choices=['semantic', 'bertScore'], default=['semantic', 'bertScore'])
+    parser.add_argument('--onnx-dir', default='cache/onnx')
+    parser.add_argument('--max-drift', type=float, help='exit with status 1 if any |drift| exceeds this value')
+    args = parser.parse_args()
+
+    pairs = read_pairs(args.dataset, args.candidate_column, args.limit)
+    if not pairs:
+        sys.exit('No (reference, candidate) pairs found')
+    references = [reference for reference, _ in pairs]
+    candidates = [candidate for _, candidate in pairs]
+    check_backend_requirements(args.backend)
+    print(f'{len(pairs)} pairs from {args.dataset}, backend {args.backend}')
+
+    # Stored fp32 embeddings would mask the backend under test
+    embedding_store.enabled = False
+
+    max_drift = 0.0
+    if 'semantic' in args.metrics:
+        max_drift = max(max_drift, compare(
+            'semantic', SemanticModel(backend=BACKEND_TORCH), SemanticModel(backend=args.backend),
+            'similarity', references, candidates))
+    if 'bertScore' in args.metrics:
+        max_drift = max(max_drift, compare(
+            'bertScore', BertScoreModel(backend=BACKEND_TORCH),
+            BertScoreModel(backend=args.backend, onnx_dir=args.onnx_dir),
+            'score', references, candidates))
+
+    if args.max_drift is not None and max_drift > args.max_drift:
+        print(f'Drift {max_drift:.4f} exceeds --max-drift {args.max_drift}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
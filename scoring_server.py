@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Shared metric scoring server.
+
+Loads the BERTScore and sentence embedding models once and serves batched
+scoring requests from all web workers. Point the web app at it with
+SCORING_SERVER_URL (e.g. http://127.0.0.1:5002).
+
+Usage: python scoring_server.py [--host HOST] [--port PORT]
+"""
+import argparse
+
+from app.services.scoring_server import create_scoring_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5002)
+    args = parser.parse_args()
+
+    app = create_scoring_app()
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемые часы time.monotonic: тест сдвигает время через clock.value."""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(time, 'monotonic', lambda: now.value)
+    return now
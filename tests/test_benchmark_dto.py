@@ -0,0 +1,27 @@
+from app.schemas.benchmark_dto import (
+    MAX_LOAD_LEVELS, MAX_OPEN_LOOP_SECONDS, MAX_REQUESTS_PER_LEVEL, PerformanceConfig, PromptSamplingConfig
+)
+
+
+def test_performance_config_drops_invalid_values():
+    config = PerformanceConfig.from_dict({'levels': ['x', True, None, -1, '8', 2], 'requestsPerLevel': 'abc',
+                                          'maxTokens': {}})
+    assert config.to_dict() == {'levels': [2, 8], 'arrivalMode': 'closed', 'requestsPerLevel': 32, 'maxTokens': 256}
+
+
+def test_performance_config_caps_test_size():
+    config = PerformanceConfig.from_dict({'levels': list(range(1, 100)) + [10 ** 6], 'requestsPerLevel': 10 ** 9})
+    assert len(config.levels) == MAX_LOAD_LEVELS
+    assert config.requests_per_level == MAX_REQUESTS_PER_LEVEL
+    assert PerformanceConfig.from_dict({'levels': [10 ** 6]}).levels == [PerformanceConfig().max_in_flight]
+
+
+def test_open_loop_duration_is_capped():
+    config = PerformanceConfig.from_dict({'arrivalMode': 'open', 'levels': [2, 8], 'requestsPerLevel': 1000})
+    assert config.requests_per_level / config.levels[0] <= MAX_OPEN_LOOP_SECONDS
+
+
+def test_sampling_config_drops_non_numeric_values():
+    config = PromptSamplingConfig.from_dict({'size': 'много', 'seed': [1]})
+    assert config.size is None
+    assert config.seed is None
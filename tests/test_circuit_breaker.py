@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.circuit_breaker import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker
+
+OK = SimpleNamespace(ok=True, status_code=200)
+SERVER_ERROR = SimpleNamespace(ok=False, status_code=502)
+TIMEOUT = SimpleNamespace(ok=False, status_code=None)
+THROTTLED = SimpleNamespace(ok=False, status_code=429)
+CLIENT_ERROR = SimpleNamespace(ok=False, status_code=400)
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    for result in (SERVER_ERROR, TIMEOUT, OK, SERVER_ERROR, SERVER_ERROR):
+        assert breaker.allow()
+        breaker.record(result)
+    assert breaker.state == STATE_CLOSED
+    breaker.allow()
+    breaker.record(TIMEOUT)
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow()
+
+
+def test_throttling_and_client_errors_do_not_open(clock):
+    breaker = CircuitBreaker(failure_threshold=2)
+    for result in (THROTTLED, CLIENT_ERROR, THROTTLED, CLIENT_ERROR):
+        breaker.allow()
+        breaker.record(result)
+    assert breaker.state == STATE_CLOSED
+
+
+@pytest.mark.parametrize('probe_result, state', [(OK, STATE_CLOSED), (SERVER_ERROR, STATE_OPEN)])
+def test_half_open_probe_decides_state(clock, probe_result, state):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.allow()
+    breaker.record(SERVER_ERROR)
+    clock.value += 9
+    assert not breaker.allow()
+    clock.value += 1
+    assert breaker.allow()
+    assert breaker.state == STATE_HALF_OPEN
+    breaker.record(probe_result)
+    assert breaker.state == state
+
+
+def test_late_results_do_not_change_open_state(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.allow()
+    breaker.record(SERVER_ERROR)
+    breaker.record(OK)
+    assert breaker.state == STATE_OPEN
+    assert breaker.snapshot() == {'state': STATE_OPEN, 'failures': 0, 'retry_in': 10.0}
@@ -0,0 +1,43 @@
+from unittest.mock import Mock
+
+from app.services.completion_service import HedgedAttempt
+
+
+def test_cancel_closes_response_and_releases_slot_once():
+    attempt = HedgedAttempt()
+    limiter = Mock()
+    response = Mock()
+    assert attempt.start(limiter)
+    attempt.attach(response)
+
+    attempt.cancel()
+    response.close.assert_called_once()
+    limiter.cancel.assert_called_once()
+    # Запрос, завершившийся после отмены, слот повторно не освобождает
+    assert not attempt.finish()
+
+
+def test_cancel_before_start_skips_request():
+    attempt = HedgedAttempt()
+    attempt.cancel()
+    assert not attempt.start(Mock())
+
+
+def test_response_of_cancelled_attempt_is_closed_on_attach():
+    attempt = HedgedAttempt()
+    limiter = Mock()
+    attempt.start(limiter)
+    attempt.cancel()
+    response = Mock()
+    attempt.attach(response)
+    response.close.assert_called_once()
+    limiter.cancel.assert_called_once()
+
+
+def test_finished_attempt_is_not_released_by_cancel():
+    attempt = HedgedAttempt()
+    limiter = Mock()
+    attempt.start(limiter)
+    assert attempt.finish()
+    attempt.cancel()
+    limiter.cancel.assert_not_called()
@@ -0,0 +1,137 @@
+import csv
+import json
+import random
+
+import pytest
+
+from app.services.dataset_analysis import analyze_csv_file, update_columns_info
+from app.services.dataset_changes import (
+    PatchError, VersionConflict, apply_patch, changes_path, compact, open_dataset, remove_sidecars
+)
+
+COLUMNS = ['prompt', 'reference', 'category']
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    rows = [
+        {'prompt': f'вопрос {i}\nвторая строка' if i % 7 == 0 else f'вопрос {i}',
+         'reference': str(i) if i % 3 else f'ответ {i}',
+         'category': 'a' if i % 2 else 'b'}
+        for i in range(60)
+    ]
+    path = tmp_path / 'data.csv'
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path), rows
+
+
+def random_operations(rng, model, step):
+    operations = []
+    for _ in range(rng.randint(1, 5)):
+        op = rng.choice(['insert', 'update', 'delete']) if model else 'insert'
+        if op == 'insert':
+            row = rng.randint(0, len(model))
+            values = {'prompt': f'новый {step}', 'reference': rng.choice(['x', '5', ''])}
+            model.insert(row, dict({column: '' for column in COLUMNS}, **values))
+            operations.append({'op': op, 'row': row, 'values': values})
+        elif op == 'update':
+            row = rng.randrange(len(model))
+            values = {'reference': rng.choice(['y', '7', ''])}
+            model[row] = dict(model[row], **values)
+            operations.append({'op': op, 'row': row, 'values': values})
+        else:
+            row = rng.randrange(len(model))
+            del model[row]
+            operations.append({'op': op, 'row': row})
+    return operations
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as file:
+        return list(csv.DictReader(file))
+
+
+def test_patches_match_in_memory_model(dataset):
+    path, rows = dataset
+    model = [dict(row) for row in rows]
+    columns_info = analyze_csv_file(path)['columns_info']
+    rng = random.Random(1)
+
+    for step in range(30):
+        operations = random_operations(rng, model, step)
+        with open_dataset(path) as view:
+            version = view.version
+        changes, row_count, _, new_version = apply_patch(path, operations, version)
+        columns_info = update_columns_info(columns_info, changes)
+        assert row_count == len(model)
+        if step == 15:
+            compact(path)
+
+        with open_dataset(path) as view:
+            assert view.version == new_version or step == 15
+            assert view.rows == len(model)
+            assert view.read_rows(0, view.rows) == model
+            assert view.read_rows(5, 12) == model[5:12]
+            assert list(view.column('reference')) == [row['reference'] for row in model]
+
+    compact(path)
+    assert read_csv(path) == model
+    with open(changes_path(path), encoding='utf-8') as file:
+        assert len(file.read().splitlines()) <= 1
+
+    # Инкрементальные статистики колонок совпадают с полным пересчётом
+    full = json.loads(analyze_csv_file(path)['columns_info'])
+    incremental = json.loads(columns_info)
+    for column in COLUMNS:
+        for field in ('non_empty_count', 'numeric_count', 'type'):
+            assert incremental[column][field] == full[column][field], (column, field)
+
+
+def test_failed_operation_leaves_log_unchanged(dataset):
+    path, rows = dataset
+    with pytest.raises(PatchError):
+        apply_patch(path, [{'op': 'delete', 'row': 0}, {'op': 'update', 'row': 0, 'values': {'unknown': 1}}])
+    with open_dataset(path) as view:
+        assert view.read_rows(0, view.rows) == rows
+
+
+@pytest.mark.parametrize('operation', [
+    {'op': 'move', 'row': 0},
+    {'op': 'delete', 'row': 60},
+    {'op': 'update', 'row': -1, 'values': {}},
+    {'op': 'insert', 'row': 'первая', 'values': {}},
+    'delete',
+])
+def test_invalid_operations_raise_patch_error(dataset, operation):
+    path, _ = dataset
+    with pytest.raises(PatchError):
+        apply_patch(path, [operation])
+
+
+def test_stale_version_is_rejected(dataset):
+    path, _ = dataset
+    with open_dataset(path) as view:
+        version = view.version
+    apply_patch(path, [{'op': 'delete', 'row': 0}], version)
+    with pytest.raises(VersionConflict):
+        apply_patch(path, [{'op': 'delete', 'row': 0}], version)
+
+
+def test_insert_without_row_appends(dataset):
+    path, rows = dataset
+    apply_patch(path, [{'op': 'insert', 'values': {'prompt': 'в конец'}}])
+    with open_dataset(path) as view:
+        assert view.rows == len(rows) + 1
+        assert view.row(view.rows - 1) == {'prompt': 'в конец', 'reference': '', 'category': ''}
+
+
+def test_remove_sidecars(dataset, tmp_path):
+    path, _ = dataset
+    apply_patch(path, [{'op': 'delete', 'row': 0}])
+    assert len(list(tmp_path.iterdir())) > 1
+    remove_sidecars(path)
+    assert [file.name for file in tmp_path.iterdir()] == ['data.csv']
+    remove_sidecars(path)
@@ -0,0 +1,113 @@
+import csv
+import io
+
+import pytest
+
+from app.services.dataset_store import open_columns, remove_columns, sidecar_path, write_columns
+
+ROWS = [
+    {'prompt': 'Столица Франции?', 'reference': 'Париж'},
+    {'prompt': 'Многострочный\nвопрос, с запятой', 'reference': 'ответ "в кавычках"'},
+    {'prompt': '', 'reference': '42'},
+    {'prompt': 'Последний', 'reference': ''},
+]
+
+
+def write_csv(path, rows, delimiter=',', blank_lines=False):
+    buffer = io.StringIO(newline='')
+    writer = csv.DictWriter(buffer, fieldnames=['prompt', 'reference'], delimiter=delimiter)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if blank_lines:
+            buffer.write('\r\n')
+    path.write_text(buffer.getvalue(), encoding='utf-8', newline='')
+    return str(path)
+
+
+@pytest.mark.parametrize('delimiter', [',', ';'])
+@pytest.mark.parametrize('blank_lines', [False, True])
+def test_columns_round_trip(tmp_path, delimiter, blank_lines):
+    csv_path = write_csv(tmp_path / 'data.csv', ROWS, delimiter, blank_lines)
+    write_columns(csv_path)
+
+    with open_columns(csv_path) as columns:
+        assert columns.columns == ['prompt', 'reference']
+        assert columns.rows == len(ROWS)
+        assert list(columns.column('prompt')) == [row['prompt'] for row in ROWS]
+        assert list(columns.column('reference')) == [row['reference'] for row in ROWS]
+        assert columns.read_rows(csv_path, 0, len(ROWS)) == ROWS
+
+
+def test_column_view_indexing(tmp_path):
+    csv_path = write_csv(tmp_path / 'data.csv', ROWS)
+    with open_columns(csv_path) as columns:
+        prompts = columns.column('prompt')
+        assert len(prompts) == len(ROWS)
+        assert prompts[1] == ROWS[1]['prompt']
+        assert prompts[-1] == ROWS[-1]['prompt']
+        with pytest.raises(IndexError):
+            prompts[len(ROWS)]
+        with pytest.raises(ValueError):
+            columns.column('missing')
+
+
+@pytest.mark.parametrize('start, stop', [(0, 1), (1, 3), (3, 4), (2, 100), (-5, 2), (4, 4), (3, 1)])
+def test_read_rows_ranges(tmp_path, start, stop):
+    csv_path = write_csv(tmp_path / 'data.csv', ROWS)
+    with open_columns(csv_path) as columns:
+        assert columns.read_rows(csv_path, start, stop) == ROWS[max(start, 0):max(stop, 0)]
+
+
+def test_short_rows_are_padded(tmp_path):
+    csv_path = tmp_path / 'data.csv'
+    csv_path.write_text('prompt,reference\nтолько промпт\n', encoding='utf-8')
+    with open_columns(str(csv_path)) as columns:
+        assert list(columns.column('reference')) == ['']
+        assert columns.read_rows(str(csv_path), 0, 1) == [{'prompt': 'только промпт', 'reference': None}]
+
+
+def test_open_columns_builds_missing_sidecar(tmp_path):
+    csv_path = write_csv(tmp_path / 'data.csv', ROWS)
+    assert not (tmp_path / 'data.csv.columns').exists()
+    with open_columns(csv_path) as columns:
+        assert columns.rows == len(ROWS)
+    assert (tmp_path / 'data.csv.columns').exists()
+
+
+def test_stale_sidecar_is_rebuilt(tmp_path):
+    csv_path = write_csv(tmp_path / 'data.csv', ROWS)
+    write_columns(csv_path)
+    changed = ROWS + [{'prompt': 'Новый', 'reference': 'строка'}]
+    write_csv(tmp_path / 'data.csv', changed)
+
+    with open_columns(csv_path) as columns:
+        assert columns.rows == len(changed)
+        assert columns.column('prompt')[-1] == 'Новый'
+
+
+def test_sidecar_of_unknown_format_is_rebuilt(tmp_path):
+    csv_path = write_csv(tmp_path / 'data.csv', ROWS)
+    with open(sidecar_path(csv_path), 'wb') as file:
+        file.write(b'not a sidecar')
+    with open_columns(csv_path) as columns:
+        assert list(columns.column('reference')) == [row['reference'] for row in ROWS]
+
+
+def test_remove_columns(tmp_path):
+    csv_path = write_csv(tmp_path / 'data.csv', ROWS)
+    write_columns(csv_path)
+    remove_columns(csv_path)
+    assert not (tmp_path / 'data.csv.columns').exists()
+    remove_columns(csv_path)
+
+
+@pytest.mark.parametrize('name_length', range(1, 17))
+def test_sidecar_layout_for_any_header_length(tmp_path, name_length):
+    # Длина JSON-заголовка влияет на позиции секций; проверяем переходы через границу выравнивания
+    column = 'c' * name_length
+    csv_path = tmp_path / 'data.csv'
+    csv_path.write_text(f'{column},reference\nвопрос,ответ\n', encoding='utf-8')
+    with open_columns(str(csv_path)) as columns:
+        assert list(columns.column(column)) == ['вопрос']
+        assert columns.read_rows(str(csv_path), 0, 1) == [{column: 'вопрос', 'reference': 'ответ'}]
@@ -0,0 +1,28 @@
+import random
+
+import pytest
+
+from app.services.lexical_metrics import lcs_length, lcs_length_bit_parallel, lcs_length_linear, lcs_table, rouge_l_f1
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_bit_parallel_matches_dynamic_programming(seed):
+    rng = random.Random(seed)
+    # Длина больше 64, чтобы маски не помещались в одно машинное слово
+    seq1 = [rng.choice('abcde') for _ in range(rng.randint(0, 120))]
+    seq2 = [rng.choice('abcde') for _ in range(rng.randint(0, 120))]
+    expected = lcs_table(seq1, seq2)[-1][-1]
+    assert lcs_length(seq1, seq2) == expected
+    assert lcs_length_linear(seq1, seq2) == expected
+    if seq1 and seq2:
+        assert lcs_length_bit_parallel(seq1, seq2) == expected
+
+
+def test_unhashable_tokens_fall_back_to_linear():
+    assert lcs_length([[1], [2], [3]], [[1], [3]]) == 2
+
+
+def test_rouge_l_f1():
+    assert rouge_l_f1(['a', 'b', 'c', 'd'], ['a', 'c']) == pytest.approx(2 * 1.0 * 0.5 / 1.5)
+    assert rouge_l_f1([], ['a']) == 0.0
+    assert rouge_l_f1(['a'], ['b']) == 0.0
@@ -0,0 +1,62 @@
+import pytest
+
+from app.services.lexical_metrics import LEXICAL_METRICS, score_lexical_batch
+
+
+@pytest.mark.parametrize('text', ['42', 'Paris', 'да', 'The answer is 42.'])
+def test_chrf_identical_short_answers_score_one(text):
+    (scores,) = score_lexical_batch([text], [text], metrics=['chrf'])
+    assert scores['chrf'] == pytest.approx(1.0)
+
+
+def test_identical_answers_score_one():
+    text = 'The capital of France is Paris.'
+    (scores,) = score_lexical_batch([text], [text])
+    assert scores == {metric: pytest.approx(1.0) for metric in LEXICAL_METRICS}
+
+
+def test_chrf_short_partial_match_is_below_one():
+    (scores,) = score_lexical_batch(['42'], ['43'], metrics=['chrf'])
+    assert 0.0 < scores['chrf'] < 1.0
+
+
+def test_chrf_ignores_orders_missing_on_one_side():
+    # У "4" нет биграмм: порядок 2 не учитывается, а по униграммам полнота 1/2
+    (scores,) = score_lexical_batch(['42'], ['4'], metrics=['chrf'])
+    assert scores['chrf'] == pytest.approx(5 * 1.0 * 0.5 / (4 * 1.0 + 0.5))
+
+
+def test_empty_answer_scores_zero():
+    (scores,) = score_lexical_batch(['Paris'], [''])
+    assert all(value == 0.0 for value in scores.values())
+
+
+def test_rouge_n_known_values():
+    (scores,) = score_lexical_batch(['the cat sat on the mat'], ['the cat sat'], metrics=['rouge1', 'rouge2'])
+    # Униграммы: точность 3/3, полнота 3/6; биграммы: точность 2/2, полнота 2/5
+    assert scores['rouge1'] == pytest.approx(2 * 1.0 * 0.5 / 1.5)
+    assert scores['rouge2'] == pytest.approx(2 * 1.0 * 0.4 / 1.4)
+
+
+def test_exact_match_and_token_f1_normalize_answers():
+    (scores,) = score_lexical_batch(['Paris'], ['The Paris!'], metrics=['tokenF1', 'exactMatch'])
+    assert scores == {'tokenF1': pytest.approx(1.0), 'exactMatch': 1.0}
+
+    (scores,) = score_lexical_batch(['Paris, France'], ['Paris'], metrics=['tokenF1', 'exactMatch'])
+    assert scores == {'tokenF1': pytest.approx(2 * 1.0 * 0.5 / 1.5), 'exactMatch': 0.0}
+
+
+def test_metrics_subset_returns_only_requested_keys():
+    results = score_lexical_batch(['a b c', 'd e'], ['a b', 'd e'], metrics=['bleu', 'rouge'])
+    assert [set(scores) for scores in results] == [{'rouge', 'bleu'}, {'rouge', 'bleu'}]
+    assert score_lexical_batch(['a'], ['a'], metrics=['unknown']) == [{}]
+    assert score_lexical_batch([], []) == []
+
+
+def test_batch_scores_match_single_pair_scores():
+    references = ['The cat sat on the mat.', 'The cat sat on the mat.', 'Москва — столица России']
+    candidates = ['A cat sat on a mat.', 'The dog sat.', 'Столица России — Москва']
+    batch = score_lexical_batch(references, candidates)
+    for reference, candidate, scores in zip(references, candidates, batch):
+        (single,) = score_lexical_batch([reference], [candidate])
+        assert scores == {metric: pytest.approx(value) for metric, value in single.items()}
@@ -0,0 +1,72 @@
+from collections import Counter
+
+import pytest
+
+from app.services.prompt_sampling import (
+    SAMPLING_HASH, SAMPLING_HEAD, SAMPLING_RESERVOIR, SAMPLING_STRATIFIED, sample_items
+)
+
+ITEMS = [f'prompt {i}' for i in range(1000)]
+
+
+def test_head_takes_first_items():
+    assert sample_items(iter(ITEMS), SAMPLING_HEAD, 5, 0) == ITEMS[:5]
+
+
+@pytest.mark.parametrize('strategy', [SAMPLING_RESERVOIR, SAMPLING_HASH, SAMPLING_STRATIFIED])
+def test_sample_is_deterministic_and_keeps_dataset_order(strategy):
+    sample = sample_items(iter(ITEMS), strategy, 50, 7)
+    assert len(sample) == 50
+    assert len(set(sample)) == 50
+    assert sample == sorted(sample, key=ITEMS.index)
+    assert sample_items(iter(ITEMS), strategy, 50, 7) == sample
+    assert sample_items(iter(ITEMS), strategy, 50, 8) != sample
+
+
+def test_reservoir_is_roughly_uniform():
+    # Каждый элемент должен попадать в выборку примерно в size / len(items) случаев
+    hits = Counter()
+    for seed in range(200):
+        hits.update(ITEMS.index(item) // 100 for item in sample_items(ITEMS, SAMPLING_RESERVOIR, 100, seed))
+    assert all(1500 < hits[decile] < 2500 for decile in range(10))
+
+
+def test_hash_sample_mostly_survives_appended_rows():
+    before = sample_items(ITEMS, SAMPLING_HASH, 50, 0)
+    after = sample_items(ITEMS + [f'new prompt {i}' for i in range(20)], SAMPLING_HASH, 50, 0)
+    # Новые строки могут вытеснить только те, чей хэш больше их хэша
+    assert len(set(before) & set(after)) >= 45
+
+
+def test_hash_sample_uses_key():
+    items = [{'id': i, 'prompt': text} for i, text in enumerate(ITEMS)]
+    sample = sample_items(items, SAMPLING_HASH, 10, 0, key=lambda item: item['prompt'])
+    assert [item['prompt'] for item in sample] == sample_items(ITEMS, SAMPLING_HASH, 10, 0)
+
+
+def test_stratified_quotas_are_proportional():
+    items = [('a', i) for i in range(600)] + [('b', i) for i in range(300)] + [('c', i) for i in range(100)]
+    sample = sample_items(items, SAMPLING_STRATIFIED, 10, 0, stratum=lambda item: item[0])
+    assert Counter(name for name, _ in sample) == {'a': 6, 'b': 3, 'c': 1}
+
+
+def test_stratified_largest_remainder_fills_size():
+    items = [('a', i) for i in range(5)] + [('b', i) for i in range(5)] + [('c', i) for i in range(5)]
+    sample = sample_items(items, SAMPLING_STRATIFIED, 4, 0, stratum=lambda item: item[0])
+    assert len(sample) == 4
+    assert sorted(Counter(name for name, _ in sample).values()) == [1, 1, 2]
+
+
+@pytest.mark.parametrize('strategy', [SAMPLING_HEAD, SAMPLING_RESERVOIR, SAMPLING_HASH, SAMPLING_STRATIFIED])
+def test_size_larger_than_dataset_returns_everything(strategy):
+    assert sample_items(iter(ITEMS[:10]), strategy, 50, 0) == ITEMS[:10]
+
+
+@pytest.mark.parametrize('size', [0, -1])
+def test_non_positive_size_returns_everything(size):
+    assert sample_items(iter(ITEMS), SAMPLING_RESERVOIR, size, 0) == ITEMS
+
+
+def test_unknown_strategy_raises():
+    with pytest.raises(ValueError):
+        sample_items(ITEMS, 'random', 10, 0)
@@ -0,0 +1,61 @@
+import pytest
+
+from app.services.rate_limiter import AdaptiveConcurrency, TokenBucket, is_overload_status, parse_retry_after
+
+
+def test_token_bucket_waits_for_refill(clock):
+    bucket = TokenBucket(60)
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(3) == pytest.approx(3.0)
+    clock.value += 3.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_token_bucket_caps_requests_larger_than_budget(clock):
+    bucket = TokenBucket(60)
+    assert bucket.reserve(1000) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_token_bucket_adjust_returns_overestimate(clock):
+    bucket = TokenBucket(60)
+    bucket.reserve(60)
+    bucket.adjust(-30)
+    assert bucket.reserve(30) == 0.0
+
+
+def test_adaptive_concurrency_aimd():
+    concurrency = AdaptiveConcurrency(8)
+    concurrency.acquire()
+    concurrency.release(overloaded=True)
+    assert concurrency.limit == 4.0
+    for _ in range(4):
+        concurrency.acquire()
+        concurrency.release(overloaded=False)
+    assert concurrency.limit == pytest.approx(5.0, abs=0.1)
+    for _ in range(10):
+        concurrency.acquire()
+        concurrency.release(overloaded=True)
+    assert concurrency.limit == 1
+    assert concurrency.in_flight == 0
+
+
+@pytest.mark.parametrize('status_code, overloaded', [(429, True), (500, True), (503, True), (400, False), (200, False), (None, False)])
+def test_is_overload_status(status_code, overloaded):
+    assert is_overload_status(status_code) is overloaded
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('2.5') == 2.5
+    assert parse_retry_after('-1') == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+
+
+def test_cancel_frees_slot_without_changing_limit():
+    concurrency = AdaptiveConcurrency(4)
+    concurrency.acquire()
+    concurrency.cancel()
+    assert concurrency.in_flight == 0
+    assert concurrency.limit == 4.0
@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from app.services.scoring_pipeline import ScoringPipeline
+
+
+def score_lengths(references, candidates):
+    return [len(candidate) for candidate in candidates]
+
+
+def test_scoring_starts_before_producer_finishes():
+    scored = threading.Event()
+
+    def score_batch(references, candidates):
+        scored.set()
+        return score_lengths(references, candidates)
+
+    pipeline = ScoringPipeline(score_batch, micro_batch_size=256, min_batch_size=64, batch_wait=0.01)
+    for index in range(3):
+        pipeline.put(index, 'эталон', 'x' * index)
+    # Пар меньше и микропакета, и пакета модели, но очередь опустела — оценка уже идёт
+    assert scored.wait(5)
+    pipeline.put(3, 'эталон', 'xxx')
+    assert pipeline.finish() == {0: 0, 1: 1, 2: 2, 3: 3}
+
+
+def test_micro_batch_size_caps_batches():
+    batches = []
+
+    def score_batch(references, candidates):
+        batches.append(len(candidates))
+        return score_lengths(references, candidates)
+
+    pipeline = ScoringPipeline(score_batch, queue_size=1000, micro_batch_size=4, batch_wait=1.0)
+    for index in range(10):
+        pipeline.put(index, 'эталон', 'ответ')
+    assert len(pipeline.finish()) == 10
+    assert max(batches) <= 4
+    assert sum(batches) == 10
+
+
+def test_scoring_error_is_raised_from_finish():
+    def score_batch(references, candidates):
+        raise RuntimeError('модель недоступна')
+
+    pipeline = ScoringPipeline(score_batch, batch_wait=0.01)
+    pipeline.put(0, 'эталон', 'ответ')
+    pipeline.put(1, 'эталон', 'ответ')
+    with pytest.raises(RuntimeError):
+        pipeline.finish()
+    pipeline.close()
@@ -0,0 +1,43 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'ответ'
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(flights.do, 'key', slow)
+        started.wait(5)
+        followers = [executor.submit(flights.do, 'key', slow) for _ in range(3)]
+        while flights.saved_calls < 3:
+            threading.Event().wait(0.01)
+        release.set()
+        assert leader.result() == ('ответ', False)
+        assert [future.result() for future in followers] == [('ответ', True)] * 3
+    assert calls == [1]
+
+
+def test_error_propagates_and_key_is_released():
+    flights = SingleFlight()
+
+    def failing():
+        raise RuntimeError('нет ответа')
+
+    with pytest.raises(RuntimeError):
+        flights.do('key', failing)
+    # После завершения вызова ключ снова выполняет функцию
+    assert flights.do('key', lambda: 1) == (1, False)
+    assert flights.saved_calls == 0